@@ -0,0 +1,85 @@
+"""context summary, streaming and counter columns; hot path indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-07-28 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns) for every hot query path in the conversation and
+# recommendation endpoints
+INDEXES = [
+    # list_conversations keyset pagination
+    ('idx_conversations_user_created_id', 'conversations', ['user_id', 'created_at', 'id']),
+    # context window, paged messages, last assistant message
+    ('idx_messages_conversation_created_id', 'messages', ['conversation_id', 'created_at', 'id']),
+    ('idx_task_definitions_conversation_id', 'task_definitions', ['conversation_id']),
+    ('idx_task_definitions_user_id', 'task_definitions', ['user_id']),
+]
+
+# Single-column indexes from create_conversation_tables.sql that are
+# prefixes of the composite indexes above
+SUPERSEDED_INDEXES = [
+    ('idx_conversations_user_id', 'conversations'),
+    ('idx_messages_conversation_id', 'messages'),
+]
+
+
+def _existing_indexes(table: str) -> set:
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def _existing_columns(table: str) -> set:
+    return {column['name'] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    conversation_columns = _existing_columns('conversations')
+    if 'summary' not in conversation_columns:
+        op.add_column('conversations', sa.Column('summary', sa.Text(), nullable=True))
+    if 'summarized_until' not in conversation_columns:
+        op.add_column('conversations', sa.Column('summarized_until', sa.DateTime(timezone=True), nullable=True))
+    if 'message_count' not in conversation_columns:
+        op.add_column('conversations', sa.Column('message_count', sa.Integer(), server_default='0', nullable=False))
+    if 'last_message_at' not in conversation_columns:
+        op.add_column('conversations', sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=True))
+    if 'is_complete' not in _existing_columns('messages'):
+        op.add_column('messages', sa.Column('is_complete', sa.Boolean(), server_default=sa.true(), nullable=False))
+
+    op.execute(
+        """
+        UPDATE conversations SET
+            message_count = (
+                SELECT COUNT(*) FROM messages WHERE messages.conversation_id = conversations.id
+            ),
+            last_message_at = (
+                SELECT MAX(created_at) FROM messages WHERE messages.conversation_id = conversations.id
+            )
+        """
+    )
+
+    for name, table, columns in INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns)
+    for name, table in SUPERSEDED_INDEXES:
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    op.drop_column('messages', 'is_complete')
+    op.drop_column('conversations', 'last_message_at')
+    op.drop_column('conversations', 'message_count')
+    op.drop_column('conversations', 'summarized_until')
+    op.drop_column('conversations', 'summary')
@@ -0,0 +1,28 @@
+"""memoized search keywords on task definitions
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-08-04 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('task_definitions', sa.Column('schema_hash', sa.String(length=64), nullable=True))
+    op.add_column('task_definitions', sa.Column('search_keywords', sa.Text(), nullable=True))
+    op.create_index('idx_task_definitions_schema_hash', 'task_definitions', ['schema_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_task_definitions_schema_hash', table_name='task_definitions')
+    op.drop_column('task_definitions', 'search_keywords')
+    op.drop_column('task_definitions', 'schema_hash')
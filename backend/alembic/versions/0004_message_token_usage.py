@@ -0,0 +1,28 @@
+"""model and token usage on messages
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-08-06 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('messages', sa.Column('model', sa.String(), nullable=True))
+    op.add_column('messages', sa.Column('prompt_tokens', sa.Integer(), nullable=True))
+    op.add_column('messages', sa.Column('completion_tokens', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('messages', 'completion_tokens')
+    op.drop_column('messages', 'prompt_tokens')
+    op.drop_column('messages', 'model')
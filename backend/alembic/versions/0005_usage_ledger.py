@@ -0,0 +1,84 @@
+"""usage ledger and per-period aggregates
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-08-08 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def _month_start(column: str) -> str:
+    if op.get_bind().dialect.name == 'postgresql':
+        return f"CAST(date_trunc('month', {column} AT TIME ZONE 'UTC') AS DATE)"
+    return f"date({column}, 'start of month')"
+
+
+def upgrade() -> None:
+    op.create_table(
+        'usage_events',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('model', sa.String(), nullable=True),
+        sa.Column('reference_id', sa.String(), nullable=True),
+        sa.Column('llm_calls', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('prompt_tokens', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('completion_tokens', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('recommendation_calls', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_usage_events_user_created', 'usage_events', ['user_id', 'created_at'])
+    op.create_table(
+        'usage_aggregates',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('llm_calls', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('prompt_tokens', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('completion_tokens', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('recommendation_calls', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'period_start'),
+    )
+
+    # Backfill the ledger from the token counts already stored on assistant replies
+    op.execute(
+        """
+        INSERT INTO usage_events
+            (user_id, kind, model, reference_id, llm_calls, prompt_tokens, completion_tokens, recommendation_calls, created_at)
+        SELECT c.user_id, 'chat', m.model, m.id, 1,
+               COALESCE(m.prompt_tokens, 0), COALESCE(m.completion_tokens, 0), 0,
+               COALESCE(m.created_at, CURRENT_TIMESTAMP)
+        FROM messages m
+        JOIN conversations c ON c.id = m.conversation_id
+        WHERE m.role = 'assistant'
+          AND (m.prompt_tokens IS NOT NULL OR m.completion_tokens IS NOT NULL)
+        """
+    )
+    op.execute(
+        f"""
+        INSERT INTO usage_aggregates
+            (user_id, period_start, llm_calls, prompt_tokens, completion_tokens, recommendation_calls)
+        SELECT user_id, {_month_start('created_at')},
+               SUM(llm_calls), SUM(prompt_tokens), SUM(completion_tokens), SUM(recommendation_calls)
+        FROM usage_events
+        GROUP BY 1, 2
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('usage_aggregates')
+    op.drop_index('idx_usage_events_user_created', table_name='usage_events')
+    op.drop_table('usage_events')
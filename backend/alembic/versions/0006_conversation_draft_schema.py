@@ -0,0 +1,58 @@
+"""draft task definition schema on conversations
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-08-10 00:00:00
+
+"""
+import json
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+_JSON_BLOCK = re.compile(r'```json\s*([\s\S]*?)\s*```')
+
+
+def _schema(content: str):
+    for match in _JSON_BLOCK.finditer(content):
+        try:
+            schema = json.loads(match.group(1))
+        except ValueError:
+            continue
+        if isinstance(schema, dict):
+            return schema
+    return None
+
+
+def upgrade() -> None:
+    op.add_column('conversations', sa.Column('draft_json_schema', sa.JSON(), nullable=True))
+
+    # Seed drafts from the latest assistant reply of each conversation
+    bind = op.get_bind()
+    replies = bind.execute(sa.text(
+        "SELECT m.conversation_id, m.content FROM messages m "
+        "WHERE m.role = 'assistant' AND m.content LIKE '%```json%' "
+        "AND m.created_at = (SELECT MAX(l.created_at) FROM messages l "
+        "WHERE l.conversation_id = m.conversation_id AND l.role = 'assistant')"
+    ))
+    conversations = sa.table('conversations', sa.column('id', sa.String()), sa.column('draft_json_schema', sa.JSON()))
+    for conversation_id, content in replies.fetchall():
+        schema = _schema(content)
+        if schema is not None:
+            bind.execute(
+                conversations.update()
+                .where(conversations.c.id == conversation_id)
+                .values(draft_json_schema=schema)
+            )
+
+
+def downgrade() -> None:
+    op.drop_column('conversations', 'draft_json_schema')
@@ -0,0 +1,47 @@
+"""datasets
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2025-08-12 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'datasets',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('task_definition_id', sa.String(), nullable=True),
+        sa.Column('filename', sa.String(), nullable=False),
+        sa.Column('format', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), server_default='uploading', nullable=False),
+        sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+        sa.Column('received_bytes', sa.BigInteger(), server_default='0', nullable=False),
+        sa.Column('label_column', sa.String(), nullable=True),
+        sa.Column('row_count', sa.BigInteger(), nullable=True),
+        sa.Column('profile', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['task_definition_id'], ['task_definitions.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_datasets_user_created', 'datasets', ['user_id', 'created_at'])
+    op.create_index('idx_datasets_task_definition_id', 'datasets', ['task_definition_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_datasets_task_definition_id', table_name='datasets')
+    op.drop_index('idx_datasets_user_created', table_name='datasets')
+    op.drop_table('datasets')
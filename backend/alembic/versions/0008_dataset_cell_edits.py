@@ -0,0 +1,33 @@
+"""dataset cell edits
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2025-08-14 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dataset_cell_edits',
+        sa.Column('dataset_id', sa.String(), nullable=False),
+        sa.Column('row_index', sa.BigInteger(), nullable=False),
+        sa.Column('column', sa.String(), nullable=False),
+        sa.Column('value', sa.JSON(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['dataset_id'], ['datasets.id']),
+        sa.PrimaryKeyConstraint('dataset_id', 'row_index', 'column'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('dataset_cell_edits')
@@ -0,0 +1,75 @@
+"""background job queue
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2025-08-16 00:00:00
+
+"""
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    jobs = op.create_table(
+        'jobs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=True),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=True),
+        sa.Column('status', sa.String(), server_default='queued', nullable=False),
+        sa.Column('priority', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('max_attempts', sa.Integer(), server_default='3', nullable=False),
+        sa.Column('idempotency_key', sa.String(), nullable=True),
+        sa.Column('run_after', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+        sa.Column('locked_by', sa.String(), nullable=True),
+        sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('progress', sa.Float(), server_default='0', nullable=False),
+        sa.Column('progress_message', sa.String(), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('idx_jobs_status_priority_run_after', 'jobs', ['status', 'priority', 'run_after'])
+    op.create_index('idx_jobs_user_created', 'jobs', ['user_id', 'created_at'])
+    op.create_index(
+        'uq_jobs_user_kind_idempotency_key', 'jobs', ['user_id', 'kind', 'idempotency_key'], unique=True
+    )
+
+    # Datasets were processed by an in-process queue; hand any it hadn't finished to the job queue
+    bind = op.get_bind()
+    pending = bind.execute(sa.text(
+        "SELECT id, user_id FROM datasets WHERE status IN ('uploaded', 'processing')"
+    )).fetchall()
+    if pending:
+        op.bulk_insert(jobs, [
+            {
+                'id': str(uuid.uuid4()),
+                'user_id': user_id,
+                'kind': 'dataset.process',
+                'payload': {'dataset_id': dataset_id},
+                'idempotency_key': dataset_id,
+            }
+            for dataset_id, user_id in pending
+        ])
+
+
+def downgrade() -> None:
+    op.drop_index('uq_jobs_user_kind_idempotency_key', table_name='jobs')
+    op.drop_index('idx_jobs_user_created', table_name='jobs')
+    op.drop_index('idx_jobs_status_priority_run_after', table_name='jobs')
+    op.drop_table('jobs')
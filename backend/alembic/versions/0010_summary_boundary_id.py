@@ -0,0 +1,32 @@
+"""summary boundary message id
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2025-08-22 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('conversations', sa.Column('summarized_until_id', sa.String(), nullable=True))
+
+    # Existing boundaries covered every message at that timestamp; keep it that way
+    op.execute(
+        "UPDATE conversations SET summarized_until_id = ("
+        "SELECT MAX(m.id) FROM messages m "
+        "WHERE m.conversation_id = conversations.id AND m.created_at = conversations.summarized_until"
+        ") WHERE summarized_until IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('conversations', 'summarized_until_id')
@@ -1,17 +1,19 @@
-from typing import Generator
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
+from app.core.rate_limit import rate_limiter
 from app.db.session import get_db
 from app.models.user import User
+from app.services.user_cache import user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login/form")
 
-def get_current_user(
-    db: Session = Depends(get_db),
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme)
 ) -> User:
     credentials_exception = HTTPException(
@@ -29,15 +31,28 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalars().first()
     if user is None:
         raise credentials_exception
     
+    await user_cache.set(user)
     return user
 
-def get_current_active_user(
+async def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user 
\ No newline at end of file
+    return current_user 
+
+
+def rate_limit(scope: str, per_minute: float, burst: int):
+    """Route dependency charging each request to the caller's token bucket for ``scope``."""
+    async def check_rate_limit(current_user: User = Depends(get_current_user)) -> None:
+        await rate_limiter.check(scope, current_user.id, per_minute, burst)
+    return check_rate_limit
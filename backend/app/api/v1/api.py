@@ -1,8 +1,12 @@
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, conversations, recommendations
+from app.api.v1.endpoints import auth, conversations, datasets, jobs, recommendations, transfer
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
+# Before conversations, whose /conversations/{conversation_id} would otherwise match /conversations/export
+api_router.include_router(transfer.router, tags=["conversations"])
 api_router.include_router(conversations.router, tags=["conversations"])
-api_router.include_router(recommendations.router, prefix="/models", tags=["model-recommendations"]) 
\ No newline at end of file
+api_router.include_router(recommendations.router, prefix="/models", tags=["model-recommendations"]) 
+api_router.include_router(datasets.router, prefix="/datasets", tags=["datasets"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
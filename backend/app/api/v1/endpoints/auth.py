@@ -3,7 +3,8 @@ from typing import Any
 
 from fastapi import APIRouter, Body, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
 from app.api import deps
@@ -12,7 +13,8 @@ from app.core.config import settings
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.token import Token
-from app.schemas.user import UserCreate, User as UserSchema
+from app.schemas.user import UsageStats, UserCreate, User as UserSchema
+from app.services import usage
 
 router = APIRouter()
 
@@ -22,21 +24,35 @@ class LoginRequest(BaseModel):
     password: str
 
 
+async def _authenticate(db: AsyncSession, email: str, password: str) -> User:
+    """Check credentials, upgrading the stored hash if its parameters are outdated."""
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
+
+    if not user:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    valid, new_hash = await security.verify_password_async(password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    elif not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    return user
+
+
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     login_data: LoginRequest
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = db.query(User).filter(User.email == login_data.email).first()
-    
-    if not user or not security.verify_password(login_data.password, user.hashed_password):
-        raise HTTPException(status_code=400, detail="Incorrect email or password")
-    elif not user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
+    user = await _authenticate(db, login_data.email, login_data.password)
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
@@ -50,19 +66,14 @@ def login(
 
 
 @router.post("/login/form", response_model=Token)
-def login_form(
-    db: Session = Depends(get_db),
+async def login_form(
+    db: AsyncSession = Depends(get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login with form data
     """
-    user = db.query(User).filter(User.email == form_data.username).first()
-    
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
-        raise HTTPException(status_code=400, detail="Incorrect email or password")
-    elif not user.is_active:
-        raise HTTPException(status_code=400, detail="Inactive user")
+    user = await _authenticate(db, form_data.username, form_data.password)
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
@@ -76,15 +87,16 @@ def login_form(
 
 
 @router.post("/register", response_model=UserSchema)
-def register(
+async def register(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user_in: UserCreate,
 ) -> Any:
     """
     Create new user.
     """
-    user = db.query(User).filter(User.email == user_in.email).first()
+    result = await db.execute(select(User).where(User.email == user_in.email))
+    user = result.scalars().first()
     if user:
         raise HTTPException(
             status_code=400,
@@ -93,17 +105,17 @@ def register(
     
     user = User(
         email=user_in.email,
-        hashed_password=security.get_password_hash(user_in.password),
+        hashed_password=await security.get_password_hash_async(user_in.password),
         is_active=True,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
 @router.get("/me", response_model=UserSchema)
-def read_users_me(
+async def read_users_me(
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """
@@ -112,18 +124,12 @@ def read_users_me(
     return current_user
 
 
-@router.get("/me/usage")
-def read_usage_stats(
+@router.get("/me/usage", response_model=UsageStats)
+async def read_usage_stats(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(deps.get_current_user),
-):
+) -> Any:
     """
-    Get user's API usage stats.
+    Get user's API usage stats for the current billing period.
     """
-    # This is a mock response.
-    # In a real application, you would fetch this from your database or a billing service.
-    return {
-        "credits_used": 3,
-        "credits_remaining": 97,
-        "models_trained": 1,
-        "next_billing_date": "2025-07-29"
-    } 
\ No newline at end of file
+    return await usage.get_usage_stats(db, current_user.id)
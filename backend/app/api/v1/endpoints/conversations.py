@@ -1,19 +1,23 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-import json
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, noload, selectinload
+from sqlalchemy import func, select, tuple_
+from contextlib import aclosing
 import asyncio
-import openai
+import uuid
 
 from app.api import deps
+from app.api.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.api.v1.endpoints.jobs import JOB_ID_HEADER
 from app.models.user import User
 from app.models.conversation import Conversation, Message, TaskDefinition
 from app.schemas.conversation import (
     ConversationCreate, 
     Conversation as ConversationSchema,
     ConversationList,
+    ConversationHeader,
     MessageCreate,
     Message as MessageSchema,
     TaskDefinitionCreate,
@@ -21,11 +25,19 @@ from app.schemas.conversation import (
 )
 from app.db.session import get_db
 from app.core.config import settings
+from app.core.json import sse_event
+from app.core.rate_limit import rate_limiter
+from app.core.sse import accepts_gzip, coalesce, gzip_frames, metered
+from app.core.tracing import Trace
+from app.services import context, jobs, keywords, task_schema
+from app.services.llm import LLMClient, Usage, get_llm_client
+from app.services.message_writer import message_writer
+from app.services.response_cache import response_cache
 
 router = APIRouter()
 
-# Set OpenAI API key
-openai.api_key = settings.OPENAI_API_KEY
+CHAT_MODEL = "gpt-4o-mini"
+STREAM_SCOPE = "chat_stream"
 
 SYSTEM_PROMPT = """
 # Persona
@@ -58,10 +70,22 @@ You must follow these steps sequentially:
 """
 
 
+async def _get_user_conversation(
+    db: AsyncSession, conversation_id: str, current_user: User
+) -> Optional[Conversation]:
+    result = await db.execute(
+        select(Conversation).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )
+    return result.scalars().first()
+
+
 @router.post("/conversations", response_model=ConversationSchema)
-def create_conversation(
+async def create_conversation(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     conversation_in: ConversationCreate,
     current_user: User = Depends(deps.get_current_user)
 ) -> Conversation:
@@ -71,57 +95,144 @@ def create_conversation(
         title=conversation_in.title
     )
     db.add(conversation)
-    db.commit()
-    db.refresh(conversation)
+    await db.commit()
+    await response_cache.invalidate(current_user.id)
+    await db.refresh(conversation, attribute_names=["created_at", "messages"])
     return conversation
 
 
 @router.get("/conversations", response_model=List[ConversationList])
-def list_conversations(
-    db: Session = Depends(get_db),
+async def list_conversations(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = None,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=500),
     current_user: User = Depends(deps.get_current_user)
-) -> List[ConversationList]:
-    """List all conversations for the current user."""
-    conversations = db.query(
-        Conversation.id,
-        Conversation.title,
-        Conversation.is_completed,
-        Conversation.created_at,
-        func.count(Message.id).label("message_count")
-    ).outerjoin(Message).filter(
-        Conversation.user_id == current_user.id
-    ).group_by(
-        Conversation.id
-    ).order_by(
-        Conversation.created_at.desc()
-    ).offset(skip).limit(limit).all()
-    
-    return [
-        ConversationList(
-            id=c.id,
-            title=c.title,
-            is_completed=c.is_completed,
-            created_at=c.created_at,
-            message_count=c.message_count or 0
+) -> Response:
+    """
+    List the current user's conversations, newest first.
+
+    Pages are keyed on ``(created_at, id)``: pass the ``X-Next-Cursor`` response
+    header back as ``cursor`` to fetch the next page. ``skip`` is kept for older
+    clients and is ignored when a cursor is given. Responses carry an ETag and
+    honour ``If-None-Match``.
+    """
+    # Changes whenever a conversation is added, removed, updated or gets a message
+    version = (await db.execute(
+        select(
+            func.count(Conversation.id),
+            func.sum(Conversation.message_count),
+            func.max(Conversation.last_message_at),
+            func.max(Conversation.updated_at),
+            func.max(Conversation.created_at),
+        ).where(Conversation.user_id == current_user.id)
+    )).one()
+
+    async def build():
+        query = select(
+            Conversation.id,
+            Conversation.title,
+            Conversation.is_completed,
+            Conversation.created_at,
+            Conversation.message_count,
+            Conversation.last_message_at,
+        ).where(
+            Conversation.user_id == current_user.id
+        ).order_by(
+            Conversation.created_at.desc(),
+            Conversation.id.desc()
         )
-        for c in conversations
-    ]
+        if cursor:
+            created_at, conversation_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(Conversation.created_at, Conversation.id) < tuple_(created_at, conversation_id)
+            )
+        elif skip:
+            query = query.offset(skip)
+
+        # Fetch one extra row to know whether another page exists
+        result = await db.execute(query.limit(limit + 1))
+        conversations = result.all()
+        headers = {}
+        if len(conversations) > limit:
+            conversations = conversations[:limit]
+            last = conversations[-1]
+            headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+        
+        return [
+            ConversationList(
+                id=c.id,
+                title=c.title,
+                is_completed=c.is_completed,
+                created_at=c.created_at,
+                message_count=c.message_count or 0,
+                last_message_at=c.last_message_at
+            )
+            for c in conversations
+        ], headers
+
+    return await response_cache.respond(request, "list_conversations", current_user.id, tuple(version), build)
 
 
 @router.get("/conversations/{conversation_id}", response_model=ConversationSchema)
-def get_conversation(
+async def get_conversation(
+    *,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    conversation_id: str,
+    load: Literal["selectin", "joined", "none"] = "selectin",
+    current_user: User = Depends(deps.get_current_user)
+) -> Response:
+    """
+    Get a specific conversation with all messages.
+
+    ``load`` picks how messages are fetched: ``selectin`` (second IN query),
+    ``joined`` (single LEFT JOIN) or ``none`` (header only, ``messages`` empty).
+    Long conversations should use ``/header`` plus the paged ``/messages``.
+    Responses carry an ETag and honour ``If-None-Match``.
+    """
+    # last_message_at also moves when a streamed reply is checkpointed
+    version = (await db.execute(
+        select(
+            Conversation.updated_at,
+            Conversation.message_count,
+            Conversation.last_message_at,
+        ).where(
+            Conversation.id == conversation_id,
+            Conversation.user_id == current_user.id
+        )
+    )).first()
+    
+    if not version:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    async def build():
+        query = select(Conversation).where(Conversation.id == conversation_id)
+        if load == "selectin":
+            query = query.options(selectinload(Conversation.messages))
+        elif load == "joined":
+            query = query.options(joinedload(Conversation.messages))
+        else:
+            query = query.options(noload(Conversation.messages))
+        result = await db.execute(query)
+        conversation = result.unique().scalars().first()
+        return ConversationSchema.model_validate(conversation), {}
+
+    return await response_cache.respond(
+        request, "get_conversation", current_user.id, (conversation_id, *version), build
+    )
+
+
+@router.get("/conversations/{conversation_id}/header", response_model=ConversationHeader)
+async def get_conversation_header(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     conversation_id: str,
     current_user: User = Depends(deps.get_current_user)
 ) -> Conversation:
-    """Get a specific conversation with all messages."""
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    """Get a conversation's metadata without its messages."""
+    conversation = await _get_user_conversation(db, conversation_id, current_user)
     
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
@@ -129,20 +240,65 @@ def get_conversation(
     return conversation
 
 
-@router.post("/conversations/{conversation_id}/messages", response_model=MessageSchema)
-def create_message(
+@router.get("/conversations/{conversation_id}/messages", response_model=List[MessageSchema])
+async def list_messages(
+    *,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    conversation_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(deps.get_current_user)
+) -> List[Message]:
+    """
+    Page through a conversation's messages from newest to oldest.
+
+    Each page is returned in chronological order. Pass the ``X-Next-Cursor``
+    response header back as ``cursor`` to fetch the next older page.
+    """
+    conversation = await _get_user_conversation(db, conversation_id, current_user)
+    
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    query = select(Message).where(
+        Message.conversation_id == conversation_id
+    ).order_by(
+        Message.created_at.desc(),
+        Message.id.desc()
+    )
+    if cursor:
+        created_at, message_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(Message.created_at, Message.id) < tuple_(created_at, message_id)
+        )
+
+    result = await db.execute(query.limit(limit + 1))
+    messages = result.scalars().all()
+    if len(messages) > limit:
+        messages = messages[:limit]
+        oldest = messages[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(oldest.created_at, oldest.id)
+    
+    messages.reverse()
+    return messages
+
+
+@router.post(
+    "/conversations/{conversation_id}/messages",
+    response_model=MessageSchema,
+    dependencies=[Depends(deps.rate_limit("chat", settings.RATE_LIMIT_CHAT_PER_MINUTE, settings.RATE_LIMIT_CHAT_BURST))],
+)
+async def create_message(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     conversation_id: str,
     message_in: MessageCreate,
     current_user: User = Depends(deps.get_current_user)
 ) -> Message:
     """Add a message to a conversation."""
     # Verify conversation exists and belongs to user
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    conversation = await _get_user_conversation(db, conversation_id, current_user)
     
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
@@ -157,6 +313,7 @@ def create_message(
     
     # For now, just echo back the message (no AI response)
     # In a real implementation, you would call an AI service here
+    latest_reply = message if message_in.role == "assistant" else None
     if message_in.role == "user":
         ai_response = Message(
             conversation_id=conversation_id,
@@ -164,109 +321,174 @@ def create_message(
             content="I understand you want to create an AI model. Let me help you define your requirements. Could you tell me more about what kind of data you'll be working with and what you want the model to do?"
         )
         db.add(ai_response)
+        latest_reply = ai_response
+    if latest_reply is not None:
+        conversation.draft_json_schema = task_schema.extract_schema(latest_reply.content)
     
-    db.commit()
-    db.refresh(message)
+    await db.commit()
+    await response_cache.invalidate(current_user.id)
+    await db.refresh(message)
     return message
 
 
-@router.post("/conversations/{conversation_id}/messages/stream")
-async def create_message_stream(
-    *,
-    db: Session = Depends(get_db),
+async def _prepare_stream(
+    db: AsyncSession,
     conversation_id: str,
     message_in: MessageCreate,
-    current_user: User = Depends(deps.get_current_user)
-):
-    """Stream a message response from OpenAI."""
-    conversation = db.query(Conversation).filter(
-        Conversation.id == conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    current_user: User,
+    trace: Trace,
+) -> context.ContextWindow:
+    """Save the user's message and load the context window for the reply."""
+    with trace.span("load_conversation"):
+        conversation = await _get_user_conversation(db, conversation_id, current_user)
     
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
     # Save the user's message to the database
-    user_message = Message(
-        conversation_id=conversation_id,
-        role="user",
-        content=message_in.content
+    with trace.span("save_user_message"):
+        user_message = Message(
+            conversation_id=conversation_id,
+            role="user",
+            content=message_in.content
+        )
+        db.add(user_message)
+        await db.commit()
+    await response_cache.invalidate(current_user.id)
+
+    # Prepare a token-budgeted context window (recent messages plus running summary)
+    with trace.span("load_history"):
+        return await context.build_context_window(db, conversation)
+
+
+@router.post(
+    "/conversations/{conversation_id}/messages/stream",
+    dependencies=[Depends(deps.rate_limit("chat", settings.RATE_LIMIT_CHAT_PER_MINUTE, settings.RATE_LIMIT_CHAT_BURST))],
+)
+async def create_message_stream(
+    *,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    conversation_id: str,
+    message_in: MessageCreate,
+    current_user: User = Depends(deps.get_current_user),
+    llm: LLMClient = Depends(get_llm_client)
+):
+    """Stream a message response from OpenAI."""
+    trace = Trace("chat_stream", model=CHAT_MODEL, conversation_id=conversation_id)
+    user_id = current_user.id
+
+    # Claimed before any work so a rejected request leaves nothing behind;
+    # released when the stream ends, however it ends
+    stream_slot = await rate_limiter.acquire(
+        STREAM_SCOPE, user_id, settings.MAX_CONCURRENT_STREAMS_PER_USER, settings.STREAM_SLOT_LEASE_SECONDS
     )
-    db.add(user_message)
-    db.commit()
-    db.refresh(user_message)
+    try:
+        window = await _prepare_stream(db, conversation_id, message_in, current_user, trace)
+    except BaseException:
+        await asyncio.shield(rate_limiter.release(STREAM_SCOPE, user_id, stream_slot))
+        raise
+    messages_for_openai = window.to_openai_messages(SYSTEM_PROMPT)
 
-    # Prepare message history for OpenAI
-    history = db.query(Message).filter(Message.conversation_id == conversation_id).order_by(Message.created_at).all()
-    messages_for_openai = [{"role": "system", "content": SYSTEM_PROMPT}]
-    messages_for_openai.extend([{"role": m.role, "content": m.content} for m in history])
+    assistant_message_id = str(uuid.uuid4())
 
     async def generate():
+        loop = asyncio.get_running_loop()
+        chunks: List[str] = []
+        usage = Usage()
+        extractor = task_schema.SchemaExtractor()
+        completed = False
+        first_token_at = None
         try:
-            response = await openai.ChatCompletion.acreate(
-                model="gpt-4o-mini",
-                messages=messages_for_openai,
-                stream=True
+            last_checkpoint = loop.time()
+            stream = coalesce(
+                llm.stream(CHAT_MODEL, messages_for_openai, usage),
+                settings.SSE_COALESCE_MS / 1000,
+                settings.SSE_COALESCE_BYTES,
             )
-            
-            assistant_response_content = ""
-            async for chunk in response:
-                content = chunk['choices'][0]['delta'].get('content', '')
-                assistant_response_content += content
-                yield f"data: {json.dumps(content)}\n\n"
-            
-            # Save the full response from the assistant
-            assistant_message = Message(
-                conversation_id=conversation_id,
-                role="assistant",
-                content=assistant_response_content
-            )
-            db.add(assistant_message)
-            db.commit()
+            async with aclosing(stream):
+                # Deltas arriving close together go out as one frame
+                async for group in stream:
+                    if first_token_at is None:
+                        first_token_at = trace.elapsed()
+                        trace.record("time_to_first_token", first_token_at)
+                    chunks.extend(group)
+                    delta = "".join(group)
+                    yield sse_event(delta)
+                    schema = extractor.feed(delta)
+                    if schema is not None:
+                        # Lets the client show the schema before the reply finishes
+                        yield sse_event({"type": "schema", "schema": schema})
+
+                    # Periodically persist the partial reply so a disconnect doesn't lose it
+                    if loop.time() - last_checkpoint >= settings.STREAM_CHECKPOINT_INTERVAL_SECONDS:
+                        message_writer.checkpoint(assistant_message_id, conversation_id, "".join(chunks), user_id)
+                        last_checkpoint = loop.time()
+            completed = True
+
+            if window.needs_summary and window.starts_at is not None:
+                context.schedule_summary_refresh(llm, conversation_id, window.starts_at)
 
         except Exception as e:
             error_message = f"ERROR: {str(e)}"
-            yield f"data: {json.dumps(error_message)}\n\n"
+            yield sse_event(error_message)
         finally:
-            yield "data: [DONE]\n\n"
-    
-    return StreamingResponse(generate(), media_type="text/event-stream")
+            # Runs on completion, errors and client disconnects alike
+            if first_token_at is not None:
+                trace.record("generation", trace.elapsed() - first_token_at)
+            if chunks:
+                if not usage.reported:
+                    # Cut short before the provider sent its counts; each delta is about one token
+                    usage.prompt_tokens = context.estimate_prompt_tokens(messages_for_openai)
+                    usage.completion_tokens = len(chunks)
+                message_writer.finalize(
+                    assistant_message_id,
+                    conversation_id,
+                    "".join(chunks),
+                    is_complete=completed,
+                    model=CHAT_MODEL,
+                    prompt_tokens=usage.prompt_tokens,
+                    completion_tokens=usage.completion_tokens,
+                    user_id=user_id,
+                    json_schema=extractor.schema,
+                )
+            trace.finish()
+            # A client disconnect cancels this generator; finish the release
+            # (a round trip with Redis) anyway, or the slot is held for the lease
+            await asyncio.shield(rate_limiter.release(STREAM_SCOPE, user_id, stream_slot))
+        yield "data: [DONE]\n\n"
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if settings.SSE_GZIP_ENABLED:
+        headers["Vary"] = "Accept-Encoding"
+        if accepts_gzip(request.headers.get("accept-encoding")):
+            headers["Content-Encoding"] = "gzip"
+            body = metered(gzip_frames(generate()), "gzip")
+            return StreamingResponse(body, media_type="text/event-stream", headers=headers)
+    body = metered(generate(), "identity")
+    return StreamingResponse(body, media_type="text/event-stream", headers=headers)
 
 
 @router.post("/task-definitions", response_model=TaskDefinitionSchema)
-def create_task_definition(
+async def create_task_definition(
     *,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     task_in: TaskDefinitionCreate,
     current_user: User = Depends(deps.get_current_user)
 ) -> TaskDefinition:
-    """Create a task definition from a conversation."""
+    """
+    Create a task definition from a conversation. Its recommended models are
+    filled in by a job, whose id is returned in the ``Job-Id`` header.
+    """
     # Verify conversation exists and belongs to user
-    conversation = db.query(Conversation).filter(
-        Conversation.id == task_in.conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
+    conversation = await _get_user_conversation(db, task_in.conversation_id, current_user)
     
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    # Extract JSON schema from the last AI message
-    last_ai_message = db.query(Message).filter(
-        Message.conversation_id == task_in.conversation_id,
-        Message.role == "assistant"
-    ).order_by(Message.created_at.desc()).first()
-    
-    json_schema = None
-    if last_ai_message:
-        # Simple extraction of JSON from message
-        import re
-        json_match = re.search(r'```json\s*([\s\S]*?)\s*```', last_ai_message.content)
-        if json_match:
-            try:
-                json_schema = json.loads(json_match.group(1))
-            except:
-                pass
+    # Extracted from the latest assistant reply as it was written
+    json_schema = conversation.draft_json_schema
     
     # Create task definition
     task_definition = TaskDefinition(
@@ -275,13 +497,23 @@ def create_task_definition(
         name=task_in.name,
         description=task_in.description,
         json_schema=json_schema,
-        recommended_models=["gpt-4", "claude-2", "llama-2"]  # Example recommendations
+        schema_hash=keywords.schema_hash(json_schema) if json_schema is not None else None,
     )
     db.add(task_definition)
+    await db.flush()
+    job = await jobs.enqueue(
+        db,
+        "task_definition.finalize",
+        {"task_definition_id": task_definition.id},
+        user_id=current_user.id,
+        idempotency_key=task_definition.id,
+    )
+    response.headers[JOB_ID_HEADER] = job.id
     
     # Mark conversation as completed
     conversation.is_completed = True
     
-    db.commit()
-    db.refresh(task_definition)
+    await db.commit()
+    await response_cache.invalidate(current_user.id)
+    await db.refresh(task_definition)
     return task_definition 
\ No newline at end of file
@@ -0,0 +1,208 @@
+import asyncio
+import re
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.api.v1.endpoints.jobs import JOB_ID_HEADER
+from app.core.config import settings
+from app.db.session import get_db
+from app.models.conversation import TaskDefinition
+from app.models.dataset import Dataset
+from app.models.user import User
+from app.schemas.dataset import (
+    Dataset as DatasetSchema,
+    DatasetCreate,
+    DatasetEditResult,
+    DatasetEdits,
+    DatasetRows,
+)
+from app.services import datasets
+
+router = APIRouter()
+
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+
+async def _get_user_dataset(db: AsyncSession, dataset_id: str, current_user: User) -> Dataset:
+    result = await db.execute(
+        select(Dataset).where(Dataset.id == dataset_id, Dataset.user_id == current_user.id)
+    )
+    dataset = result.scalars().first()
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return dataset
+
+
+def _require_ready(dataset: Dataset) -> None:
+    if dataset.status != "ready":
+        raise HTTPException(status_code=409, detail=f"Dataset is not ready (status: {dataset.status})")
+
+
+def _range_start(content_range: Optional[str], dataset: Dataset) -> int:
+    """Offset of an upload from its ``Content-Range`` header; a request without one starts at 0."""
+    if not content_range:
+        return 0
+    match = _CONTENT_RANGE.fullmatch(content_range.strip())
+    if not match:
+        raise HTTPException(status_code=400, detail="Invalid Content-Range header")
+    start, end, total = match.groups()
+    if int(end) < int(start) or (total != "*" and int(total) != dataset.size_bytes):
+        raise HTTPException(status_code=400, detail="Content-Range doesn't match the dataset size")
+    return int(start)
+
+
+@router.post("", response_model=DatasetSchema)
+async def create_dataset(
+    *,
+    db: AsyncSession = Depends(get_db),
+    dataset_in: DatasetCreate,
+    current_user: User = Depends(deps.get_current_user)
+) -> Dataset:
+    """Register a dataset upload; send its content with ``PUT /datasets/{id}/content``."""
+    if dataset_in.size_bytes > settings.DATASET_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Datasets are limited to {settings.DATASET_MAX_BYTES} bytes")
+    file_format = dataset_in.format or datasets.infer_format(dataset_in.filename)
+    if file_format is None:
+        raise HTTPException(status_code=400, detail="Unknown file type; pass format as csv, json, jsonl or text")
+    if dataset_in.task_definition_id is not None:
+        task_definition = await db.get(TaskDefinition, dataset_in.task_definition_id)
+        if task_definition is None or task_definition.user_id != current_user.id:
+            raise HTTPException(status_code=404, detail="Task definition not found")
+
+    dataset = Dataset(
+        user_id=current_user.id,
+        task_definition_id=dataset_in.task_definition_id,
+        filename=dataset_in.filename,
+        format=file_format,
+        size_bytes=dataset_in.size_bytes,
+        label_column=dataset_in.label_column,
+    )
+    db.add(dataset)
+    await db.flush()
+    await asyncio.to_thread(datasets.create_file, dataset.id)
+    await db.commit()
+    await db.refresh(dataset)
+    return dataset
+
+
+@router.put("/{dataset_id}/content", response_model=DatasetSchema)
+async def upload_dataset_content(
+    *,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    dataset_id: str,
+    current_user: User = Depends(deps.get_current_user)
+) -> Dataset:
+    """
+    Append content to a dataset. An upload may be split across requests, each
+    with ``Content-Range: bytes <start>-<end>/<size>``; ``start`` must equal the
+    dataset's ``received_bytes``, which is also where an interrupted upload
+    resumes. The request with the last byte queues the dataset's processing
+    job, whose id is returned in the ``Job-Id`` header.
+    """
+    dataset = await _get_user_dataset(db, dataset_id, current_user)
+    if dataset.status != "uploading":
+        raise HTTPException(status_code=409, detail="Dataset upload is already complete")
+    start = _range_start(request.headers.get("content-range"), dataset)
+    if start != dataset.received_bytes:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload must resume at byte {dataset.received_bytes}",
+            headers={"Upload-Offset": str(dataset.received_bytes)},
+        )
+    # Don't hold a pooled connection for the length of the upload
+    await db.commit()
+
+    try:
+        written = await datasets.write_content(dataset, start, request.stream())
+    except datasets.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    received = start + written
+    status = "uploaded" if received == dataset.size_bytes else "uploading"
+    # Only applies if no other request moved the offset in the meantime
+    result = await db.execute(
+        update(Dataset)
+        .where(Dataset.id == dataset.id, Dataset.received_bytes == start, Dataset.status == "uploading")
+        .values(received_bytes=received, status=status)
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Dataset was modified by a concurrent upload")
+    if status == "uploaded":
+        # Queued in the same transaction, so a completed upload always gets processed
+        job = await datasets.enqueue_processing(db, dataset)
+        response.headers[JOB_ID_HEADER] = job.id
+    await db.commit()
+    await db.refresh(dataset)
+    return dataset
+
+
+@router.get("", response_model=List[DatasetSchema])
+async def list_datasets(
+    *,
+    db: AsyncSession = Depends(get_db),
+    task_definition_id: Optional[str] = None,
+    current_user: User = Depends(deps.get_current_user)
+) -> List[Dataset]:
+    """List the current user's datasets, newest first."""
+    query = select(Dataset).where(Dataset.user_id == current_user.id)
+    if task_definition_id is not None:
+        query = query.where(Dataset.task_definition_id == task_definition_id)
+    result = await db.execute(query.order_by(Dataset.created_at.desc(), Dataset.id.desc()))
+    return result.scalars().all()
+
+
+@router.get("/{dataset_id}", response_model=DatasetSchema)
+async def get_dataset(
+    *,
+    db: AsyncSession = Depends(get_db),
+    dataset_id: str,
+    current_user: User = Depends(deps.get_current_user)
+) -> Dataset:
+    """Get a dataset with its upload progress and, once processed, its profile."""
+    return await _get_user_dataset(db, dataset_id, current_user)
+
+
+@router.get("/{dataset_id}/rows", response_model=DatasetRows)
+async def get_dataset_rows(
+    *,
+    db: AsyncSession = Depends(get_db),
+    dataset_id: str,
+    start: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(deps.get_current_user)
+) -> DatasetRows:
+    """
+    Rows ``start`` to ``start + limit`` of a processed dataset, with cell edits
+    applied. Reads go through the row offset index, so any page costs the same.
+    """
+    dataset = await _get_user_dataset(db, dataset_id, current_user)
+    _require_ready(dataset)
+    columns, rows, total = await datasets.read_rows(db, dataset, start, limit)
+    return DatasetRows(columns=columns, start=start, total_rows=total, rows=rows)
+
+
+@router.patch("/{dataset_id}/rows", response_model=DatasetEditResult)
+async def edit_dataset_rows(
+    *,
+    db: AsyncSession = Depends(get_db),
+    dataset_id: str,
+    edits_in: DatasetEdits,
+    current_user: User = Depends(deps.get_current_user)
+) -> DatasetEditResult:
+    """Apply a batch of cell edits. They are stored as deltas; the uploaded file is left as is."""
+    dataset = await _get_user_dataset(db, dataset_id, current_user)
+    _require_ready(dataset)
+    try:
+        applied = await datasets.apply_edits(
+            db, dataset, [(edit.row, edit.column, edit.value) for edit in edits_in.edits]
+        )
+    except datasets.InvalidEdit as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+    return DatasetEditResult(applied=applied)
@@ -0,0 +1,49 @@
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.db.session import get_db
+from app.models.job import Job
+from app.models.user import User
+from app.schemas.job import Job as JobSchema
+
+router = APIRouter()
+
+# Set on responses that queued a job, for polling GET /jobs/{id}
+JOB_ID_HEADER = "Job-Id"
+
+
+@router.get("", response_model=List[JobSchema])
+async def list_jobs(
+    *,
+    db: AsyncSession = Depends(get_db),
+    kind: Optional[str] = None,
+    status: Optional[Literal["queued", "running", "succeeded", "failed"]] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(deps.get_current_user)
+) -> List[Job]:
+    """List the current user's jobs, newest first."""
+    query = select(Job).where(Job.user_id == current_user.id)
+    if kind is not None:
+        query = query.where(Job.kind == kind)
+    if status is not None:
+        query = query.where(Job.status == status)
+    result = await db.execute(query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit))
+    return result.scalars().all()
+
+
+@router.get("/{job_id}", response_model=JobSchema)
+async def get_job(
+    *,
+    db: AsyncSession = Depends(get_db),
+    job_id: str,
+    current_user: User = Depends(deps.get_current_user)
+) -> Job:
+    """Poll a job for its status, progress and, once it has succeeded, its result."""
+    result = await db.execute(select(Job).where(Job.id == job_id, Job.user_id == current_user.id))
+    job = result.scalars().first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.db.session import get_db
+from app.models.user import User
+from app.schemas.transfer import ImportResult
+from app.services import transfer
+from app.services.response_cache import response_cache
+
+router = APIRouter()
+
+
+@router.get("/conversations/export")
+async def export_conversations(
+    *,
+    current_user: User = Depends(deps.get_current_user)
+) -> StreamingResponse:
+    """Stream all of the user's conversations, messages and task definitions as NDJSON."""
+    return StreamingResponse(
+        transfer.export_ndjson(current_user.id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="conversations.ndjson"'},
+    )
+
+
+@router.post("/conversations/import", response_model=ImportResult)
+async def import_conversations(
+    *,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(deps.get_current_user)
+) -> ImportResult:
+    """
+    Import an NDJSON export (the request body) as new conversations of the user.
+    The import is all or nothing: any invalid line rejects the whole file.
+    """
+    try:
+        result = await transfer.import_ndjson(db, current_user.id, request.stream())
+    except transfer.ImportFailed as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    await db.commit()
+    await response_cache.invalidate(current_user.id)
+    return result
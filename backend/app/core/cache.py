@@ -0,0 +1,134 @@
+"""
+Caching primitives.
+
+``TTLCache`` is a thread-safe in-process LRU whose entries expire after a TTL.
+``CacheBackend`` is the async interface for caches that may be shared between
+worker processes; ``LocalCacheBackend`` is the in-process stand-in used when no
+shared store is configured, ``RedisCacheBackend`` talks to Redis.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from app.core import json
+from app.core.config import settings
+
+try:  # Optional dependency, only needed for CACHE_BACKEND=redis
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover
+    aioredis = None
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheBackend:
+    """Async key/value cache; values must be JSON serializable."""
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+
+class LocalCacheBackend(CacheBackend):
+    """Process-local stand-in for a shared cache."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+
+class RedisCacheBackend(CacheBackend):
+    def __init__(self, url: str, namespace: str):
+        if aioredis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self._client = aioredis.from_url(url)
+        self._namespace = namespace
+
+    def _key(self, key: str) -> str:
+        return f"metra:{self._namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self._client.get(self._key(key))
+        return None if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: float) -> None:
+        await self._client.set(self._key(key), json.dumps(value), px=int(ttl * 1000))
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self._key(key))
+
+
+def create_cache_backend(namespace: str, maxsize: int, ttl: float) -> CacheBackend:
+    """Build the cache backend selected by ``settings.CACHE_BACKEND``."""
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(settings.REDIS_URL, namespace)
+    return LocalCacheBackend(maxsize=maxsize, ttl=ttl)
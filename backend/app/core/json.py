@@ -0,0 +1,76 @@
+"""
+JSON encoding for responses, SSE events and caches.
+
+Uses orjson when it is installed and ``FAST_JSON_ENABLED`` is on, otherwise
+the standard library. Pydantic models are dumped by pydantic-core directly
+instead of going through ``jsonable_encoder``. Output is compact UTF-8;
+orjson doesn't escape non-ASCII characters, which is equally valid JSON.
+"""
+import datetime
+import decimal
+import enum
+import json
+import uuid
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+try:  # Optional dependency; falls back to the stdlib encoder
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+FAST_JSON = orjson is not None and settings.FAST_JSON_ENABLED
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def _default(obj: Any) -> Any:
+    """Encode what neither encoder handles natively (orjson covers datetimes, UUIDs and enums)."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> str:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump_json()
+    if FAST_JSON:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode("utf-8")
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    if FAST_JSON and not isinstance(obj, BaseModel):
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+    return dumps(obj).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    if FAST_JSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def sse_event(data: Any) -> str:
+    """One server-sent event carrying ``data`` as JSON."""
+    return f"data: {dumps(data)}\n\n"
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class; renders through ``dumps_bytes``."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
@@ -0,0 +1,200 @@
+"""
+Per-user rate limits and concurrency quotas.
+
+A token bucket per (scope, user) bounds the sustained request rate while
+allowing short bursts, and counted slots cap long-lived requests such as SSE
+streams. State lives in a ``RateLimitBackend``: ``LocalRateLimitBackend`` keeps
+it in-process (limits then apply per worker), ``RedisRateLimitBackend`` shares
+it between workers. The backend follows ``CACHE_BACKEND``.
+"""
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+try:  # Optional dependency, only needed for CACHE_BACKEND=redis
+    import redis.asyncio as aioredis
+except ImportError:  # pragma: no cover
+    aioredis = None
+
+rate_limit_rejections_total = registry.counter(
+    "rate_limit_rejections_total",
+    "Requests rejected with 429 by scope and reason (rate or concurrency).",
+    ["scope", "reason"],
+)
+
+
+class RateLimitExceeded(Exception):
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RateLimitBackend:
+    async def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        """Take ``cost`` tokens; return 0 if allowed, else the seconds until they are available."""
+        raise NotImplementedError
+
+    async def acquire_slot(self, key: str, limit: int, lease: float) -> Optional[str]:
+        """Claim one of ``limit`` slots for at most ``lease`` seconds; return its token, or None if all are taken."""
+        raise NotImplementedError
+
+    async def release_slot(self, key: str, token: str) -> None:
+        raise NotImplementedError
+
+
+class LocalRateLimitBackend(RateLimitBackend):
+    """Process-local stand-in for a shared rate limit store."""
+
+    def __init__(self, maxsize: int = 100_000, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        # key -> (tokens, updated_at); least recently used buckets are dropped first
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        # key -> {token: expires_at}
+        self._slots: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        now = self._clock()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated_at) * rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return wait
+
+    async def acquire_slot(self, key: str, limit: int, lease: float) -> Optional[str]:
+        now = self._clock()
+        with self._lock:
+            slots = {token: expires for token, expires in self._slots.get(key, {}).items() if expires > now}
+            if len(slots) >= limit:
+                self._slots[key] = slots
+                return None
+            token = uuid.uuid4().hex
+            slots[token] = now + lease
+            self._slots[key] = slots
+            return token
+
+    async def release_slot(self, key: str, token: str) -> None:
+        with self._lock:
+            slots = self._slots.get(key)
+            if slots is not None:
+                slots.pop(token, None)
+                if not slots:
+                    del self._slots[key]
+
+
+# Token bucket in one round trip; uses the server clock so workers agree on time
+_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+# Slots are members of a sorted set scored by lease expiry, so slots of a
+# crashed worker free themselves
+_ACQUIRE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local lease = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + lease, ARGV[3])
+redis.call('PEXPIRE', KEYS[1], math.ceil(lease * 1000))
+return 1
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    def __init__(self, url: str):
+        if aioredis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self._client = aioredis.from_url(url)
+        self._take = self._client.register_script(_TAKE_SCRIPT)
+        self._acquire = self._client.register_script(_ACQUIRE_SCRIPT)
+
+    @staticmethod
+    def _key(kind: str, key: str) -> str:
+        return f"metra:ratelimit:{kind}:{key}"
+
+    async def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        wait = await self._take(keys=[self._key("bucket", key)], args=[rate, burst, cost])
+        return float(wait)
+
+    async def acquire_slot(self, key: str, limit: int, lease: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        acquired = await self._acquire(keys=[self._key("slots", key)], args=[limit, lease, token])
+        return token if acquired else None
+
+    async def release_slot(self, key: str, token: str) -> None:
+        await self._client.zrem(self._key("slots", key), token)
+
+
+def create_rate_limit_backend() -> RateLimitBackend:
+    if settings.CACHE_BACKEND == "redis":
+        return RedisRateLimitBackend(settings.REDIS_URL)
+    return LocalRateLimitBackend()
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend):
+        self.backend = backend
+
+    async def check(self, scope: str, user_id: str, per_minute: float, burst: int) -> None:
+        """Charge one request to the user's bucket for ``scope``; raise if it is empty."""
+        if not settings.RATE_LIMIT_ENABLED or per_minute <= 0:
+            return
+        wait = await self.backend.take(f"{scope}:{user_id}", per_minute / 60.0, burst)
+        if wait > 0:
+            rate_limit_rejections_total.inc(scope=scope, reason="rate")
+            raise RateLimitExceeded("Too many requests, please slow down", retry_after=wait)
+
+    async def acquire(self, scope: str, user_id: str, limit: int, lease: float) -> Optional[str]:
+        """Claim a concurrency slot; the returned token must be passed to ``release``."""
+        if not settings.RATE_LIMIT_ENABLED or limit <= 0:
+            return None
+        token = await self.backend.acquire_slot(f"{scope}:{user_id}", limit, lease)
+        if token is None:
+            rate_limit_rejections_total.inc(scope=scope, reason="concurrency")
+            raise RateLimitExceeded(
+                f"At most {limit} concurrent requests allowed, please retry shortly", retry_after=1
+            )
+        return token
+
+    async def release(self, scope: str, user_id: str, token: Optional[str]) -> None:
+        if token is not None:
+            await self.backend.release_slot(f"{scope}:{user_id}", token)
+
+
+rate_limiter = RateLimiter(create_rate_limit_backend())
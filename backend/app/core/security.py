@@ -1,12 +1,17 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union
+from typing import Any, Optional, Tuple, Union
 
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.metrics import registry
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
 
 
 def create_access_token(
@@ -28,4 +33,78 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password) 
\ No newline at end of file
+    return pwd_context.hash(password)
+
+
+class PasswordHashingOverloaded(Exception):
+    """Raised when too many hash/verify calls are already queued."""
+
+    retry_after = 1
+
+
+password_hash_pending = registry.gauge(
+    "password_hash_pending",
+    "Password hash/verify calls queued or running on the hashing pool.",
+)
+password_hash_rejected_total = registry.counter(
+    "password_hash_rejected_total",
+    "Password hash/verify calls shed because the queue was full.",
+)
+
+_executor: Optional[Executor] = None
+_pending = 0
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if settings.PASSWORD_HASH_USE_PROCESSES:
+            _executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix="password-hash",
+            )
+    return _executor
+
+
+def shutdown_password_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def _run_on_hash_pool(func, *args):
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_MAX_PENDING:
+        password_hash_rejected_total.inc()
+        raise PasswordHashingOverloaded()
+    _pending += 1
+    password_hash_pending.set(_pending)
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), func, *args)
+    finally:
+        _pending -= 1
+        password_hash_pending.set(_pending)
+
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password on the hashing pool.
+
+    Returns ``(valid, new_hash)``; ``new_hash`` is set when the stored hash
+    uses outdated ``pwd_context`` parameters and should be replaced.
+    """
+    return await _run_on_hash_pool(_verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_on_hash_pool(get_password_hash, password)
@@ -0,0 +1,144 @@
+"""
+Helpers for server-sent event streams.
+
+``coalesce`` batches small deltas so a reply goes out in fewer, larger frames.
+``gzip_frames`` compresses a stream of frames with a sync flush after each one,
+so compression never holds a frame back from the client.
+"""
+import asyncio
+import zlib
+from contextlib import aclosing, suppress
+from typing import AsyncIterator, List, Optional, Union
+
+from app.core.metrics import registry
+
+# zlib window bits for a gzip container
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+_END = object()
+# Queued by the timer when the pending group's interval is up
+_TICK = object()
+
+
+class _Failed:
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+sse_frames_per_reply = registry.histogram(
+    "sse_frames_per_reply",
+    "Frames written per streamed reply.",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+sse_bytes_per_reply = registry.histogram(
+    "sse_bytes_per_reply",
+    "Bytes written per streamed reply, by content encoding.",
+    ["encoding"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144),
+)
+
+
+async def coalesce(source: AsyncIterator[str], interval: float, max_bytes: int) -> AsyncIterator[List[str]]:
+    """
+    Group the deltas of ``source``. A group is released once ``interval``
+    seconds have passed since the previous one (even if no new delta arrives)
+    or once it reaches ``max_bytes``. With ``interval`` 0 every delta is its
+    own group. The first delta usually goes out at once, since the interval is
+    counted from the start of the stream.
+    """
+    if interval <= 0:
+        async with aclosing(source):
+            async for delta in source:
+                yield [delta]
+        return
+
+    loop = asyncio.get_running_loop()
+    # One task reads the source for the whole stream; a task per delta (to
+    # wait on it with a timeout) costs more CPU than coalescing saves
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump() -> None:
+        try:
+            async for delta in source:
+                queue.put_nowait(delta)
+        except Exception as e:
+            queue.put_nowait(_Failed(e))
+        else:
+            queue.put_nowait(_END)
+
+    reader = loop.create_task(pump())
+    group: List[str] = []
+    size = 0
+    last_release = loop.time()
+    timer: Optional[asyncio.TimerHandle] = None
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                break
+            if isinstance(item, _Failed):
+                # Deliver what arrived before the failure first
+                if group:
+                    yield group
+                raise item.error
+            if item is not _TICK:
+                group.append(item)
+                size += len(item.encode("utf-8"))
+                if size < max_bytes and loop.time() - last_release < interval:
+                    if timer is None:
+                        timer = loop.call_later(last_release + interval - loop.time(), queue.put_nowait, _TICK)
+                    continue
+            if timer is not None:
+                timer.cancel()
+                timer = None
+            if group:
+                released, group, size = group, [], 0
+                last_release = loop.time()
+                yield released
+        if group:
+            yield group
+    finally:
+        if timer is not None:
+            timer.cancel()
+        reader.cancel()
+        with suppress(BaseException):
+            await reader
+        await source.aclose()
+
+
+async def gzip_frames(frames: AsyncIterator[str], level: int = 6) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    async with aclosing(frames):
+        async for frame in frames:
+            yield compressor.compress(frame.encode("utf-8")) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an ``Accept-Encoding`` header allows gzip (``q=0`` opts out)."""
+    for coding in (accept_encoding or "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() not in ("gzip", "x-gzip"):
+            continue
+        key, _, value = params.partition("=")
+        if key.strip().lower() == "q":
+            try:
+                return float(value) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+async def metered(body: AsyncIterator[Union[str, bytes]], encoding: str) -> AsyncIterator[Union[str, bytes]]:
+    """Pass ``body`` through, recording its frame count and size once it ends."""
+    frames = size = 0
+    try:
+        async with aclosing(body):
+            async for chunk in body:
+                frames += 1
+                size += len(chunk) if isinstance(chunk, bytes) else len(chunk.encode("utf-8"))
+                yield chunk
+    finally:
+        sse_frames_per_reply.observe(frames)
+        sse_bytes_per_reply.observe(size, encoding=encoding)
@@ -0,0 +1,78 @@
+"""
+Lightweight per-operation tracing.
+
+A ``Trace`` times the stages of one operation (e.g. one chat stream). Every
+stage is recorded in the ``stage_duration_seconds`` histogram, tagged with the
+operation, stage and model, and the whole trace is logged at DEBUG level when
+it finishes. When ``opentelemetry`` is installed each stage is also exported
+as a span.
+"""
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from app.core.metrics import registry
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # pragma: no cover - optional dependency
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+stage_duration_seconds = registry.histogram(
+    "stage_duration_seconds",
+    "Duration of the instrumented stages of an operation.",
+    ["operation", "stage", "model"],
+    buckets=STAGE_BUCKETS,
+)
+
+_tracer = otel_trace.get_tracer("metra") if otel_trace is not None else None
+
+
+class Trace:
+    def __init__(self, operation: str, model: str = "", **attributes: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.operation = operation
+        self.model = model
+        self.attributes: Dict[str, str] = attributes
+        self.stages: List[Tuple[str, float]] = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        otel_span = self._start_otel_span(stage)
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+            if otel_span is not None:
+                otel_span.end()
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Record a stage that was timed by the caller (e.g. across ``yield``s)."""
+        self.stages.append((stage, seconds))
+        stage_duration_seconds.observe(seconds, operation=self.operation, stage=stage, model=self.model)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    def finish(self) -> None:
+        self.record("total", self.elapsed())
+        if logger.isEnabledFor(logging.DEBUG):
+            timings = " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in self.stages)
+            logger.debug("trace=%s operation=%s model=%s %s", self.trace_id, self.operation, self.model, timings)
+
+    def _start_otel_span(self, stage: str) -> Optional[object]:
+        if _tracer is None:
+            return None
+        # Not made the current span: stages may straddle the yields of a streaming response
+        return _tracer.start_span(
+            f"{self.operation}.{stage}",
+            attributes={"trace_id": self.trace_id, "model": self.model, **self.attributes},
+        )
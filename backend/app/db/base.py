@@ -3,4 +3,7 @@
 
 from app.db.base_class import Base  # noqa
 from app.models.user import User  # noqa
-from app.models.conversation import Conversation, Message, TaskDefinition  # noqa 
\ No newline at end of file
+from app.models.conversation import Conversation, Message, TaskDefinition  # noqa
+from app.models.usage import UsageAggregate, UsageEvent  # noqa
+from app.models.dataset import Dataset, DatasetCellEdit  # noqa
+from app.models.job import Job  # noqa
@@ -0,0 +1,87 @@
+"""
+Connection pool classes that report checkout wait time, timeouts and
+occupancy to the metrics registry.
+"""
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.metrics import registry
+
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+pool_checkout_wait_seconds = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    ["pool"],
+    buckets=POOL_WAIT_BUCKETS,
+)
+pool_checkout_timeouts_total = registry.counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT.",
+    ["pool"],
+)
+pool_checkouts_total = registry.counter(
+    "db_pool_checkouts_total",
+    "Connections handed out by the pool.",
+    ["pool"],
+)
+pool_connects_total = registry.counter(
+    "db_pool_connects_total",
+    "New DBAPI connections opened by the pool.",
+    ["pool"],
+)
+pool_checked_out = registry.gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool.",
+    ["pool"],
+)
+pool_overflow = registry.gauge(
+    "db_pool_overflow",
+    "Connections currently open beyond pool_size (negative while the pool is still filling).",
+    ["pool"],
+)
+pool_size = registry.gauge(
+    "db_pool_size",
+    "Configured pool size.",
+    ["pool"],
+)
+
+
+class _InstrumentedPoolMixin:
+    metrics_label = "default"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_checkout_timeouts_total.inc(pool=self.metrics_label)
+            raise
+        finally:
+            pool_checkout_wait_seconds.observe(time.perf_counter() - start, pool=self.metrics_label)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    metrics_label = "sync"
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+def instrument_pool(pool: Pool, label: str) -> None:
+    """Register scrape-time gauges and event counters for ``pool``."""
+    if isinstance(pool, QueuePool):
+        pool_checked_out.set_function(pool.checkedout, pool=label)
+        pool_overflow.set_function(pool.overflow, pool=label)
+        pool_size.set_function(pool.size, pool=label)
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_checkouts_total.inc(pool=label)
+
+    @event.listens_for(pool, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        pool_connects_total.inc(pool=label)
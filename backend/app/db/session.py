@@ -1,18 +1,83 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
+from app.db.pool import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedQueuePool,
+    instrument_pool,
+)
 
 # Handle both postgres:// and postgresql:// URLs
 database_url = settings.DATABASE_URL
 if database_url.startswith("postgres://"):
     database_url = database_url.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(database_url)
+
+def _async_url(url: str) -> str:
+    """Map a sync database URL onto its asyncio driver."""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql+psycopg2://"):
+        return url.replace("postgresql+psycopg2://", "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+
+def _engine_options(url: str, is_async: bool) -> dict:
+    """Pool and connection settings shared by the sync and async engines."""
+    if url.startswith("sqlite"):
+        # SQLite uses SQLAlchemy's own pool selection; pool sizing does not apply
+        return {}
+
+    options = {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if settings.DB_STATEMENT_TIMEOUT_MS and url.startswith("postgresql"):
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+async_database_url = _async_url(database_url)
+
+# Sync engine, used by scripts such as init_db.py
+engine = create_engine(database_url, **_engine_options(database_url, is_async=False))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_pool(engine.pool, "sync")
+
+# Async engine, used by the API so handlers never block the event loop
+async_engine = create_async_engine(
+    async_database_url, **_engine_options(async_database_url, is_async=True)
+)
+instrument_pool(async_engine.sync_engine.pool, "async")
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 
-def get_db():
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
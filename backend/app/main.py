@@ -1,12 +1,24 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.api.v1.endpoints.jobs import JOB_ID_HEADER
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.core.json import FastJSONResponse
+from app.core.metrics import registry
+from app.core.rate_limit import RateLimitExceeded
+from app.core.security import PasswordHashingOverloaded, shutdown_password_executor
+from app.services.llm import close_llm_client, get_llm_client
+from app.services.jobs import job_worker
+from app.services.message_writer import message_writer
+from app.services.model_catalog import model_catalog
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=FastJSONResponse,
 )
 
 # Set all CORS enabled origins
@@ -17,17 +29,56 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, JOB_ID_HEADER, "Retry-After", "Upload-Offset"],
     )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+
+@app.exception_handler(PasswordHashingOverloaded)
+async def password_hashing_overloaded_handler(request: Request, exc: PasswordHashingOverloaded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many authentication requests, please retry shortly"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.get("/")
 def root():
     return {"message": "Metra Backend API"}
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # Add startup event for debugging
 @app.on_event("startup")
 async def startup_event():
     print("FastAPI application started successfully!")
     print(f"CORS origins: {settings.BACKEND_CORS_ORIGINS}")
-    print(f"API version: {settings.API_V1_STR}") 
\ No newline at end of file
+    print(f"API version: {settings.API_V1_STR}")
+    get_llm_client()
+    message_writer.start()
+    model_catalog.start()
+    if settings.JOB_WORKER_EMBEDDED:
+        job_worker.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await message_writer.stop()
+    await model_catalog.stop()
+    await job_worker.stop()
+    await close_llm_client()
+    shutdown_password_executor()
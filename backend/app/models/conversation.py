@@ -1,11 +1,16 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text, JSON, Integer
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text, JSON, Integer, Index, event, update
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, true
 import uuid
+from datetime import datetime, timezone
 
 from app.db.base_class import Base
 
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class Conversation(Base):
     __tablename__ = "conversations"
     
@@ -13,12 +18,35 @@ class Conversation(Base):
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     title = Column(String, nullable=True)
     is_completed = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Running summary of messages that have slid out of the prompt context window
+    summary = Column(Text, nullable=True)
+    # (created_at, id) of the newest message folded into the summary
+    summarized_until = Column(DateTime(timezone=True), nullable=True)
+    summarized_until_id = Column(String, nullable=True)
+    # Schema from the latest assistant reply, promoted when the task definition is created
+    draft_json_schema = Column(JSON, nullable=True)
+    # Denormalized from messages, maintained on message insert
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_message_at = Column(DateTime(timezone=True), nullable=True)
+    # Set by the app so the (created_at, id) paging key follows creation order; see Message
+    created_at = Column(DateTime(timezone=True), default=_utcnow, server_default=func.now())
+    # Also set by the app: conversation ETags derive from it, and every write
+    # (including the message listener's counter update) must move it
+    updated_at = Column(DateTime(timezone=True), onupdate=_utcnow)
+    
+    __table_args__ = (
+        # Keyset pagination of a user's conversations, newest first
+        Index("idx_conversations_user_created_id", "user_id", "created_at", "id"),
+    )
     
     # Relationships
     user = relationship("User", back_populates="conversations")
-    messages = relationship("Message", back_populates="conversation", cascade="all, delete-orphan")
+    messages = relationship(
+        "Message",
+        back_populates="conversation",
+        cascade="all, delete-orphan",
+        order_by="(Message.created_at, Message.id)",
+    )
     task_definitions = relationship("TaskDefinition", back_populates="conversation", cascade="all, delete-orphan")
 
 
@@ -29,12 +57,39 @@ class Message(Base):
     conversation_id = Column(String, ForeignKey("conversations.id"), nullable=False)
     role = Column(String, nullable=False)  # 'user', 'assistant', 'system'
     content = Column(Text, nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # False while a streamed reply is still being written or if the stream was cut short
+    is_complete = Column(Boolean, nullable=False, default=True, server_default=true())
+    # Model and token usage of the completion that produced an assistant reply
+    model = Column(String, nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    # Set by the app rather than the database: now() is fixed per transaction and
+    # SQLite's CURRENT_TIMESTAMP has whole seconds, and (created_at, id) keys must
+    # follow insertion order for paging and the summary boundary
+    created_at = Column(DateTime(timezone=True), default=_utcnow, server_default=func.now())
+    
+    __table_args__ = (
+        # Context window, paged message reads and "last assistant message" lookups
+        Index("idx_messages_conversation_created_id", "conversation_id", "created_at", "id"),
+    )
     
     # Relationships
     conversation = relationship("Conversation", back_populates="messages")
 
 
+@event.listens_for(Message, "after_insert")
+def _update_conversation_counters(mapper, connection, target: Message) -> None:
+    conversations = Conversation.__table__
+    connection.execute(
+        update(conversations)
+        .where(conversations.c.id == target.conversation_id)
+        .values(
+            message_count=conversations.c.message_count + 1,
+            last_message_at=func.now(),
+        )
+    )
+
+
 class TaskDefinition(Base):
     __tablename__ = "task_definitions"
     
@@ -44,10 +99,20 @@ class TaskDefinition(Base):
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     json_schema = Column(JSON, nullable=True)
+    # SHA-256 of the canonical json_schema, keys the memoized search keywords
+    schema_hash = Column(String(64), nullable=True)
+    search_keywords = Column(Text, nullable=True)
     recommended_models = Column(JSON, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        Index("idx_task_definitions_conversation_id", "conversation_id"),
+        Index("idx_task_definitions_user_id", "user_id"),
+        Index("idx_task_definitions_schema_hash", "schema_hash"),
+    )
+    
     # Relationships
     conversation = relationship("Conversation", back_populates="task_definitions")
-    user = relationship("User", back_populates="task_definitions") 
\ No newline at end of file
+    user = relationship("User", back_populates="task_definitions")
+    datasets = relationship("Dataset", back_populates="task_definition") 
\ No newline at end of file
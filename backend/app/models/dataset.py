@@ -0,0 +1,51 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, JSON, String, Text
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+import uuid
+
+from app.db.base_class import Base
+
+
+class Dataset(Base):
+    """A user-uploaded data file, stored under ``DATASET_STORAGE_DIR`` by id."""
+    __tablename__ = "datasets"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    task_definition_id = Column(String, ForeignKey("task_definitions.id"), nullable=True)
+    filename = Column(String, nullable=False)
+    # 'csv', 'json', 'jsonl' or 'text'
+    format = Column(String, nullable=False)
+    # 'uploading' until size_bytes have arrived, then 'uploaded', 'processing', 'ready' or 'failed'
+    status = Column(String, nullable=False, default="uploading", server_default="uploading")
+    size_bytes = Column(BigInteger, nullable=False)
+    received_bytes = Column(BigInteger, nullable=False, default=0, server_default="0")
+    # Column holding the class label; guessed from column names when not given
+    label_column = Column(String, nullable=True)
+    row_count = Column(BigInteger, nullable=True)
+    profile = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("idx_datasets_user_created", "user_id", "created_at"),
+        Index("idx_datasets_task_definition_id", "task_definition_id"),
+    )
+
+    # Relationships
+    task_definition = relationship("TaskDefinition", back_populates="datasets")
+
+
+class DatasetCellEdit(Base):
+    """
+    An edited cell of a dataset. Edits are kept as deltas over the uploaded
+    file, which is never rewritten; reads overlay them on the original rows.
+    """
+    __tablename__ = "dataset_cell_edits"
+
+    dataset_id = Column(String, ForeignKey("datasets.id"), primary_key=True)
+    row_index = Column(BigInteger, primary_key=True)
+    column = Column(String, primary_key=True)
+    value = Column(JSON, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
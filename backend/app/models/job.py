@@ -0,0 +1,48 @@
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, JSON, String, Text
+from sqlalchemy.sql import func
+import uuid
+
+from app.db.base_class import Base
+
+
+class Job(Base):
+    """
+    A unit of background work, queued in the database and run by a job worker
+    (``python -m app.worker``) instead of the request that asked for it.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=True)
+    # Name of the registered handler, e.g. 'dataset.process'
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=True)
+    # 'queued', 'running', 'succeeded' or 'failed'
+    status = Column(String, nullable=False, default="queued", server_default="queued")
+    # Higher runs first
+    priority = Column(Integer, nullable=False, default=0, server_default="0")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    max_attempts = Column(Integer, nullable=False, default=3, server_default="3")
+    # Repeating an enqueue with the same key returns the existing job
+    idempotency_key = Column(String, nullable=True)
+    # Not claimed before this time; pushed back after a failed attempt
+    run_after = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # Worker running the job, and when its claim lapses unless renewed
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    # Fraction done, from 0 to 1, as reported by the handler
+    progress = Column(Float, nullable=False, default=0.0, server_default="0")
+    progress_message = Column(String, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        # Claiming: the next queued job by priority, then age
+        Index("idx_jobs_status_priority_run_after", "status", "priority", "run_after"),
+        Index("idx_jobs_user_created", "user_id", "created_at"),
+        Index("uq_jobs_user_kind_idempotency_key", "user_id", "kind", "idempotency_key", unique=True),
+    )
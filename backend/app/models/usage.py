@@ -0,0 +1,42 @@
+from sqlalchemy import BigInteger, Column, Date, DateTime, ForeignKey, Index, Integer, String
+from sqlalchemy.sql import func
+
+from app.db.base_class import Base
+
+# Autoincrementing BIGINT on PostgreSQL; SQLite only autoincrements INTEGER keys
+EventId = BigInteger().with_variant(Integer, "sqlite")
+
+
+class UsageEvent(Base):
+    """Append-only ledger of billable activity; never updated or deleted."""
+    __tablename__ = "usage_events"
+
+    id = Column(EventId, primary_key=True, autoincrement=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    # 'chat', 'summary', 'keyword_extraction' or 'recommendation'
+    kind = Column(String, nullable=False)
+    model = Column(String, nullable=True)
+    # Message, conversation or task definition schema hash the event belongs to
+    reference_id = Column(String, nullable=True)
+    llm_calls = Column(Integer, nullable=False, default=0, server_default="0")
+    prompt_tokens = Column(Integer, nullable=False, default=0, server_default="0")
+    completion_tokens = Column(Integer, nullable=False, default=0, server_default="0")
+    recommendation_calls = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_usage_events_user_created", "user_id", "created_at"),
+    )
+
+
+class UsageAggregate(Base):
+    """Running totals of ``UsageEvent`` per user and billing period, kept in step on every insert."""
+    __tablename__ = "usage_aggregates"
+
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    llm_calls = Column(BigInteger, nullable=False, default=0, server_default="0")
+    prompt_tokens = Column(BigInteger, nullable=False, default=0, server_default="0")
+    completion_tokens = Column(BigInteger, nullable=False, default=0, server_default="0")
+    recommendation_calls = Column(BigInteger, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict
 from datetime import datetime
 from pydantic import BaseModel
 
@@ -16,6 +16,10 @@ class MessageCreate(MessageBase):
 class Message(MessageBase):
     id: str
     conversation_id: str
+    is_complete: bool = True
+    model: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
     created_at: datetime
     
     class Config:
@@ -41,6 +45,20 @@ class ConversationList(BaseModel):
     is_completed: bool
     created_at: datetime
     message_count: int
+    last_message_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class ConversationHeader(ConversationBase):
+    id: str
+    user_id: str
+    is_completed: bool
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    message_count: int = 0
+    last_message_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -50,6 +68,7 @@ class Conversation(ConversationBase):
     id: str
     user_id: str
     is_completed: bool
+    draft_json_schema: Optional[Dict[str, Any]] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     messages: List[Message] = []
@@ -0,0 +1,55 @@
+from typing import Any, Dict, List, Literal, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+
+class DatasetCreate(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    # Total size of the file; the upload completes when this many bytes have arrived
+    size_bytes: int = Field(gt=0)
+    # Inferred from the file extension when omitted
+    format: Optional[Literal["csv", "json", "jsonl", "text"]] = None
+    task_definition_id: Optional[str] = None
+    label_column: Optional[str] = None
+
+
+class Dataset(BaseModel):
+    id: str
+    user_id: str
+    task_definition_id: Optional[str] = None
+    filename: str
+    format: str
+    status: str
+    size_bytes: int
+    received_bytes: int
+    label_column: Optional[str] = None
+    row_count: Optional[int] = None
+    profile: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class DatasetRows(BaseModel):
+    columns: List[str]
+    # Index of the first row in ``rows``
+    start: int
+    total_rows: int
+    rows: List[List[Any]]
+
+
+class CellEdit(BaseModel):
+    row: int = Field(ge=0)
+    column: str
+    value: Any = None
+
+
+class DatasetEdits(BaseModel):
+    edits: List[CellEdit] = Field(max_length=1000)
+
+
+class DatasetEditResult(BaseModel):
+    applied: int
@@ -0,0 +1,28 @@
+from typing import Any, Optional
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    # 'queued', 'running', 'succeeded' or 'failed'
+    status: str
+    priority: int
+    attempts: int
+    max_attempts: int
+    # Fraction done, from 0 to 1
+    progress: float
+    progress_message: Optional[str] = None
+    # What the job produced, once it has succeeded
+    result: Optional[Any] = None
+    # Why the last attempt failed; a queued job with an error is waiting to be retried
+    error: Optional[str] = None
+    run_after: datetime
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
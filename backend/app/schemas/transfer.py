@@ -0,0 +1,55 @@
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+
+# One line of an NDJSON export; conversations come before their messages and task definitions
+class ConversationRecord(BaseModel):
+    type: Literal["conversation"]
+    id: str
+    title: Optional[str] = None
+    is_completed: bool = False
+    summary: Optional[str] = None
+    summarized_until: Optional[datetime] = None
+    # Id of the last summarized message, which breaks ties at summarized_until
+    summarized_until_id: Optional[str] = None
+    draft_json_schema: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class MessageRecord(BaseModel):
+    type: Literal["message"]
+    id: str
+    conversation_id: str
+    role: Literal["user", "assistant", "system"]
+    content: str
+    is_complete: bool = True
+    model: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+
+class TaskDefinitionRecord(BaseModel):
+    type: Literal["task_definition"]
+    id: str
+    conversation_id: str
+    name: str
+    description: Optional[str] = None
+    json_schema: Optional[Any] = None
+    recommended_models: Optional[List[str]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+ExportRecord = Annotated[
+    Union[ConversationRecord, MessageRecord, TaskDefinitionRecord],
+    Field(discriminator="type"),
+]
+
+
+class ImportResult(BaseModel):
+    conversations: int = 0
+    messages: int = 0
+    task_definitions: int = 0
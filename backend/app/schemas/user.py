@@ -1,5 +1,5 @@
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
 from pydantic import BaseModel, EmailStr
 
 
@@ -31,4 +31,16 @@ class User(UserInDBBase):
 
 
 class UserInDB(UserInDBBase):
-    hashed_password: str 
\ No newline at end of file
+    hashed_password: str 
+
+class UsageStats(BaseModel):
+    period_start: datetime
+    next_billing_date: date
+    llm_calls: int
+    recommendation_calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    credits_used: int
+    credits_remaining: int
+    models_trained: int
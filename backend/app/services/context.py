@@ -0,0 +1,193 @@
+"""
+Token-budgeted context window for the chat model.
+
+Each turn loads only the newest messages that fit ``CONTEXT_TOKEN_BUDGET``
+(at most ``CONTEXT_MAX_MESSAGES`` rows). Older messages are folded into a
+running summary stored on ``Conversation.summary``; ``summarized_until`` and
+``summarized_until_id`` mark the newest message already covered, as a
+(created_at, id) key like the one messages are ordered by, so those rows are
+never read again and messages sharing its timestamp are not skipped.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.conversation import Conversation, Message
+from app.services import usage
+from app.services.llm import LLMClient, Usage
+
+logger = logging.getLogger(__name__)
+
+# Per-message framing overhead of the chat format, in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and MetraAI, an assistant that helps non-technical users define a machine learning task.
+Update the existing summary with the new messages. Keep every fact the user has stated about their task, audience, data, outputs and special requirements, plus any JSON task definition that was proposed and whether the user accepted it.
+Be concise and factual. Return only the updated summary."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English text)."""
+    return len(text) // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(estimate_tokens(message["content"]) for message in messages)
+
+
+def _after_summary(conversation: Conversation):
+    """Filter for messages newer than the summary boundary, or None without a summary."""
+    if conversation.summarized_until is None:
+        return None
+    # Boundaries without an id (from older exports) keep every message at that timestamp
+    boundary = (conversation.summarized_until, conversation.summarized_until_id or "")
+    return tuple_(Message.created_at, Message.id) > tuple_(*boundary)
+
+
+@dataclass
+class ContextWindow:
+    summary: Optional[str]
+    messages: List[Dict[str, str]]
+    tokens: int
+    # (created_at, id) of the oldest message in the window
+    starts_at: Optional[Tuple[datetime, str]] = None
+    # True when unsummarized messages older than the window exist
+    needs_summary: bool = False
+    rows_read: int = 0
+
+    def to_openai_messages(self, system_prompt: str) -> List[Dict[str, str]]:
+        prompt = [{"role": "system", "content": system_prompt}]
+        if self.summary:
+            prompt.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{self.summary}",
+            })
+        prompt.extend(self.messages)
+        return prompt
+
+
+async def build_context_window(
+    db: AsyncSession,
+    conversation: Conversation,
+    token_budget: Optional[int] = None,
+    max_messages: Optional[int] = None,
+) -> ContextWindow:
+    token_budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+    max_messages = max_messages or settings.CONTEXT_MAX_MESSAGES
+
+    query = select(Message.id, Message.role, Message.content, Message.created_at).where(
+        Message.conversation_id == conversation.id
+    )
+    after_summary = _after_summary(conversation)
+    if after_summary is not None:
+        query = query.where(after_summary)
+    # One extra row tells us whether anything older is left unsummarized
+    result = await db.execute(
+        query.order_by(Message.created_at.desc(), Message.id.desc()).limit(max_messages + 1)
+    )
+    rows = result.all()
+
+    budget = token_budget
+    if conversation.summary:
+        budget -= estimate_tokens(conversation.summary)
+
+    window = []
+    tokens = 0
+    for row in rows[:max_messages]:
+        cost = estimate_tokens(row.content)
+        # Always keep the newest message, even if it alone exceeds the budget
+        if window and tokens + cost > budget:
+            break
+        window.append(row)
+        tokens += cost
+
+    window.reverse()
+    return ContextWindow(
+        summary=conversation.summary,
+        messages=[{"role": row.role, "content": row.content} for row in window],
+        tokens=tokens,
+        starts_at=(window[0].created_at, window[0].id) if window else None,
+        needs_summary=len(window) < len(rows),
+        rows_read=len(rows),
+    )
+
+
+async def refresh_summary(llm: LLMClient, conversation_id: str, before: Tuple[datetime, str]) -> None:
+    """Fold unsummarized messages older than ``before`` into the running summary."""
+    async with AsyncSessionLocal() as db:
+        conversation = await db.get(Conversation, conversation_id)
+        if conversation is None:
+            return
+
+        query = select(Message.id, Message.role, Message.content, Message.created_at).where(
+            Message.conversation_id == conversation_id,
+            tuple_(Message.created_at, Message.id) < tuple_(*before),
+        )
+        after_summary = _after_summary(conversation)
+        if after_summary is not None:
+            query = query.where(after_summary)
+        result = await db.execute(
+            query.order_by(Message.created_at, Message.id).limit(settings.CONTEXT_SUMMARY_BATCH)
+        )
+        rows = result.all()
+        if not rows:
+            return
+
+        transcript = "\n\n".join(f"{row.role}: {row.content}" for row in rows)
+        summary_usage = Usage()
+        summary = await llm.complete(
+            settings.CONTEXT_SUMMARY_MODEL,
+            [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {
+                    "role": "user",
+                    "content": f"Existing summary:\n{conversation.summary or '(none)'}\n\nNew messages:\n{transcript}",
+                },
+            ],
+            usage=summary_usage,
+            temperature=0.2,
+        )
+        conversation.summary = summary.strip()
+        conversation.summarized_until = rows[-1].created_at
+        conversation.summarized_until_id = rows[-1].id
+        await usage.record_usage(
+            db,
+            conversation.user_id,
+            "summary",
+            model=settings.CONTEXT_SUMMARY_MODEL,
+            reference_id=conversation_id,
+            llm_calls=1,
+            prompt_tokens=summary_usage.prompt_tokens or 0,
+            completion_tokens=summary_usage.completion_tokens or 0,
+        )
+        await db.commit()
+
+
+_refreshing: Set[str] = set()
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def schedule_summary_refresh(llm: LLMClient, conversation_id: str, before: Tuple[datetime, str]) -> None:
+    """Refresh the summary off the request path; at most one refresh per conversation."""
+    if conversation_id in _refreshing:
+        return
+    _refreshing.add(conversation_id)
+
+    async def run():
+        try:
+            await refresh_summary(llm, conversation_id, before)
+        except Exception:
+            logger.exception("Failed to refresh summary for conversation %s", conversation_id)
+        finally:
+            _refreshing.discard(conversation_id)
+
+    task = asyncio.create_task(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
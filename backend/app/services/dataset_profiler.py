@@ -0,0 +1,303 @@
+"""
+Streaming profiler for uploaded datasets.
+
+Files are read record by record, so memory is bounded by the widest record and
+the per-column state: counters, numeric and length ranges, and a value
+histogram that is dropped once a column exceeds ``max_distinct`` values. JSON
+arrays are decoded one element at a time from a sliding buffer rather than
+loaded whole. Runs synchronously; callers put it on a thread.
+"""
+import csv
+import json
+import math
+from collections import Counter
+from typing import Any, Dict, IO, Iterator, Optional, Tuple
+
+FORMATS = ("csv", "json", "jsonl", "text")
+
+# Read size for the JSON array decoder
+READ_SIZE = 1024 * 1024
+# Tokens counted as missing values in CSV and text files
+NULL_TOKENS = frozenset({"", "na", "n/a", "nan", "null", "none"})
+# Column names taken as the label when the upload doesn't name one
+LABEL_COLUMN_NAMES = ("label", "labels", "target", "class", "category", "sentiment", "intent", "y")
+MAX_COLUMNS = 500
+TOP_VALUES = 10
+# Longest value kept in the value histogram
+MAX_VALUE_CHARS = 200
+# Largest single record (CSV field, JSON element) accepted
+MAX_RECORD_CHARS = 16 * 1024 * 1024
+
+
+class ProfileError(ValueError):
+    pass
+
+
+def _merge_types(current: Optional[str], new: str) -> str:
+    if current is None or current == new:
+        return new
+    if current in ("integer", "float") and new in ("integer", "float"):
+        return "float"
+    return "string"
+
+
+def _classify(value: Any) -> Tuple[str, Optional[float]]:
+    """The type of a non-null value, and its numeric value if it has one."""
+    if isinstance(value, bool):
+        return "boolean", None
+    if isinstance(value, int):
+        return "integer", float(value)
+    if isinstance(value, float):
+        return "float", value
+    if isinstance(value, (list, dict)):
+        return ("array" if isinstance(value, list) else "object"), None
+    text = str(value).strip()
+    lowered = text.lower()
+    if lowered in ("true", "false"):
+        return "boolean", None
+    try:
+        return "integer", float(int(text))
+    except ValueError:
+        pass
+    try:
+        number = float(text)
+    except ValueError:
+        return "string", None
+    if math.isfinite(number):
+        return "float", number
+    return "string", None
+
+
+class ColumnProfile:
+    def __init__(self, name: str, max_distinct: int):
+        self.name = name
+        self.max_distinct = max_distinct
+        self.type: Optional[str] = None
+        self.count = 0
+        self.nulls = 0
+        self.values: Optional[Counter] = Counter()
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self.total = 0.0
+        self.numbers = 0
+        self.min_length: Optional[int] = None
+        self.max_length = 0
+        self.total_length = 0
+
+    def add(self, value: Any) -> None:
+        self.count += 1
+        if value is None or (isinstance(value, str) and value.strip().lower() in NULL_TOKENS):
+            self.nulls += 1
+            return
+        kind, number = _classify(value)
+        self.type = _merge_types(self.type, kind)
+        if number is not None:
+            self.numbers += 1
+            self.total += number
+            self.minimum = number if self.minimum is None else min(self.minimum, number)
+            self.maximum = number if self.maximum is None else max(self.maximum, number)
+        text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+        length = len(text)
+        self.min_length = length if self.min_length is None else min(self.min_length, length)
+        self.max_length = max(self.max_length, length)
+        self.total_length += length
+        if self.values is not None:
+            self.values[text[:MAX_VALUE_CHARS]] += 1
+            if len(self.values) > self.max_distinct:
+                # Too many to be categorical; stop tracking to keep memory bounded
+                self.values = None
+
+    def missing(self, rows: int) -> None:
+        """Count the column as null in rows that didn't have it."""
+        if rows > self.count:
+            self.nulls += rows - self.count
+            self.count = rows
+
+    def to_dict(self) -> Dict[str, Any]:
+        present = self.count - self.nulls
+        profile: Dict[str, Any] = {
+            "name": self.name,
+            "type": self.type or "null",
+            "nulls": self.nulls,
+            "null_ratio": round(self.nulls / self.count, 6) if self.count else 0.0,
+            # None when the column has more than max_distinct values
+            "distinct": len(self.values) if self.values is not None else None,
+            "top_values": self.values.most_common(TOP_VALUES) if self.values is not None else [],
+        }
+        if self.type in ("integer", "float") and self.numbers:
+            profile.update(min=self.minimum, max=self.maximum, mean=self.total / self.numbers)
+        if present:
+            profile.update(
+                min_length=self.min_length,
+                max_length=self.max_length,
+                mean_length=self.total_length / present,
+            )
+        return profile
+
+
+class DatasetProfile:
+    def __init__(self, file_format: str, max_distinct: int):
+        self.format = file_format
+        self.max_distinct = max_distinct
+        self.rows = 0
+        self.malformed_rows = 0
+        self.columns: Dict[str, ColumnProfile] = {}
+        # Field delimiter of CSV files, as sniffed
+        self.delimiter: Optional[str] = None
+
+    def _column(self, name: str) -> Optional[ColumnProfile]:
+        column = self.columns.get(name)
+        if column is None and len(self.columns) < MAX_COLUMNS:
+            column = self.columns[name] = ColumnProfile(name, self.max_distinct)
+            # Rows seen before the column first appeared lacked it
+            column.missing(self.rows)
+        return column
+
+    def add_record(self, record: Dict[str, Any]) -> None:
+        for name, value in record.items():
+            column = self._column(str(name))
+            if column is not None:
+                column.add(value)
+        self.rows += 1
+        for column in self.columns.values():
+            column.missing(self.rows)
+
+    def to_dict(self, label_column: Optional[str]) -> Dict[str, Any]:
+        if label_column is None:
+            by_name = {name.lower(): name for name in self.columns}
+            label_column = next((by_name[name] for name in LABEL_COLUMN_NAMES if name in by_name), None)
+        label = self.columns.get(label_column) if label_column else None
+        profile = {
+            "format": self.format,
+            "rows": self.rows,
+            "malformed_rows": self.malformed_rows,
+            "columns": [column.to_dict() for column in self.columns.values()],
+            "label_column": label.name if label is not None else None,
+            # Missing when the label column has too many values to be a class label
+            "label_distribution": (
+                dict(label.values.most_common()) if label is not None and label.values is not None else None
+            ),
+        }
+        if self.delimiter is not None:
+            profile["delimiter"] = self.delimiter
+        return profile
+
+
+def _csv_records(file: IO[str], profile: DatasetProfile) -> Iterator[Dict[str, Any]]:
+    sample = file.read(64 * 1024)
+    file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        dialect = csv.excel
+    profile.delimiter = dialect.delimiter
+    reader = csv.reader(file, dialect)
+    header = next(reader, None)
+    if not header:
+        return
+    header = [name.strip() or f"column_{index + 1}" for index, name in enumerate(header)]
+    for row in reader:
+        if not row:
+            continue
+        if len(row) != len(header):
+            profile.malformed_rows += 1
+        yield dict(zip(header, row))
+
+
+def _jsonl_records(file: IO[str], profile: DatasetProfile) -> Iterator[Any]:
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            profile.malformed_rows += 1
+
+
+def json_array_items(file: IO[str]) -> Iterator[Any]:
+    """Decode a top-level JSON array (or a single value) one element at a time."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    in_array = None
+
+    def skip_whitespace() -> None:
+        nonlocal position
+        while position < len(buffer) and buffer[position] in " \t\r\n":
+            position += 1
+
+    while True:
+        skip_whitespace()
+        if position >= len(buffer):
+            if eof:
+                if in_array:
+                    raise ProfileError("JSON array is not closed")
+                return
+            chunk = file.read(READ_SIZE)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+            continue
+        if in_array is None:
+            in_array = buffer[position] == "["
+            if in_array:
+                position += 1
+            continue
+        if in_array and buffer[position] == "]":
+            return
+        if in_array and buffer[position] == ",":
+            position += 1
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as e:
+            if eof or len(buffer) - position > MAX_RECORD_CHARS:
+                raise ProfileError(f"Invalid JSON: {e}") from e
+            # Probably cut off mid-value; read more and retry
+            chunk = file.read(READ_SIZE)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+            continue
+        if end >= len(buffer) and not eof:
+            # A number at the end of the buffer may continue in the next read
+            chunk = file.read(READ_SIZE)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+            continue
+        position = end
+        yield item
+        if not in_array:
+            return
+
+
+def _text_records(file: IO[str]) -> Iterator[Dict[str, Any]]:
+    for line in file:
+        yield {"text": line.rstrip("\r\n")}
+
+
+def profile_file(
+    path: str,
+    file_format: str,
+    label_column: Optional[str] = None,
+    max_distinct: int = 1000,
+) -> Dict[str, Any]:
+    """Profile the dataset at ``path``: row count, column types, null ratios and label distribution."""
+    if file_format not in FORMATS:
+        raise ProfileError(f"Unsupported format: {file_format}")
+    profile = DatasetProfile(file_format, max_distinct)
+    csv.field_size_limit(MAX_RECORD_CHARS)
+    with open(path, "r", encoding="utf-8", errors="replace", newline="" if file_format == "csv" else None) as file:
+        if file_format == "csv":
+            records: Iterator[Any] = _csv_records(file, profile)
+        elif file_format == "jsonl":
+            records = _jsonl_records(file, profile)
+        elif file_format == "json":
+            records = json_array_items(file)
+        else:
+            records = _text_records(file)
+        for record in records:
+            profile.add_record(record if isinstance(record, dict) else {"value": record})
+    return profile.to_dict(label_column)
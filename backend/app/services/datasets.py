@@ -0,0 +1,238 @@
+"""
+Storage, background processing and editing of uploaded datasets.
+
+Uploads are resumable: content arrives in any number of ranged PUTs, each
+streamed straight to the dataset's file at the offset already received, and
+``received_bytes`` records how far the file is complete. Once every byte is
+in, a ``dataset.process`` job is queued, which profiles the file and builds
+its row offset index on a job worker. Cell edits are stored as deltas in
+``dataset_cell_edits`` and overlaid on the rows read through the index.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import ClientDisconnect
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.db.session import AsyncSessionLocal
+from app.models.dataset import Dataset, DatasetCellEdit
+from app.models.job import Job
+from app.services import dataset_index, jobs
+from app.services.dataset_profiler import ProfileError, profile_file
+
+logger = logging.getLogger(__name__)
+
+EXTENSION_FORMATS = {
+    ".csv": "csv",
+    ".tsv": "csv",
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".txt": "text",
+    ".text": "text",
+}
+
+dataset_upload_bytes_total = registry.counter(
+    "dataset_upload_bytes_total",
+    "Dataset bytes received by uploads.",
+)
+dataset_profiles_total = registry.counter(
+    "dataset_profiles_total",
+    "Dataset profiling runs by result.",
+    ["result"],
+)
+dataset_profile_seconds = registry.histogram(
+    "dataset_profile_seconds",
+    "Time to profile one dataset.",
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+)
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class InvalidEdit(ValueError):
+    pass
+
+
+def infer_format(filename: str) -> Optional[str]:
+    return EXTENSION_FORMATS.get(os.path.splitext(filename)[1].lower())
+
+
+def storage_path(dataset_id: str) -> str:
+    return os.path.join(settings.DATASET_STORAGE_DIR, dataset_id)
+
+
+def create_file(dataset_id: str) -> None:
+    os.makedirs(settings.DATASET_STORAGE_DIR, exist_ok=True)
+    open(storage_path(dataset_id), "wb").close()
+
+
+async def write_content(dataset: Dataset, offset: int, chunks: AsyncIterator[bytes]) -> int:
+    """
+    Write an uploaded range to the dataset's file starting at ``offset`` and
+    return the bytes written. Anything past ``offset`` from an earlier,
+    interrupted attempt is discarded first. If the client disconnects, what
+    arrived so far is kept so the upload can resume from there.
+    """
+    limit = dataset.size_bytes - offset
+    written = 0
+    file = await asyncio.to_thread(open, storage_path(dataset.id), "r+b")
+    try:
+        await asyncio.to_thread(file.seek, offset)
+        await asyncio.to_thread(file.truncate)
+        try:
+            async for chunk in chunks:
+                if written + len(chunk) > limit:
+                    raise UploadTooLarge(f"Upload exceeds the declared size of {dataset.size_bytes} bytes")
+                await asyncio.to_thread(file.write, chunk)
+                written += len(chunk)
+        except ClientDisconnect:
+            logger.info("Upload of dataset %s interrupted after %d bytes", dataset.id, written)
+        except UploadTooLarge:
+            # Leave the file as it was before this attempt
+            await asyncio.to_thread(file.truncate, offset)
+            raise
+    finally:
+        await asyncio.to_thread(file.close)
+    dataset_upload_bytes_total.inc(written)
+    return written
+
+
+async def enqueue_processing(db: AsyncSession, dataset: Dataset) -> Job:
+    """Queue a fully uploaded dataset for profiling and indexing. The caller commits."""
+    return await jobs.enqueue(
+        db,
+        "dataset.process",
+        {"dataset_id": dataset.id},
+        user_id=dataset.user_id,
+        idempotency_key=dataset.id,
+    )
+
+
+@jobs.handler("dataset.process")
+async def process_dataset(job: jobs.JobContext) -> Dict[str, Any]:
+    """Profile a dataset and build its row offset index, each on a thread."""
+    async with AsyncSessionLocal() as db:
+        dataset = await db.get(Dataset, job.payload["dataset_id"])
+        if dataset is None or dataset.status not in ("uploaded", "processing"):
+            return {"status": dataset.status if dataset is not None else None}
+        dataset.status = "processing"
+        await db.commit()
+
+        started = time.perf_counter()
+        try:
+            await job.progress(0.0, "Profiling")
+            profile = await asyncio.to_thread(
+                profile_file,
+                storage_path(dataset.id),
+                dataset.format,
+                dataset.label_column,
+                settings.DATASET_PROFILE_MAX_DISTINCT,
+            )
+            await job.progress(0.5, "Indexing rows")
+            await asyncio.to_thread(dataset_index.build_row_index, storage_path(dataset.id), dataset.format)
+        except (OSError, ProfileError) as e:
+            dataset.status = "failed"
+            dataset.error = str(e)
+            dataset_profiles_total.inc(result="failed")
+            dataset_profile_seconds.observe(time.perf_counter() - started)
+            await db.commit()
+            raise jobs.JobFailed(str(e)) from e
+        dataset.profile = profile
+        dataset.row_count = profile["rows"]
+        dataset.status = "ready"
+        dataset.error = None
+        dataset_profiles_total.inc(result="ready")
+        dataset_profile_seconds.observe(time.perf_counter() - started)
+        await db.commit()
+    return {"dataset_id": dataset.id, "status": "ready", "rows": profile["rows"]}
+
+
+async def read_rows(
+    db: AsyncSession, dataset: Dataset, start: int, limit: int
+) -> Tuple[List[str], List[List[Any]], int]:
+    """A page of a processed dataset with its cell edits applied: (columns, rows, total rows)."""
+    profile = dataset.profile or {}
+    columns, rows, total = await asyncio.to_thread(
+        dataset_index.read_rows,
+        storage_path(dataset.id),
+        dataset.format,
+        start,
+        limit,
+        [column["name"] for column in profile.get("columns", [])],
+        profile.get("delimiter", ","),
+    )
+    if rows:
+        positions = {column: position for position, column in enumerate(columns)}
+        edits = await db.execute(
+            select(DatasetCellEdit.row_index, DatasetCellEdit.column, DatasetCellEdit.value).where(
+                DatasetCellEdit.dataset_id == dataset.id,
+                DatasetCellEdit.row_index >= start,
+                DatasetCellEdit.row_index < start + len(rows),
+            )
+        )
+        for row_index, column, value in edits:
+            position = positions.get(column)
+            if position is not None:
+                rows[row_index - start][position] = value
+    return columns, rows, total
+
+
+def _upsert_edits_statement(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    table = DatasetCellEdit.__table__
+    statement = dialect_insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.dataset_id, table.c.row_index, table.c.column],
+        set_={"value": statement.excluded.value, "updated_at": func.now()},
+    )
+
+
+async def apply_edits(db: AsyncSession, dataset: Dataset, edits: List[Tuple[int, str, Any]]) -> int:
+    """
+    Record a batch of ``(row, column, value)`` cell edits in one statement; the
+    last edit of a cell wins. Returns the number of cells written. The caller
+    commits.
+    """
+    columns, _, total = await read_rows(db, dataset, 0, 0)
+    known = set(columns)
+    latest: Dict[Tuple[int, str], Any] = {}
+    for row_index, column, value in edits:
+        if not 0 <= row_index < total:
+            raise InvalidEdit(f"Row {row_index} is out of range (dataset has {total} rows)")
+        if column not in known:
+            raise InvalidEdit(f"Unknown column: {column}")
+        latest[(row_index, column)] = value
+    if not latest:
+        return 0
+
+    rows = [
+        {"dataset_id": dataset.id, "row_index": row_index, "column": column, "value": value}
+        for (row_index, column), value in latest.items()
+    ]
+    statement = _upsert_edits_statement(db.get_bind().dialect.name)
+    if statement is None:
+        table = DatasetCellEdit.__table__
+        await db.execute(
+            delete(table).where(
+                table.c.dataset_id == dataset.id,
+                tuple_(table.c.row_index, table.c.column).in_(list(latest)),
+            )
+        )
+        statement = insert(table)
+    await db.execute(statement, rows)
+    return len(rows)
+
@@ -0,0 +1,398 @@
+"""
+Database-backed queue for work that shouldn't run inside an HTTP request.
+
+``enqueue`` adds a row to ``jobs`` in the caller's transaction, so a job only
+becomes visible once whatever it refers to is committed. ``JobWorker`` runs
+them, in ``python -m app.worker`` processes or embedded in the API process:
+it claims the highest-priority due job with a single UPDATE (the candidate is
+selected ``FOR UPDATE SKIP LOCKED`` on PostgreSQL, so workers never wait on
+each other; SQLite serializes writers anyway) and holds it under a lease that
+it renews while the handler runs. A job whose worker dies is queued again once
+its lease lapses. Failed attempts are retried with exponential backoff up to
+``max_attempts``; handlers raise ``JobFailed`` for errors a retry won't fix.
+Progress reported by handlers is what clients poll through ``GET /jobs/{id}``.
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.db.session import AsyncSessionLocal
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+# Someone is waiting on the result
+PRIORITY_INTERACTIVE = 10
+PRIORITY_DEFAULT = 0
+
+jobs_enqueued_total = registry.counter(
+    "jobs_enqueued_total",
+    "Jobs added to the queue, by kind.",
+    ["kind"],
+)
+job_attempts_total = registry.counter(
+    "job_attempts_total",
+    "Job attempts by kind and result (succeeded, retried, failed or released).",
+    ["kind", "result"],
+)
+job_seconds = registry.histogram(
+    "job_seconds",
+    "Time spent on one job attempt.",
+    ["kind"],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600),
+)
+job_queue_wait_seconds = registry.histogram(
+    "job_queue_wait_seconds",
+    "Time from a job being due to a worker claiming it.",
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 300),
+)
+
+_jobs = Job.__table__
+
+
+class JobFailed(Exception):
+    """Raised by a handler for a failure that retrying won't fix."""
+
+
+@dataclass
+class JobContext:
+    """What a handler gets: the job's fields and a way to report progress."""
+    id: str
+    kind: str
+    user_id: Optional[str]
+    payload: Dict[str, Any]
+    # 1 on the first attempt
+    attempt: int
+    _report: Callable[[str, float, Optional[str]], Awaitable[None]] = field(repr=False)
+
+    async def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        """Record how far the job has got (0 to 1); this also renews the worker's lease."""
+        await self._report(self.id, fraction, message)
+
+
+Handler = Callable[[JobContext], Awaitable[Any]]
+_handlers: Dict[str, Handler] = {}
+
+
+def handler(kind: str) -> Callable[[Handler], Handler]:
+    """
+    Register the coroutine that runs jobs of ``kind``. Its return value, which
+    must be JSON serializable, becomes the job's result.
+    """
+    def register(function: Handler) -> Handler:
+        if kind in _handlers and _handlers[kind] is not function:
+            raise ValueError(f"A handler for {kind!r} is already registered")
+        _handlers[kind] = function
+        return function
+    return register
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _insert_statement(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    return dialect_insert(_jobs).on_conflict_do_nothing(
+        index_elements=[_jobs.c.user_id, _jobs.c.kind, _jobs.c.idempotency_key]
+    )
+
+
+async def enqueue(
+    db: AsyncSession,
+    kind: str,
+    payload: Optional[Dict[str, Any]] = None,
+    *,
+    user_id: Optional[str] = None,
+    priority: int = PRIORITY_DEFAULT,
+    idempotency_key: Optional[str] = None,
+    max_attempts: Optional[int] = None,
+) -> Job:
+    """
+    Queue a job and return it. If the user already has a job of this kind with
+    the same ``idempotency_key``, that job is returned instead, whatever its
+    state; keys are only unique per user, so keyed jobs need one. The caller
+    commits.
+    """
+    job_id = str(uuid.uuid4())
+    values = dict(
+        id=job_id,
+        user_id=user_id,
+        kind=kind,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        idempotency_key=idempotency_key,
+        run_after=_now(),
+    )
+    query = select(Job).where(Job.id == job_id)
+    statement = insert(_jobs)
+    if idempotency_key is not None:
+        query = select(Job).where(
+            Job.user_id == user_id, Job.kind == kind, Job.idempotency_key == idempotency_key
+        )
+        statement = _insert_statement(db.get_bind().dialect.name)
+        if statement is None:
+            existing = (await db.execute(query)).scalars().first()
+            if existing is not None:
+                return existing
+            statement = insert(_jobs)
+    result = await db.execute(statement, values)
+    if result.rowcount:
+        jobs_enqueued_total.inc(kind=kind)
+    return (await db.execute(query)).scalars().one()
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before the next attempt after ``attempts`` failed ones, with jitter."""
+    delay = min(settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+@dataclass
+class _Claimed:
+    id: str
+    kind: str
+    user_id: Optional[str]
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+
+
+class JobWorker:
+    """Claims and runs queued jobs, ``concurrency`` at a time."""
+
+    def __init__(self, concurrency: Optional[int] = None, session_factory=AsyncSessionLocal):
+        self.concurrency = max(1, concurrency or settings.JOB_WORKER_CONCURRENCY)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._session_factory = session_factory
+        self._tasks: List[asyncio.Task] = []
+        self._stopping: Optional[asyncio.Event] = None
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._stopping = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+
+    async def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop claiming jobs and give running ones ``timeout`` seconds to finish;
+        any still running after that are put back in the queue.
+        """
+        if not self._tasks:
+            return
+        self._stopping.set()
+        timeout = settings.JOB_SHUTDOWN_TIMEOUT_SECONDS if timeout is None else timeout
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = await self._claim()
+            except Exception:
+                logger.exception("Failed to claim a job")
+                job = None
+            if job is None:
+                await self._sleep(settings.JOB_POLL_INTERVAL_SECONDS)
+                continue
+            await self._execute(job)
+
+    async def _claim(self) -> Optional[_Claimed]:
+        now = _now()
+        queued = aliased(Job)
+        candidate = (
+            select(queued.id)
+            .where(queued.status == "queued", queued.run_after <= now)
+            .order_by(queued.priority.desc(), queued.run_after, queued.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        statement = (
+            update(_jobs)
+            .where(_jobs.c.id == candidate, _jobs.c.status == "queued")
+            .values(
+                status="running",
+                attempts=_jobs.c.attempts + 1,
+                locked_by=self.worker_id,
+                locked_until=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                started_at=func.coalesce(_jobs.c.started_at, now),
+            )
+            .returning(
+                _jobs.c.id, _jobs.c.kind, _jobs.c.user_id, _jobs.c.payload,
+                _jobs.c.attempts, _jobs.c.max_attempts, _jobs.c.run_after,
+            )
+        )
+        async with self._session_factory() as db:
+            row = (await db.execute(statement)).first()
+            await db.commit()
+        if row is None:
+            return None
+        run_after = row.run_after if row.run_after.tzinfo else row.run_after.replace(tzinfo=timezone.utc)
+        job_queue_wait_seconds.observe(max(0.0, (now - run_after).total_seconds()))
+        return _Claimed(row.id, row.kind, row.user_id, row.payload or {}, row.attempts, row.max_attempts)
+
+    async def _update(self, job_id: str, **values: Any) -> bool:
+        """Update a job this worker still holds; False if its lease was lost."""
+        async with self._session_factory() as db:
+            result = await db.execute(
+                update(_jobs)
+                .where(_jobs.c.id == job_id, _jobs.c.status == "running", _jobs.c.locked_by == self.worker_id)
+                .values(**values)
+            )
+            await db.commit()
+        return result.rowcount == 1
+
+    async def _report(self, job_id: str, fraction: float, message: Optional[str]) -> None:
+        await self._update(
+            job_id,
+            progress=min(max(fraction, 0.0), 1.0),
+            progress_message=message,
+            locked_until=_now() + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+        )
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            try:
+                held = await self._update(
+                    job_id, locked_until=_now() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+                )
+            except Exception:
+                logger.exception("Failed to renew the lease on job %s", job_id)
+                continue
+            if not held:
+                logger.warning("Lost the lease on job %s", job_id)
+                return
+
+    async def _execute(self, job: _Claimed) -> None:
+        context = JobContext(job.id, job.kind, job.user_id, job.payload, job.attempts, self._report)
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        started = time.perf_counter()
+        finished = dict(locked_by=None, locked_until=None, finished_at=None)
+        try:
+            function = _handlers.get(job.kind)
+            if function is None:
+                raise JobFailed(f"No handler is registered for {job.kind!r} jobs")
+            result = await function(context)
+        except JobFailed as e:
+            outcome = "failed"
+            values = dict(finished, status="failed", error=str(e), finished_at=_now())
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back without charging it an attempt
+            job_attempts_total.inc(kind=job.kind, result="released")
+            await asyncio.shield(self._update(
+                job.id, **finished, status="queued", attempts=_jobs.c.attempts - 1, run_after=_now()
+            ))
+            raise
+        except Exception as e:
+            logger.exception("Job %s (%s) failed on attempt %d", job.id, job.kind, job.attempts)
+            error = f"{type(e).__name__}: {e}"
+            if job.attempts < job.max_attempts:
+                outcome = "retried"
+                values = dict(
+                    finished,
+                    status="queued",
+                    error=error,
+                    run_after=_now() + timedelta(seconds=retry_delay(job.attempts)),
+                )
+            else:
+                outcome = "failed"
+                values = dict(finished, status="failed", error=error, finished_at=_now())
+        else:
+            outcome = "succeeded"
+            values = dict(
+                finished,
+                status="succeeded",
+                result=result,
+                error=None,
+                progress=1.0,
+                progress_message=None,
+                finished_at=_now(),
+            )
+        finally:
+            heartbeat.cancel()
+            job_seconds.observe(time.perf_counter() - started, kind=job.kind)
+        job_attempts_total.inc(kind=job.kind, result=outcome)
+        try:
+            if not await self._update(job.id, **values):
+                logger.warning("Job %s finished after its lease was lost; result discarded", job.id)
+        except Exception:
+            # The lease will lapse and the job run again
+            logger.exception("Failed to record the outcome of job %s", job.id)
+
+    async def _maintain(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await self.requeue_expired()
+                await self.purge_finished()
+            except Exception:
+                logger.exception("Job queue maintenance failed")
+            await self._sleep(settings.JOB_LEASE_SECONDS / 2)
+
+    async def requeue_expired(self) -> None:
+        """Queue again, or fail once out of attempts, jobs whose worker stopped renewing its lease."""
+        now = _now()
+        expired = (_jobs.c.status == "running", _jobs.c.locked_until < now)
+        async with self._session_factory() as db:
+            await db.execute(
+                update(_jobs)
+                .where(*expired, _jobs.c.attempts >= _jobs.c.max_attempts)
+                .values(
+                    status="failed",
+                    error="The worker running the job stopped responding",
+                    locked_by=None,
+                    locked_until=None,
+                    finished_at=now,
+                )
+            )
+            result = await db.execute(
+                update(_jobs)
+                .where(*expired)
+                .values(status="queued", locked_by=None, locked_until=None, run_after=now)
+            )
+            await db.commit()
+        if result.rowcount:
+            logger.warning("Requeued %d jobs whose lease expired", result.rowcount)
+
+    async def purge_finished(self) -> None:
+        cutoff = _now() - timedelta(seconds=settings.JOB_RETENTION_SECONDS)
+        async with self._session_factory() as db:
+            await db.execute(
+                delete(_jobs).where(_jobs.c.status.in_(("succeeded", "failed")), _jobs.c.finished_at < cutoff)
+            )
+            await db.commit()
+
+
+# The worker embedded in the API process (JOB_WORKER_EMBEDDED)
+job_worker = JobWorker()
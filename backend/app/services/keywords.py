@@ -0,0 +1,150 @@
+"""
+Search keyword extraction for model recommendations, memoized by content.
+
+Keywords are keyed on the SHA-256 of the canonical JSON of the task
+definition. Lookups go to an in-process cache, then to ``TaskDefinition`` rows
+with the same ``schema_hash``; only a miss in both calls the LLM.
+"""
+import asyncio
+import hashlib
+import json
+from typing import Any, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import registry
+from app.models.conversation import TaskDefinition
+from app.services import usage
+from app.services.llm import LLMClient, LLMError, Usage
+
+KEYWORD_MODEL = "gpt-4o-mini"
+
+# System prompt for AI to extract search keywords
+KEYWORD_EXTRACTION_PROMPT = """You are a Hugging Face model curator expert. Your task is to analyze a task definition JSON and extract the most relevant keywords for searching models on Hugging Face Hub.
+
+Guidelines:
+1. Extract keywords that will help find the most suitable models
+2. Consider task type, domain, language, performance requirements
+3. Include both general and specific terms
+4. Format: Return ONLY a comma-separated string of keywords
+5. Prioritize keywords that are commonly used in Hugging Face model tags
+
+Examples:
+- For a medical NER task in Chinese: "token-classification, ner, chinese, medical, biomedical, accuracy"
+- For sentiment analysis on product reviews: "text-classification, sentiment-analysis, product-reviews, e-commerce"
+- For image classification of animals: "image-classification, animals, wildlife, computer-vision"
+"""
+
+keyword_cache_requests_total = registry.counter(
+    "keyword_cache_requests_total",
+    "Search keyword lookups by where they were served from (memory, database or miss).",
+    ["result"],
+)
+
+keyword_extraction_fallbacks_total = registry.counter(
+    "keyword_extraction_fallbacks_total",
+    "Keyword extractions answered from the raw fields because the LLM failed or timed out.",
+)
+
+# Task definition fields that are meaningful search terms on their own
+TASK_DEFINITION_FIELDS = ("task_type", "domain", "language")
+
+_memory_cache = TTLCache(
+    maxsize=settings.KEYWORD_CACHE_MAX_ENTRIES,
+    ttl=settings.KEYWORD_CACHE_TTL_SECONDS,
+)
+
+
+def schema_hash(task_definition: Any) -> str:
+    """SHA-256 of the canonical JSON form (sorted keys, no whitespace)."""
+    canonical = json.dumps(task_definition, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+async def _extract_keywords(llm: LLMClient, task_definition: dict, extraction_usage: Usage) -> str:
+    content = await asyncio.wait_for(
+        llm.complete(
+            KEYWORD_MODEL,
+            [
+                {"role": "system", "content": KEYWORD_EXTRACTION_PROMPT},
+                {"role": "user", "content": f"Task definition:\n{json.dumps(task_definition, indent=2)}"}
+            ],
+            usage=extraction_usage,
+            temperature=0.3,  # Lower temperature for more consistent keyword extraction
+            max_tokens=100,
+        ),
+        timeout=settings.KEYWORD_EXTRACTION_TIMEOUT_SECONDS,
+    )
+    return content.strip()
+
+
+def task_definition_terms(task_definition: dict) -> List[str]:
+    """Normalized task type, domain and language values of a task definition."""
+    terms = []
+    for field in TASK_DEFINITION_FIELDS:
+        value = task_definition.get(field)
+        if isinstance(value, str) and value.strip():
+            terms.append(value.strip().lower().replace("_", "-"))
+    return terms
+
+
+def fallback_keywords(task_definition: dict) -> str:
+    """Keywords read straight from the task definition, used when the LLM is too slow."""
+    return ", ".join(task_definition_terms(task_definition))
+
+
+async def get_search_keywords(
+    db: AsyncSession, llm: LLMClient, task_definition: dict, user_id: Optional[str] = None
+) -> str:
+    """Memoized keywords; an LLM call made on a miss is charged to ``user_id``."""
+    digest = schema_hash(task_definition)
+
+    keywords: Optional[str] = _memory_cache.get(digest)
+    if keywords is not None:
+        keyword_cache_requests_total.inc(result="memory")
+        return keywords
+
+    result = await db.execute(
+        select(TaskDefinition.search_keywords).where(
+            TaskDefinition.schema_hash == digest,
+            TaskDefinition.search_keywords.isnot(None)
+        ).limit(1)
+    )
+    keywords = result.scalar()
+    if keywords is not None:
+        keyword_cache_requests_total.inc(result="database")
+        _memory_cache.set(digest, keywords)
+        return keywords
+
+    keyword_cache_requests_total.inc(result="miss")
+    extraction_usage = Usage()
+    try:
+        keywords = await _extract_keywords(llm, task_definition, extraction_usage)
+    except (asyncio.TimeoutError, LLMError):
+        keyword_extraction_fallbacks_total.inc()
+        # Serve this request from the raw fields but don't memoize the result
+        return fallback_keywords(task_definition)
+    _memory_cache.set(digest, keywords)
+
+    # Persist on every task definition with this exact schema
+    await db.execute(
+        update(TaskDefinition)
+        .where(TaskDefinition.schema_hash == digest)
+        .values(search_keywords=keywords)
+    )
+    if user_id is not None:
+        await usage.record_usage(
+            db,
+            user_id,
+            "keyword_extraction",
+            model=KEYWORD_MODEL,
+            reference_id=digest,
+            llm_calls=1,
+            prompt_tokens=extraction_usage.prompt_tokens or 0,
+            completion_tokens=extraction_usage.completion_tokens or 0,
+        )
+    await db.commit()
+    return keywords
@@ -0,0 +1,470 @@
+"""
+Shared client for the chat completion API.
+
+One ``LLMClient`` per process keeps a pooled (HTTP/2 when ``h2`` is installed)
+connection to the provider. Calls are bounded per model by a semaphore,
+retried with jittered exponential backoff on transient failures, and refused
+outright while the circuit breaker is open. ``LLM_PROVIDER=fake`` swaps in a
+local provider that needs no network, for development and load tests.
+"""
+import asyncio
+import logging
+import random
+import re
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+
+from app.core import json
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+ChatMessages = List[Dict[str, str]]
+
+llm_requests_total = registry.counter(
+    "llm_requests_total",
+    "Chat completion calls by model and result.",
+    ["model", "result"],
+)
+llm_retries_total = registry.counter(
+    "llm_retries_total",
+    "Chat completion attempts retried after a transient failure.",
+    ["model"],
+)
+llm_inflight_requests = registry.gauge(
+    "llm_inflight_requests",
+    "Chat completion calls currently holding a concurrency slot.",
+    ["model"],
+)
+llm_tokens_total = registry.counter(
+    "llm_tokens_total",
+    "Tokens reported by the provider, by model and kind (prompt or completion).",
+    ["model", "kind"],
+)
+llm_stream_tokens_per_second = registry.histogram(
+    "llm_stream_tokens_per_second",
+    "Completion tokens per second of a streamed reply, after its first token.",
+    ["model"],
+    buckets=(1, 5, 10, 20, 40, 60, 80, 100, 150, 200, 400),
+)
+llm_time_to_first_token_seconds = registry.histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from starting a streamed completion to its first token, including queueing.",
+    ["model"],
+)
+
+
+@dataclass
+class Usage:
+    """Token counts of one completion, filled in by the provider when it reports them."""
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+    @property
+    def reported(self) -> bool:
+        return self.prompt_tokens is not None and self.completion_tokens is not None
+
+
+class LLMError(Exception):
+    """A chat completion call failed."""
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class LLMUnavailable(LLMError):
+    """The call was refused locally: the circuit is open or no slot freed up in time."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message, retryable=False, retry_after=retry_after)
+
+
+class LLMProvider:
+    async def complete(
+        self, model: str, messages: ChatMessages, usage: Optional[Usage] = None, **params
+    ) -> str:
+        raise NotImplementedError
+
+    def stream(
+        self, model: str, messages: ChatMessages, usage: Optional[Usage] = None, **params
+    ) -> AsyncIterator[str]:
+        """Yield the content deltas of a streamed completion, filling in ``usage`` at the end."""
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+
+class OpenAIProvider(LLMProvider):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str,
+        timeout: float,
+        connect_timeout: float,
+        max_connections: int,
+        http2: bool = True,
+    ):
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("h2 is not installed; the LLM client falls back to HTTP/1.1")
+                http2 = False
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            http2=http2,
+        )
+
+    @staticmethod
+    def _error(response: httpx.Response) -> LLMError:
+        try:
+            message = response.json()["error"]["message"]
+        except Exception:
+            message = response.text[:200]
+        retry_after = response.headers.get("retry-after")
+        return LLMError(
+            f"{response.status_code}: {message}",
+            retryable=response.status_code == 429 or response.status_code >= 500,
+            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+        )
+
+    async def complete(
+        self, model: str, messages: ChatMessages, usage: Optional[Usage] = None, **params
+    ) -> str:
+        try:
+            response = await self._client.post(
+                "/chat/completions", json={"model": model, "messages": messages, **params}
+            )
+        except httpx.TransportError as exc:
+            raise LLMError(f"{type(exc).__name__}: {exc}", retryable=True) from exc
+        if response.status_code >= 400:
+            raise self._error(response)
+        payload = response.json()
+        if usage is not None and payload.get("usage"):
+            usage.prompt_tokens = payload["usage"].get("prompt_tokens")
+            usage.completion_tokens = payload["usage"].get("completion_tokens")
+        return payload["choices"][0]["message"]["content"]
+
+    async def stream(
+        self, model: str, messages: ChatMessages, usage: Optional[Usage] = None, **params
+    ) -> AsyncIterator[str]:
+        body = {"model": model, "messages": messages, "stream": True, **params}
+        if usage is not None:
+            # The last chunk then carries the token counts (with empty choices)
+            body["stream_options"] = {"include_usage": True}
+        try:
+            async with self._client.stream("POST", "/chat/completions", json=body) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    raise self._error(response)
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        # Read on to the end of the body: leaving the block early
+                        # closes the connection instead of returning it to the pool
+                        continue
+                    payload = json.loads(data)
+                    if usage is not None and payload.get("usage"):
+                        usage.prompt_tokens = payload["usage"].get("prompt_tokens")
+                        usage.completion_tokens = payload["usage"].get("completion_tokens")
+                    choices = payload.get("choices")
+                    if choices:
+                        content = choices[0].get("delta", {}).get("content")
+                        if content:
+                            yield content
+        except httpx.TransportError as exc:
+            raise LLMError(f"{type(exc).__name__}: {exc}", retryable=True) from exc
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+class FakeProvider(LLMProvider):
+    """Offline stand-in that echoes the last user message back, word by word."""
+
+    def __init__(self, latency: float = 0.0, token_delay: float = 0.0, reply: Optional[str] = None):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.reply = reply
+        self.calls = 0
+
+    @staticmethod
+    def _count(texts) -> int:
+        return sum(len(re.findall(r"\S+", text)) for text in texts)
+
+    def _reply(self, messages: ChatMessages) -> str:
+        if self.reply is not None:
+            return self.reply
+        last_user = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        return f"You said: {last_user}"
+
+    async def complete(
+        self, model: str, messages: ChatMessages, usage: Optional[Usage] = None, **params
+    ) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        reply = self._reply(messages)
+        if usage is not None:
+            usage.prompt_tokens = self._count(m["content"] for m in messages)
+            usage.completion_tokens = self._count([reply])
+        return reply
+
+    async def stream(
+        self, model: str, messages: ChatMessages, usage: Optional[Usage] = None, **params
+    ) -> AsyncIterator[str]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        tokens = re.findall(r"\S+\s*", self._reply(messages))
+        for token in tokens:
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield token
+        if usage is not None:
+            usage.prompt_tokens = self._count(m["content"] for m in messages)
+            usage.completion_tokens = len(tokens)
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures. Once ``reset_timeout``
+    has passed a single trial call is let through; its outcome closes or re-opens
+    the circuit. A trial that never reports back is replaced after another
+    ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_started_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        now = self._clock()
+        if now - self._opened_at < self.reset_timeout:
+            return False
+        if self._trial_started_at is not None and now - self._trial_started_at < self.reset_timeout:
+            return False
+        self._trial_started_at = now
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_started_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._trial_started_at is not None or self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logger.warning("LLM circuit opened after %d consecutive failures", self._failures)
+            self._opened_at = self._clock()
+        self._trial_started_at = None
+
+
+class LLMClient:
+    def __init__(
+        self,
+        provider: LLMProvider,
+        max_concurrency_per_model: int,
+        queue_timeout: float,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        breaker: CircuitBreaker,
+    ):
+        self.provider = provider
+        self.max_concurrency_per_model = max_concurrency_per_model
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def _slot(self, model: str):
+        semaphore = self._semaphores.get(model)
+        if semaphore is None:
+            semaphore = self._semaphores[model] = asyncio.Semaphore(self.max_concurrency_per_model)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            llm_requests_total.inc(model=model, result="queue_timeout")
+            raise LLMUnavailable(f"No free {model} slot within {self.queue_timeout}s", retry_after=1.0)
+        llm_inflight_requests.inc(model=model)
+        try:
+            yield
+        finally:
+            llm_inflight_requests.dec(model=model)
+            semaphore.release()
+
+    def _check_circuit(self, model: str) -> None:
+        if not self.breaker.allow():
+            llm_requests_total.inc(model=model, result="circuit_open")
+            raise LLMUnavailable("LLM provider is unavailable", retry_after=max(1.0, self.breaker.retry_after()))
+
+    def _backoff(self, attempt: int, error: LLMError) -> float:
+        # Full jitter keeps retries from many requests from arriving in lockstep
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if error.retry_after is not None:
+            delay = max(delay, min(error.retry_after, self.backoff_max))
+        return delay
+
+    def _record(self, error: LLMError) -> None:
+        # Only transient failures count against the provider; a rejected
+        # request (400, 401, ...) still proves it is reachable
+        if error.retryable:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    async def _failed(self, model: str, attempt: int, error: LLMError) -> None:
+        """Record a failed attempt; re-raise unless it should be retried."""
+        self._record(error)
+        if not error.retryable or attempt >= self.max_retries or self.breaker.is_open:
+            llm_requests_total.inc(model=model, result="error")
+            raise error
+        llm_retries_total.inc(model=model)
+        await asyncio.sleep(self._backoff(attempt, error))
+
+    async def complete(
+        self, model: str, messages: ChatMessages, usage: Optional[Usage] = None, **params
+    ) -> str:
+        """Return the reply content; ``usage`` is filled in if the provider reports token counts."""
+        async with self._slot(model):
+            attempt = 0
+            while True:
+                self._check_circuit(model)
+                try:
+                    content = await self.provider.complete(model, messages, usage, **params)
+                except LLMError as error:
+                    await self._failed(model, attempt, error)
+                    attempt += 1
+                    continue
+                self.breaker.record_success()
+                llm_requests_total.inc(model=model, result="success")
+                if usage is not None and usage.reported:
+                    llm_tokens_total.inc(usage.prompt_tokens, model=model, kind="prompt")
+                    llm_tokens_total.inc(usage.completion_tokens, model=model, kind="completion")
+                return content
+
+    async def stream(
+        self, model: str, messages: ChatMessages, usage: Optional[Usage] = None, **params
+    ) -> AsyncIterator[str]:
+        """
+        Yield the content deltas of a streamed completion. Failures are only
+        retried before the first token; after that the caller has seen output.
+        ``usage`` is filled in if the provider reports token counts.
+        """
+        started = time.perf_counter()
+        async with self._slot(model):
+            attempt = 0
+            while True:
+                self._check_circuit(model)
+                received = 0
+                first_token_at = 0.0
+                try:
+                    async for content in self.provider.stream(model, messages, usage, **params):
+                        if not received:
+                            first_token_at = time.perf_counter()
+                            llm_time_to_first_token_seconds.observe(first_token_at - started, model=model)
+                        received += 1
+                        yield content
+                except LLMError as error:
+                    if received:
+                        self._record(error)
+                        llm_requests_total.inc(model=model, result="error")
+                        raise
+                    await self._failed(model, attempt, error)
+                    attempt += 1
+                    continue
+                self.breaker.record_success()
+                llm_requests_total.inc(model=model, result="success")
+                self._record_stream_usage(model, usage, received, first_token_at)
+                return
+
+    @staticmethod
+    def _record_stream_usage(model: str, usage: Optional[Usage], deltas: int, first_token_at: float) -> None:
+        if usage is not None and usage.reported:
+            llm_tokens_total.inc(usage.prompt_tokens, model=model, kind="prompt")
+            llm_tokens_total.inc(usage.completion_tokens, model=model, kind="completion")
+            tokens = usage.completion_tokens
+        else:
+            # Without reported counts each content delta is roughly one token
+            tokens = deltas
+        duration = time.perf_counter() - first_token_at
+        if deltas and duration > 0:
+            llm_stream_tokens_per_second.observe(tokens / duration, model=model)
+
+    async def aclose(self) -> None:
+        await self.provider.aclose()
+
+
+def create_llm_client() -> LLMClient:
+    if settings.LLM_PROVIDER == "fake":
+        provider: LLMProvider = FakeProvider()
+    else:
+        provider = OpenAIProvider(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+            connect_timeout=settings.LLM_CONNECT_TIMEOUT_SECONDS,
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            http2=settings.LLM_HTTP2,
+        )
+    return LLMClient(
+        provider,
+        max_concurrency_per_model=settings.LLM_MAX_CONCURRENCY_PER_MODEL,
+        queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+        max_retries=settings.LLM_MAX_RETRIES,
+        backoff_base=settings.LLM_RETRY_BACKOFF_SECONDS,
+        backoff_max=settings.LLM_RETRY_BACKOFF_MAX_SECONDS,
+        breaker=CircuitBreaker(
+            failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.LLM_CIRCUIT_RESET_SECONDS,
+        ),
+    )
+
+
+_llm_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """FastAPI dependency returning the process-wide client; override it in tests."""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = create_llm_client()
+    return _llm_client
+
+
+async def close_llm_client() -> None:
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.aclose()
+        _llm_client = None
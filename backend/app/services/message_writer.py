@@ -0,0 +1,199 @@
+"""
+Background persistence of streamed assistant replies.
+
+The SSE loop hands the writer the reply so far and never awaits the database.
+Writes are coalesced per message (only the newest content is written) and a
+single task flushes them in one transaction per batch, using its own session.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import func, null, update
+
+from app.core.metrics import registry
+from app.db.session import AsyncSessionLocal
+from app.models.conversation import Conversation, Message
+from app.services import usage
+from app.services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+RETRY_DELAY_SECONDS = 1.0
+
+message_writer_flush_seconds = registry.histogram(
+    "message_writer_flush_seconds",
+    "Time to persist one batch of streamed message writes.",
+)
+message_writer_batch_size = registry.histogram(
+    "message_writer_batch_size",
+    "Streamed message writes per flushed batch.",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250),
+)
+
+
+@dataclass
+class _PendingWrite:
+    message_id: str
+    conversation_id: str
+    content: str
+    is_complete: bool
+    final: bool
+    model: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    # Owner of the conversation; the final write charges the reply's tokens to them
+    user_id: Optional[str] = None
+    # Task definition schema found in the reply; the final write makes it the conversation's draft
+    json_schema: Optional[Dict[str, Any]] = None
+
+
+class MessageWriter:
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._pending: Dict[str, _PendingWrite] = {}
+        # Messages whose row already exists; later writes are UPDATEs
+        self._inserted: Set[str] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything still pending, then stop the writer task."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def checkpoint(
+        self, message_id: str, conversation_id: str, content: str, user_id: Optional[str] = None
+    ) -> None:
+        """Persist partial content of a reply that is still streaming."""
+        self._submit(_PendingWrite(
+            message_id, conversation_id, content, is_complete=False, final=False, user_id=user_id,
+        ))
+
+    def finalize(
+        self,
+        message_id: str,
+        conversation_id: str,
+        content: str,
+        is_complete: bool = True,
+        model: Optional[str] = None,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        user_id: Optional[str] = None,
+        json_schema: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Persist the last content of a reply; ``is_complete`` is False if the
+        stream was cut short. With ``user_id`` the reply's LLM call and tokens
+        are recorded in the usage ledger in the same transaction. The
+        conversation's draft schema is replaced by ``json_schema``, as the
+        reply is now the latest one.
+        """
+        self._submit(_PendingWrite(
+            message_id, conversation_id, content, is_complete=is_complete, final=True,
+            model=model, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+            user_id=user_id, json_schema=json_schema,
+        ))
+
+    def _submit(self, write: _PendingWrite) -> None:
+        previous = self._pending.get(write.message_id)
+        if previous is not None and previous.final:
+            return
+        self._pending[write.message_id] = write
+        self.start()
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self._pending:
+                batch, self._pending = self._pending, {}
+                try:
+                    await self._write(batch)
+                except Exception:
+                    logger.exception("Failed to persist %d streamed message(s)", len(batch))
+                    if self._stopping:
+                        return
+                    # Put back anything that wasn't superseded and retry shortly
+                    for message_id, write in batch.items():
+                        self._pending.setdefault(message_id, write)
+                    await asyncio.sleep(RETRY_DELAY_SECONDS)
+                    self._wakeup.set()
+                    continue
+            if self._stopping and not self._pending:
+                return
+
+    async def _write(self, batch: Dict[str, _PendingWrite]) -> None:
+        started = time.perf_counter()
+        async with self._session_factory() as db:
+            for write in batch.values():
+                values = dict(
+                    content=write.content,
+                    is_complete=write.is_complete,
+                    model=write.model,
+                    prompt_tokens=write.prompt_tokens,
+                    completion_tokens=write.completion_tokens,
+                )
+                conversation_values = {}
+                if write.message_id in self._inserted:
+                    await db.execute(
+                        update(Message).where(Message.id == write.message_id).values(**values)
+                    )
+                    # Inserts bump it through the Message listener; content updates must too,
+                    # since conversation ETags are derived from it
+                    conversation_values["last_message_at"] = func.now()
+                else:
+                    db.add(Message(
+                        id=write.message_id,
+                        conversation_id=write.conversation_id,
+                        role="assistant",
+                        **values,
+                    ))
+                if write.final:
+                    conversation_values["draft_json_schema"] = (
+                        write.json_schema if write.json_schema is not None else null()
+                    )
+                if conversation_values:
+                    await db.execute(
+                        update(Conversation)
+                        .where(Conversation.id == write.conversation_id)
+                        .values(**conversation_values)
+                    )
+                if write.final and write.user_id is not None:
+                    await usage.record_usage(
+                        db,
+                        write.user_id,
+                        "chat",
+                        model=write.model,
+                        reference_id=write.message_id,
+                        llm_calls=1,
+                        prompt_tokens=write.prompt_tokens or 0,
+                        completion_tokens=write.completion_tokens or 0,
+                    )
+            await db.commit()
+        for user_id in {write.user_id for write in batch.values() if write.user_id is not None}:
+            await response_cache.invalidate(user_id)
+        message_writer_flush_seconds.observe(time.perf_counter() - started)
+        message_writer_batch_size.observe(len(batch))
+        for write in batch.values():
+            if write.final:
+                self._inserted.discard(write.message_id)
+            else:
+                self._inserted.add(write.message_id)
+
+
+message_writer = MessageWriter()
@@ -0,0 +1,265 @@
+"""
+Local model catalog used to serve recommendations without calling the Hub.
+
+A background refresher pulls the most downloaded models for each pipeline tag
+in ``MODEL_CATALOG_PIPELINE_TAGS`` and writes them, together with an inverted
+index from keyword to model, to a gzip'd JSON file. Requests only read the
+in-memory copy; other worker processes pick up a new file when it changes.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import math
+import os
+import re
+import time
+from collections import defaultdict
+from dataclasses import replace
+from typing import Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.services.model_hub import DEFAULT_MODELS, HubClient, HubModel, create_hub_client
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FORMAT_VERSION = 2
+
+# A model matching a whole keyword ("text-classification") outranks one that
+# only matches its parts ("text", "classification")
+FULL_TERM_WEIGHT = 2.0
+PART_TERM_WEIGHT = 1.0
+DOWNLOADS_WEIGHT = 0.15
+LIKES_WEIGHT = 0.05
+
+model_catalog_size = registry.gauge(
+    "model_catalog_models",
+    "Models in the local recommendation catalog.",
+)
+model_catalog_syncs_total = registry.counter(
+    "model_catalog_syncs_total",
+    "Catalog syncs from the Hub by result.",
+    ["result"],
+)
+
+
+def _terms(text: str) -> List[str]:
+    """The lowercased text plus its alphanumeric parts."""
+    text = text.strip().lower()
+    if not text:
+        return []
+    parts = [part for part in re.split(r"[^a-z0-9]+", text) if part]
+    return [text] + [part for part in parts if part != text]
+
+
+def _model_terms(model: HubModel) -> Iterable[str]:
+    texts = [model.model_id, model.model_id.split('/')[-1]] + list(model.tags)
+    if model.pipeline_tag:
+        texts.append(model.pipeline_tag)
+    terms = set()
+    for text in texts:
+        terms.update(_terms(text))
+    return terms
+
+
+class ModelCatalog:
+    def __init__(
+        self,
+        models: List[HubModel],
+        postings: Dict[str, List[int]],
+        synced_at: Optional[float] = None,
+    ):
+        self.models = models
+        self.postings = postings
+        self.synced_at = synced_at
+
+    @classmethod
+    def build(cls, models: Iterable[HubModel], synced_at: Optional[float] = None) -> "ModelCatalog":
+        unique: Dict[str, HubModel] = {}
+        for model in models:
+            kept = unique.get(model.model_id)
+            if kept is None:
+                unique[model.model_id] = model
+            else:
+                # The Hub has no curated names; keep those of a default entry for the same model
+                unique[model.model_id] = replace(
+                    kept,
+                    description=kept.description or model.description,
+                    display_name=kept.display_name or model.display_name,
+                )
+        ordered = list(unique.values())
+        postings = defaultdict(list)
+        for index, model in enumerate(ordered):
+            for term in _model_terms(model):
+                postings[term].append(index)
+        return cls(ordered, dict(postings), synced_at)
+
+    @classmethod
+    def seed(cls) -> "ModelCatalog":
+        """Catalog of the built-in default models, used until the first sync."""
+        return cls.build(model for group in DEFAULT_MODELS.values() for model in group)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ModelCatalog"]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        if data.get("version") != CATALOG_FORMAT_VERSION:
+            return None
+        models = [
+            HubModel(
+                model_id=model_id,
+                tags=tags,
+                pipeline_tag=pipeline_tag,
+                downloads=downloads,
+                likes=likes,
+                description=description,
+                display_name=display_name,
+            )
+            for model_id, tags, pipeline_tag, downloads, likes, description, display_name in data["models"]
+        ]
+        return cls(models, data["postings"], data.get("synced_at"))
+
+    def save(self, path: str) -> None:
+        data = {
+            "version": CATALOG_FORMAT_VERSION,
+            "synced_at": self.synced_at,
+            # Rows instead of objects keep the file compact
+            "models": [
+                [m.model_id, m.tags, m.pipeline_tag, m.downloads, m.likes, m.description, m.display_name]
+                for m in self.models
+            ],
+            "postings": self.postings,
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        # Atomic swap so readers never see a partial file
+        os.replace(tmp_path, path)
+
+    def search(self, keywords: str, limit: int) -> List[HubModel]:
+        """Rank models by weighted keyword matches (rarer terms count more), then popularity."""
+        if not self.models:
+            return []
+        total = len(self.models)
+        scores: Dict[int, float] = defaultdict(float)
+        for keyword in keywords.split(","):
+            for position, term in enumerate(_terms(keyword)):
+                matches = self.postings.get(term)
+                if not matches:
+                    continue
+                idf = math.log(1 + total / len(matches))
+                weight = FULL_TERM_WEIGHT if position == 0 else PART_TERM_WEIGHT
+                for index in matches:
+                    scores[index] += weight * idf
+
+        def rank(index: int) -> float:
+            model = self.models[index]
+            return (
+                scores[index]
+                + DOWNLOADS_WEIGHT * math.log10(model.downloads + 1)
+                + LIKES_WEIGHT * math.log10(model.likes + 1)
+            )
+
+        best = sorted(scores, key=rank, reverse=True)[:limit]
+        return [self.models[index] for index in best]
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+
+class ModelCatalogService:
+    """Holds the current catalog and keeps it synced with the Hub."""
+
+    def __init__(
+        self,
+        path: str,
+        client: HubClient,
+        refresh_interval: float,
+        pipeline_tags: List[str],
+        models_per_tag: int,
+    ):
+        self.path = path
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.pipeline_tags = pipeline_tags
+        self.models_per_tag = models_per_tag
+        self._catalog: Optional[ModelCatalog] = None
+        self._mtime: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def catalog(self) -> ModelCatalog:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if self._catalog is None or (mtime is not None and mtime != self._mtime):
+            loaded = ModelCatalog.load(self.path) if mtime is not None else None
+            self._set(loaded or self._catalog or ModelCatalog.seed(), mtime)
+        return self._catalog
+
+    def _set(self, catalog: ModelCatalog, mtime: Optional[float]) -> None:
+        self._catalog = catalog
+        self._mtime = mtime
+        model_catalog_size.set(len(catalog))
+
+    def search(self, keywords: str, limit: int) -> List[HubModel]:
+        return self.catalog.search(keywords, limit)
+
+    def is_stale(self) -> bool:
+        synced_at = self.catalog.synced_at
+        return synced_at is None or time.time() - synced_at >= self.refresh_interval
+
+    def sync(self) -> ModelCatalog:
+        """Fetch the top models per pipeline tag from the Hub and replace the catalog (blocking)."""
+        models: List[HubModel] = []
+        for pipeline_tag in self.pipeline_tags:
+            models.extend(self.client.list_top(pipeline_tag, self.models_per_tag))
+        # Keep the defaults reachable even if the Hub omits them
+        models.extend(model for group in DEFAULT_MODELS.values() for model in group)
+        catalog = ModelCatalog.build(models, synced_at=time.time())
+        catalog.save(self.path)
+        self._set(catalog, os.stat(self.path).st_mtime)
+        return catalog
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            # Another worker may have synced already; the file's synced_at tells us
+            if self.is_stale():
+                try:
+                    catalog = await asyncio.to_thread(self.sync)
+                    model_catalog_syncs_total.inc(result="success")
+                    logger.info("Model catalog synced: %d models", len(catalog))
+                except Exception:
+                    model_catalog_syncs_total.inc(result="error")
+                    logger.exception("Model catalog sync failed")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        if self.refresh_interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+model_catalog = ModelCatalogService(
+    path=settings.MODEL_CATALOG_PATH,
+    client=create_hub_client(),
+    refresh_interval=settings.MODEL_CATALOG_REFRESH_SECONDS,
+    pipeline_tags=settings.MODEL_CATALOG_PIPELINE_TAGS,
+    models_per_tag=settings.MODEL_CATALOG_MODELS_PER_TAG,
+)
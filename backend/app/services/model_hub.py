@@ -0,0 +1,174 @@
+"""
+Clients for searching models on the Hugging Face Hub.
+
+``HuggingFaceHubClient`` calls the real Hub. ``LocalHubClient`` is an offline
+stand-in backed by an in-memory list (optionally with simulated latency), used
+for local development and for benchmarking cache hit/miss latency.
+"""
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+
+from huggingface_hub import list_models
+
+from app.core.config import settings
+
+
+@dataclass
+class HubModel:
+    model_id: str
+    tags: List[str] = field(default_factory=list)
+    pipeline_tag: Optional[str] = None
+    downloads: int = 0
+    likes: int = 0
+    description: Optional[str] = None
+    display_name: Optional[str] = None
+
+    @property
+    def author(self) -> Optional[str]:
+        return self.model_id.split('/')[0] if '/' in self.model_id else None
+
+    @property
+    def name(self) -> str:
+        return self.display_name or self.model_id.split('/')[-1]
+
+    def to_dict(self) -> dict:
+        return {
+            "model_id": self.model_id,
+            "tags": self.tags,
+            "pipeline_tag": self.pipeline_tag,
+            "downloads": self.downloads,
+            "likes": self.likes,
+            "description": self.description,
+            "display_name": self.display_name,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HubModel":
+        return cls(**data)
+
+
+# Well-known models per task type, used when a search finds nothing
+DEFAULT_MODELS = {
+    'text-classification': [
+        HubModel(
+            model_id="distilbert-base-uncased-finetuned-sst-2-english",
+            display_name="DistilBERT SST-2",
+            description="A distilled version of BERT fine-tuned on sentiment analysis",
+            tags=["text-classification", "sentiment-analysis", "distilbert"],
+            pipeline_tag="text-classification",
+            downloads=1000000,
+            likes=100,
+        ),
+        HubModel(
+            model_id="bert-base-uncased",
+            display_name="BERT base uncased",
+            description="BERT base model, suitable for fine-tuning on various tasks",
+            tags=["bert", "text-classification", "english"],
+            pipeline_tag="fill-mask",
+            downloads=5000000,
+            likes=500,
+        ),
+    ],
+    'token-classification': [
+        HubModel(
+            model_id="dslim/bert-base-NER",
+            display_name="BERT NER",
+            description="BERT fine-tuned on NER task",
+            tags=["token-classification", "ner", "bert"],
+            pipeline_tag="token-classification",
+            downloads=500000,
+            likes=50,
+        ),
+    ],
+    'question-answering': [
+        HubModel(
+            model_id="distilbert-base-cased-distilled-squad",
+            display_name="DistilBERT SQuAD",
+            description="DistilBERT fine-tuned on SQuAD for question answering",
+            tags=["question-answering", "squad", "distilbert"],
+            pipeline_tag="question-answering",
+            downloads=800000,
+            likes=80,
+        ),
+    ],
+}
+
+
+class HubClient:
+    def search(self, query: str, limit: int) -> List[HubModel]:
+        """Return up to ``limit`` models matching ``query``, best matches first."""
+        raise NotImplementedError
+
+    def list_top(self, pipeline_tag: str, limit: int) -> List[HubModel]:
+        """Return the ``limit`` most downloaded models for a pipeline tag."""
+        raise NotImplementedError
+
+
+class HuggingFaceHubClient(HubClient):
+    def search(self, query: str, limit: int) -> List[HubModel]:
+        return self._list(search=query, limit=limit)
+
+    def list_top(self, pipeline_tag: str, limit: int) -> List[HubModel]:
+        return self._list(filter=pipeline_tag, limit=limit)
+
+    def _list(self, **kwargs) -> List[HubModel]:
+        models = list_models(
+            sort="downloads",  # Sort by popularity
+            direction=-1,  # Descending order
+            **kwargs,
+        )
+        return [
+            HubModel(
+                model_id=model.modelId,
+                tags=list(getattr(model, 'tags', None) or []),
+                pipeline_tag=getattr(model, 'pipeline_tag', None),
+                downloads=getattr(model, 'downloads', None) or 0,
+                likes=getattr(model, 'likes', None) or 0,
+                description=getattr(model, 'description', None),
+            )
+            for model in models
+        ]
+
+
+class LocalHubClient(HubClient):
+    """Offline stand-in: keyword search over a fixed list of models."""
+
+    def __init__(self, models: Optional[Iterable[HubModel]] = None, latency: float = 0.0):
+        if models is None:
+            models = [model for group in DEFAULT_MODELS.values() for model in group]
+        self.models = list(models)
+        self.latency = latency
+        self.calls = 0
+
+    def search(self, query: str, limit: int) -> List[HubModel]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        terms = [term for term in re.split(r"[,\s]+", query.lower()) if term]
+        scored = []
+        for model in self.models:
+            haystack = [model.model_id.lower()] + [tag.lower() for tag in model.tags]
+            score = sum(1 for term in terms if any(term in text for text in haystack))
+            if score:
+                scored.append((score, model.downloads, model))
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return [model for _, _, model in scored[:limit]]
+
+    def list_top(self, pipeline_tag: str, limit: int) -> List[HubModel]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        matches = [
+            model for model in self.models
+            if model.pipeline_tag == pipeline_tag or pipeline_tag in model.tags
+        ]
+        matches.sort(key=lambda model: model.downloads, reverse=True)
+        return matches[:limit]
+
+
+def create_hub_client() -> HubClient:
+    if settings.MODEL_HUB_BACKEND == "local":
+        return LocalHubClient()
+    return HuggingFaceHubClient()
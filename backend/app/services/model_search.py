@@ -0,0 +1,110 @@
+"""
+Cached model search with stale-while-revalidate.
+
+Results are cached under the normalized keyword set, so the same keywords in a
+different order or case share an entry. A fresh entry is served as is; a stale
+one (older than the TTL but within the stale window) is served immediately
+while a background refresh fetches new results from the Hub.
+"""
+import logging
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Set
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import registry
+from app.services.model_hub import HubClient, HubModel, create_hub_client
+
+logger = logging.getLogger(__name__)
+
+model_search_cache_requests_total = registry.counter(
+    "model_search_cache_requests_total",
+    "Model search cache lookups by result (fresh, stale or miss).",
+    ["result"],
+)
+hub_search_seconds = registry.histogram(
+    "hub_search_seconds",
+    "Latency of model searches against the Hub client.",
+)
+
+
+def normalize_keywords(keywords: str) -> str:
+    """Lowercase, dedupe and sort comma separated keywords."""
+    terms = {term.strip().lower() for term in re.split(r"[,\n]+", keywords)}
+    return ", ".join(sorted(term for term in terms if term))
+
+
+class ModelSearchCache:
+    def __init__(
+        self,
+        client: HubClient,
+        ttl: float,
+        stale_ttl: float,
+        maxsize: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.client = client
+        self.ttl = ttl
+        self._clock = clock
+        # Entries live for ttl + stale_ttl; age decides fresh vs stale
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl + stale_ttl, clock=clock)
+        self._refreshing: Set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="model-search-refresh")
+
+    def search(self, keywords: str, limit: int) -> List[HubModel]:
+        query = normalize_keywords(keywords)
+        key = f"{limit}:{query}"
+        entry = self._cache.get(key)
+        if entry is None:
+            model_search_cache_requests_total.inc(result="miss")
+            return self._fetch(key, query, limit)
+
+        fetched_at, models = entry
+        if self._clock() - fetched_at < self.ttl:
+            model_search_cache_requests_total.inc(result="fresh")
+        else:
+            model_search_cache_requests_total.inc(result="stale")
+            self._schedule_refresh(key, query, limit)
+        return models
+
+    def _fetch(self, key: str, query: str, limit: int) -> List[HubModel]:
+        start = time.perf_counter()
+        try:
+            models = self.client.search(query, limit)
+        finally:
+            hub_search_seconds.observe(time.perf_counter() - start)
+        self._cache.set(key, (self._clock(), models))
+        return models
+
+    def _schedule_refresh(self, key: str, query: str, limit: int) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._fetch(key, query, limit)
+            except Exception:
+                # Keep serving the stale entry; the next request retries
+                logger.exception("Background refresh failed for model search %r", query)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._executor.submit(refresh)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+model_search_cache = ModelSearchCache(
+    client=create_hub_client(),
+    ttl=settings.MODEL_SEARCH_CACHE_TTL_SECONDS,
+    stale_ttl=settings.MODEL_SEARCH_CACHE_STALE_SECONDS,
+    maxsize=settings.MODEL_SEARCH_CACHE_MAX_ENTRIES,
+)
@@ -0,0 +1,156 @@
+"""
+Model recommendation pipeline.
+
+The extracted keywords are split into several targeted queries (the full
+keyword set, task type, domain, language). Each query runs concurrently
+against the local catalog and, when enabled, the Hub, with a per-call timeout
+so one slow search can't hold up the response. Results are merged by
+``model_id`` with reciprocal rank fusion and the best ``limit`` are returned.
+
+The same pipeline runs as jobs: ``models.recommend`` for clients that poll
+rather than wait, and ``task_definition.finalize``, which fills in the
+recommended models of a new task definition.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.db.session import AsyncSessionLocal
+from app.models.conversation import TaskDefinition
+from app.schemas.conversation import ModelRecommendation, ModelRecommendationResponse
+from app.services import jobs, keywords, usage
+from app.services.keywords import task_definition_terms
+from app.services.llm import LLMClient, get_llm_client
+from app.services.model_catalog import model_catalog
+from app.services.model_hub import DEFAULT_MODELS, HubModel
+from app.services.model_search import model_search_cache
+from app.services.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+MAX_QUERIES = 4
+# Reciprocal rank fusion constant; dampens the advantage of the very top ranks
+RRF_K = 60
+
+model_search_timeouts_total = registry.counter(
+    "model_search_timeouts_total",
+    "Recommendation searches abandoned after MODEL_SEARCH_TIMEOUT_SECONDS.",
+    ["source"],
+)
+
+
+def build_queries(task_definition: dict, search_keywords: str) -> List[str]:
+    queries = [search_keywords] + task_definition_terms(task_definition)
+    unique = []
+    for query in queries:
+        if query and query not in unique:
+            unique.append(query)
+    return unique[:MAX_QUERIES]
+
+
+async def _search_hub(query: str, limit: int) -> List[HubModel]:
+    try:
+        return await asyncio.wait_for(
+            asyncio.to_thread(model_search_cache.search, query, limit),
+            timeout=settings.MODEL_SEARCH_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        model_search_timeouts_total.inc(source="hub")
+        return []
+    except Exception:
+        logger.exception("Hub search failed for %r", query)
+        return []
+
+
+async def _search(query: str, limit: int) -> List[HubModel]:
+    models = model_catalog.search(query, limit)
+    if len(models) < limit and settings.MODEL_CATALOG_HUB_FALLBACK:
+        seen = {model.model_id for model in models}
+        models = models + [m for m in await _search_hub(query, limit) if m.model_id not in seen]
+    return models
+
+
+def merge_results(result_lists: List[List[HubModel]], limit: int) -> List[HubModel]:
+    scores: Dict[str, float] = {}
+    models: Dict[str, HubModel] = {}
+    for results in result_lists:
+        for rank, model in enumerate(results):
+            scores[model.model_id] = scores.get(model.model_id, 0.0) + 1.0 / (RRF_K + rank + 1)
+            models.setdefault(model.model_id, model)
+    ranked = sorted(models, key=lambda model_id: (scores[model_id], models[model_id].downloads), reverse=True)
+    return [models[model_id] for model_id in ranked[:limit]]
+
+
+async def recommend_models(task_definition: dict, search_keywords: str, limit: int) -> List[HubModel]:
+    queries = build_queries(task_definition, search_keywords)
+    # Over-fetch per query so the merge has enough candidates to re-rank
+    results = await asyncio.gather(*(_search(query, limit * 2) for query in queries))
+    return merge_results(list(results), limit)
+
+
+async def recommend(
+    db: AsyncSession, llm: LLMClient, task_definition: dict, user_id: Optional[str] = None
+) -> Tuple[str, List[HubModel]]:
+    """
+    Search keywords for a task definition and the models recommended for it,
+    falling back to the defaults for its task type when nothing matches.
+    """
+    # Stage 1: Use AI to extract search keywords (memoized per task definition content)
+    search_keywords = await keywords.get_search_keywords(db, llm, task_definition, user_id=user_id)
+    # Stage 2: Run targeted queries (keywords, task type, domain, language)
+    # concurrently against the local catalog and merge the results
+    models = await recommend_models(task_definition, search_keywords, limit=settings.RECOMMENDATION_LIMIT)
+    if not models:
+        task_type = str(task_definition.get("task_type", "")).lower()
+        models = list(DEFAULT_MODELS.get(task_type, []))
+    return search_keywords, models
+
+
+def to_recommendation(model: HubModel) -> ModelRecommendation:
+    return ModelRecommendation(
+        model_id=model.model_id,
+        model_name=model.name,
+        description=model.description,
+        tags=model.tags,
+        downloads=model.downloads,
+        likes=model.likes,
+        author=model.author
+    )
+
+
+@jobs.handler("models.recommend")
+async def recommend_job(job: jobs.JobContext) -> Dict[str, Any]:
+    async with AsyncSessionLocal() as db:
+        search_keywords, models = await recommend(
+            db, get_llm_client(), job.payload["task_definition"], user_id=job.user_id
+        )
+        if job.user_id is not None:
+            await usage.record_usage(db, job.user_id, "recommendation", recommendation_calls=1)
+        await db.commit()
+    response = ModelRecommendationResponse(
+        recommendations=[to_recommendation(model) for model in models],
+        search_keywords=search_keywords,
+    )
+    return response.model_dump(mode="json")
+
+
+@jobs.handler("task_definition.finalize")
+async def finalize_task_definition(job: jobs.JobContext) -> Optional[Dict[str, Any]]:
+    """Recommend models for a newly created task definition and store their ids on it."""
+    async with AsyncSessionLocal() as db:
+        task_definition = await db.get(TaskDefinition, job.payload["task_definition_id"])
+        if task_definition is None:
+            return None
+        spec = task_definition.json_schema
+        if not isinstance(spec, dict) or not spec:
+            spec = {"name": task_definition.name, "description": task_definition.description}
+        await job.progress(0.0, "Extracting search keywords")
+        search_keywords, models = await recommend(db, get_llm_client(), spec, user_id=task_definition.user_id)
+        task_definition.recommended_models = [model.model_id for model in models]
+        await db.commit()
+    await response_cache.invalidate(task_definition.user_id)
+    return {"recommended_models": task_definition.recommended_models, "search_keywords": search_keywords}
@@ -0,0 +1,100 @@
+"""
+Per-user cache of serialized conversation reads, validated by ETag.
+
+A cached read first runs a cheap version query (timestamps and message
+counts) and derives the ETag from it and the request. A matching
+``If-None-Match`` gets a 304, a cache entry with the same ETag is returned
+as-is, and only a miss loads and serializes the full response. Writes bump the
+user's generation so superseded entries are no longer reachable; correctness
+doesn't depend on that, since every entry is checked against the current ETag.
+"""
+import hashlib
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+
+from app.core import json
+from app.core.cache import CacheBackend, create_cache_backend
+from app.core.config import settings
+from app.core.metrics import registry
+
+response_cache_requests_total = registry.counter(
+    "response_cache_requests_total",
+    "Conversation reads by endpoint and result (not_modified, hit or miss).",
+    ["endpoint", "result"],
+)
+
+# (body, extra headers) of a freshly built response
+Built = Tuple[Any, Dict[str, str]]
+
+
+def make_etag(*parts: Any) -> str:
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, ttl: float, enabled: bool = True):
+        self._backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+
+    async def _generation(self, user_id: str) -> str:
+        return await self._backend.get(f"gen:{user_id}") or "0"
+
+    async def invalidate(self, user_id: str) -> None:
+        """Drop every cached response of a user (called after writes)."""
+        if self.enabled:
+            await self._backend.set(f"gen:{user_id}", uuid.uuid4().hex, self.ttl)
+
+    async def respond(
+        self,
+        request: Request,
+        endpoint: str,
+        user_id: str,
+        version: Any,
+        build: Callable[[], Awaitable[Built]],
+    ) -> Response:
+        """Serve a conditional, cached JSON response for ``version`` of the resource."""
+        etag = make_etag(endpoint, user_id, request.url.query, version)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _matches(request, etag):
+            response_cache_requests_total.inc(endpoint=endpoint, result="not_modified")
+            return Response(status_code=304, headers=headers)
+
+        key = None
+        if self.enabled:
+            key = f"{user_id}:{await self._generation(user_id)}:{endpoint}?{request.url.query}"
+            cached: Optional[dict] = await self._backend.get(key)
+            if cached is not None and cached["etag"] == etag:
+                response_cache_requests_total.inc(endpoint=endpoint, result="hit")
+                return Response(
+                    cached["body"], media_type="application/json", headers={**cached["headers"], **headers}
+                )
+
+        response_cache_requests_total.inc(endpoint=endpoint, result="miss")
+        data, extra_headers = await build()
+        body = json.dumps(data)
+        if key is not None:
+            await self._backend.set(key, {"etag": etag, "body": body, "headers": extra_headers}, self.ttl)
+        return Response(body, media_type="application/json", headers={**extra_headers, **headers})
+
+
+response_cache = ResponseCache(
+    create_cache_backend(
+        "responses",
+        maxsize=settings.RESPONSE_CACHE_MAX_ENTRIES,
+        ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+    ),
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+)
@@ -0,0 +1,68 @@
+"""
+Extraction of the task definition schema from assistant replies.
+
+The assistant presents the schema as a fenced ```json block. ``SchemaExtractor``
+finds it while a reply streams: every delta is scanned once, and only a few
+characters are kept back in case a fence is split between deltas. The first
+block holding a JSON object becomes the conversation's draft schema, which
+``create_task_definition`` then promotes without re-reading the reply.
+"""
+from typing import Any, Dict, List, Optional
+
+from app.core import json
+
+OPENING_FENCE = "```json"
+CLOSING_FENCE = "```"
+
+
+def parse_schema(block: str) -> Optional[Dict[str, Any]]:
+    """The JSON object in ``block``, or None if it isn't one."""
+    try:
+        schema = json.loads(block.strip())
+    except ValueError:
+        return None
+    return schema if isinstance(schema, dict) else None
+
+
+class SchemaExtractor:
+    def __init__(self):
+        self.schema: Optional[Dict[str, Any]] = None
+        self._in_block = False
+        self._block: List[str] = []
+        # Unconsumed tail that may be the start of a fence
+        self._pending = ""
+
+    def feed(self, delta: str) -> Optional[Dict[str, Any]]:
+        """Consume the next delta; return the schema once, as soon as its block closes."""
+        if self.schema is not None:
+            return None
+        text = self._pending + delta
+        while True:
+            fence = CLOSING_FENCE if self._in_block else OPENING_FENCE
+            index = text.find(fence)
+            if index == -1:
+                split = max(0, len(text) - len(fence) + 1)
+                if self._in_block:
+                    self._block.append(text[:split])
+                self._pending = text[split:]
+                return None
+            if not self._in_block:
+                self._in_block = True
+                text = text[index + len(fence):]
+                continue
+            self._block.append(text[:index])
+            text = text[index + len(fence):]
+            self._in_block = False
+            schema = parse_schema("".join(self._block))
+            self._block = []
+            if schema is not None:
+                self.schema = schema
+                self._pending = ""
+                return schema
+
+
+def extract_schema(content: str) -> Optional[Dict[str, Any]]:
+    """The schema of a complete reply."""
+    extractor = SchemaExtractor()
+    extractor.feed(content)
+    return extractor.schema
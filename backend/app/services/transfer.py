@@ -0,0 +1,308 @@
+"""
+Bulk NDJSON export and import of a user's conversations.
+
+Export streams conversations, then messages, then task definitions, one JSON
+object per line, from server-side cursors read ``TRANSFER_BATCH_SIZE`` rows at
+a time, so memory stays flat however much a user has. Import reads the request
+body line by line and writes rows with executemany inserts in batches of the
+same size, all in one transaction. Imported rows get fresh ids, so an export
+can be loaded again (or into another account) without clashing. Conversation
+counters are set from the imported messages, since bulk inserts bypass the
+``Message`` insert listener, and summary boundaries are pointed at the new
+message ids.
+"""
+import random
+import uuid
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import json
+from app.core.config import settings
+from app.core.metrics import registry
+from app.db.session import AsyncSessionLocal
+from app.models.conversation import Conversation, Message, TaskDefinition
+from app.schemas.transfer import (
+    ConversationRecord,
+    ExportRecord,
+    ImportResult,
+    MessageRecord,
+)
+from app.services import keywords
+
+transfer_rows_total = registry.counter(
+    "transfer_rows_total",
+    "Rows exported or imported, by direction and record type.",
+    ["direction", "type"],
+)
+
+_record_adapter = TypeAdapter(ExportRecord)
+
+_CONVERSATION_COLUMNS = (
+    Conversation.id,
+    Conversation.title,
+    Conversation.is_completed,
+    Conversation.summary,
+    Conversation.summarized_until,
+    Conversation.summarized_until_id,
+    Conversation.draft_json_schema,
+    Conversation.created_at,
+    Conversation.updated_at,
+)
+_MESSAGE_COLUMNS = (
+    Message.id,
+    Message.conversation_id,
+    Message.role,
+    Message.content,
+    Message.is_complete,
+    Message.model,
+    Message.prompt_tokens,
+    Message.completion_tokens,
+    Message.created_at,
+)
+_TASK_DEFINITION_COLUMNS = (
+    TaskDefinition.id,
+    TaskDefinition.conversation_id,
+    TaskDefinition.name,
+    TaskDefinition.description,
+    TaskDefinition.json_schema,
+    TaskDefinition.recommended_models,
+    TaskDefinition.created_at,
+    TaskDefinition.updated_at,
+)
+
+
+class ImportFailed(ValueError):
+    def __init__(self, line: int, detail: str):
+        super().__init__(f"Line {line}: {detail}")
+        self.line = line
+
+
+def _export_queries(user_id: str) -> List[Tuple[str, Any]]:
+    return [
+        (
+            "conversation",
+            select(*_CONVERSATION_COLUMNS)
+            .where(Conversation.user_id == user_id)
+            .order_by(Conversation.created_at, Conversation.id),
+        ),
+        (
+            # Walks idx_messages_conversation_created_id
+            "message",
+            select(*_MESSAGE_COLUMNS)
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(Conversation.user_id == user_id)
+            .order_by(Message.conversation_id, Message.created_at, Message.id),
+        ),
+        (
+            "task_definition",
+            select(*_TASK_DEFINITION_COLUMNS)
+            .where(TaskDefinition.user_id == user_id)
+            .order_by(TaskDefinition.created_at, TaskDefinition.id),
+        ),
+    ]
+
+
+async def export_ndjson(user_id: str) -> AsyncIterator[bytes]:
+    """Yield the user's data as NDJSON, one chunk per fetched batch of rows."""
+    # Own session: the export outlives the request handler that started it
+    async with AsyncSessionLocal() as db:
+        for record_type, query in _export_queries(user_id):
+            result = await db.stream(query.execution_options(yield_per=settings.TRANSFER_BATCH_SIZE))
+            async for rows in result.partitions():
+                yield b"".join(
+                    json.dumps_bytes({"type": record_type, **row._asdict()}) + b"\n" for row in rows
+                )
+                transfer_rows_total.inc(len(rows), direction="export", type=record_type)
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """Split a byte stream into numbered, non-blank lines."""
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield number, line
+        if len(buffer) > settings.TRANSFER_MAX_LINE_BYTES:
+            raise ImportFailed(number + 1, "line too long")
+    if buffer.strip():
+        yield number + 1, buffer
+
+
+def _aware(value: Optional[datetime], default: Optional[datetime] = None) -> Optional[datetime]:
+    if value is None:
+        return default
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _ordered_id(run_base: int, position: int) -> str:
+    """
+    A fresh message id whose first group is ``run_base + position``, so the
+    messages of a run sharing one timestamp keep their exported order.
+    """
+    return f"{run_base + position:08x}" + str(uuid.uuid4())[8:]
+
+
+class _Importer:
+    def __init__(self, db: AsyncSession, user_id: str):
+        self.db = db
+        self.user_id = user_id
+        self.result = ImportResult()
+        self.now = datetime.now(timezone.utc)
+        # Exported conversation id -> id of the imported copy
+        self.conversation_ids: Dict[str, str] = {}
+        # Imported conversation id -> [message_count, last_message_at]
+        self.counters: Dict[str, List[Any]] = {}
+        # Imported conversation id -> [summarized_until, exported summarized_until_id,
+        # new id of the last summarized message at that time]
+        self.boundaries: Dict[str, List[Any]] = {}
+        # (conversation id, created_at) of the last message, with its run's id base and position
+        self.run: Tuple[Optional[str], Optional[datetime]] = (None, None)
+        self.run_base = 0
+        self.run_position = 0
+        self.conversations: List[Dict[str, Any]] = []
+        self.messages: List[Dict[str, Any]] = []
+        self.task_definitions: List[Dict[str, Any]] = []
+
+    def _conversation_id(self, line: int, exported_id: str) -> str:
+        conversation_id = self.conversation_ids.get(exported_id)
+        if conversation_id is None:
+            raise ImportFailed(line, f"conversation {exported_id} must be listed before what refers to it")
+        return conversation_id
+
+    async def add(self, line: int, record: Any) -> None:
+        if isinstance(record, ConversationRecord):
+            if record.id in self.conversation_ids:
+                raise ImportFailed(line, f"conversation {record.id} is listed twice")
+            conversation_id = self.conversation_ids[record.id] = str(uuid.uuid4())
+            self.result.conversations += 1
+            self.counters[conversation_id] = [0, None]
+            summarized_until = _aware(record.summarized_until)
+            if summarized_until is not None and record.summarized_until_id is not None:
+                self.boundaries[conversation_id] = [summarized_until, record.summarized_until_id, None]
+            self.conversations.append(dict(
+                id=conversation_id,
+                user_id=self.user_id,
+                title=record.title,
+                is_completed=record.is_completed,
+                summary=record.summary,
+                summarized_until=summarized_until,
+                # Set in finish(), once the boundary message has its new id
+                summarized_until_id=None,
+                draft_json_schema=record.draft_json_schema,
+                message_count=0,
+                created_at=_aware(record.created_at, self.now),
+                updated_at=_aware(record.updated_at),
+            ))
+        elif isinstance(record, MessageRecord):
+            conversation_id = self._conversation_id(line, record.conversation_id)
+            created_at = _aware(record.created_at, self.now)
+            self.result.messages += 1
+            counter = self.counters[conversation_id]
+            counter[0] += 1
+            if counter[1] is None or created_at > counter[1]:
+                counter[1] = created_at
+            # Exports list messages by (created_at, id); fresh ids must keep ties in that order
+            if (conversation_id, created_at) == self.run:
+                self.run_position += 1
+            else:
+                self.run = (conversation_id, created_at)
+                self.run_base = random.getrandbits(31)
+                self.run_position = 0
+            message_id = _ordered_id(self.run_base, self.run_position)
+            boundary = self.boundaries.get(conversation_id)
+            if boundary is not None and created_at == boundary[0] and record.id <= boundary[1]:
+                boundary[2] = message_id
+            self.messages.append(dict(
+                id=message_id,
+                conversation_id=conversation_id,
+                role=record.role,
+                content=record.content,
+                is_complete=record.is_complete,
+                model=record.model,
+                prompt_tokens=record.prompt_tokens,
+                completion_tokens=record.completion_tokens,
+                created_at=created_at,
+            ))
+        else:
+            self.result.task_definitions += 1
+            self.task_definitions.append(dict(
+                id=str(uuid.uuid4()),
+                conversation_id=self._conversation_id(line, record.conversation_id),
+                user_id=self.user_id,
+                name=record.name,
+                description=record.description,
+                json_schema=record.json_schema,
+                schema_hash=keywords.schema_hash(record.json_schema) if record.json_schema is not None else None,
+                recommended_models=record.recommended_models,
+                created_at=_aware(record.created_at, self.now),
+                updated_at=_aware(record.updated_at),
+            ))
+        if max(len(self.conversations), len(self.messages), len(self.task_definitions)) >= settings.TRANSFER_BATCH_SIZE:
+            await self.flush()
+
+    async def flush(self) -> None:
+        # Parents first, so every batch only refers to rows already written
+        for table, rows, record_type in (
+            (Conversation.__table__, self.conversations, "conversation"),
+            (Message.__table__, self.messages, "message"),
+            (TaskDefinition.__table__, self.task_definitions, "task_definition"),
+        ):
+            if rows:
+                await self.db.execute(insert(table), rows)
+                transfer_rows_total.inc(len(rows), direction="import", type=record_type)
+                rows.clear()
+
+    async def finish(self) -> ImportResult:
+        await self.flush()
+        conversations = Conversation.__table__
+        statement = (
+            update(conversations)
+            .where(conversations.c.id == bindparam("b_id"))
+            .values(message_count=bindparam("b_count"), last_message_at=bindparam("b_last_message_at"))
+        )
+        counters = [
+            dict(b_id=conversation_id, b_count=count, b_last_message_at=last_message_at)
+            for conversation_id, (count, last_message_at) in self.counters.items()
+            if count
+        ]
+        for start in range(0, len(counters), settings.TRANSFER_BATCH_SIZE):
+            await self.db.execute(statement, counters[start:start + settings.TRANSFER_BATCH_SIZE])
+
+        statement = (
+            update(conversations)
+            .where(conversations.c.id == bindparam("b_id"))
+            .values(summarized_until_id=bindparam("b_until_id"))
+        )
+        boundaries = [
+            dict(b_id=conversation_id, b_until_id=until_id)
+            for conversation_id, (_, _, until_id) in self.boundaries.items()
+            if until_id is not None
+        ]
+        for start in range(0, len(boundaries), settings.TRANSFER_BATCH_SIZE):
+            await self.db.execute(statement, boundaries[start:start + settings.TRANSFER_BATCH_SIZE])
+        return self.result
+
+
+async def import_ndjson(db: AsyncSession, user_id: str, chunks: AsyncIterator[bytes]) -> ImportResult:
+    """
+    Load an NDJSON export into the user's account. Nothing is committed here;
+    the caller commits, so a bad line leaves no partial import behind.
+    """
+    importer = _Importer(db, user_id)
+    async for number, line in _lines(chunks):
+        try:
+            record = _record_adapter.validate_json(line)
+        except ValidationError as e:
+            error = e.errors(include_url=False)[0]
+            location = ".".join(str(part) for part in error["loc"])
+            raise ImportFailed(number, f"{location}: {error['msg']}" if location else error["msg"]) from e
+        await importer.add(number, record)
+    return await importer.finish()
@@ -0,0 +1,115 @@
+"""
+Usage ledger and per-period aggregates.
+
+Every billable action appends a ``UsageEvent`` and, in the same transaction,
+adds its counts to the user's ``UsageAggregate`` row for the current billing
+period (calendar month, UTC) with a single upsert. Reading usage is then a
+primary key lookup no matter how many events a user has. Credits are tokens
+divided by ``USAGE_TOKENS_PER_CREDIT``, rounded up.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.usage import UsageAggregate, UsageEvent
+from app.schemas.user import UsageStats
+
+
+def billing_period(now: Optional[datetime] = None) -> Tuple[datetime, datetime]:
+    """Start of the current period and start of the next one."""
+    now = now or datetime.now(timezone.utc)
+    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+
+def tokens_to_credits(tokens: int) -> int:
+    return -(-tokens // settings.USAGE_TOKENS_PER_CREDIT)
+
+
+def _upsert_statement(dialect: str, values: dict, counts: Dict[str, int]):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+    table = UsageAggregate.__table__
+    statement = dialect_insert(table).values(**values)
+    increments = {name: table.c[name] + statement.excluded[name] for name in counts}
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.period_start],
+        set_={**increments, "updated_at": func.now()},
+    )
+
+
+async def _add_to_aggregate(db: AsyncSession, user_id: str, period_start, counts: Dict[str, int]) -> None:
+    values = {"user_id": user_id, "period_start": period_start, **counts}
+    statement = _upsert_statement(db.get_bind().dialect.name, values, counts)
+    if statement is not None:
+        await db.execute(statement)
+        return
+
+    table = UsageAggregate.__table__
+    result = await db.execute(
+        update(table)
+        .where(table.c.user_id == user_id, table.c.period_start == period_start)
+        .values({name: table.c[name] + value for name, value in counts.items()})
+    )
+    if result.rowcount == 0:
+        await db.execute(insert(table).values(**values))
+
+
+async def record_usage(
+    db: AsyncSession,
+    user_id: str,
+    kind: str,
+    *,
+    model: Optional[str] = None,
+    reference_id: Optional[str] = None,
+    llm_calls: int = 0,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    recommendation_calls: int = 0,
+) -> None:
+    """Append a usage event and roll it into the period aggregate; the caller commits."""
+    counts = {
+        "llm_calls": llm_calls,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "recommendation_calls": recommendation_calls,
+    }
+    await db.execute(
+        insert(UsageEvent).values(
+            user_id=user_id, kind=kind, model=model, reference_id=reference_id, **counts
+        )
+    )
+    period_start, _ = billing_period()
+    await _add_to_aggregate(db, user_id, period_start.date(), counts)
+
+
+async def get_usage_stats(db: AsyncSession, user_id: str) -> UsageStats:
+    period_start, next_period = billing_period()
+    aggregate = await db.get(UsageAggregate, (user_id, period_start.date()))
+    if aggregate is None:
+        aggregate = UsageAggregate(llm_calls=0, prompt_tokens=0, completion_tokens=0, recommendation_calls=0)
+
+    total_tokens = aggregate.prompt_tokens + aggregate.completion_tokens
+    credits_used = tokens_to_credits(total_tokens)
+    return UsageStats(
+        period_start=period_start,
+        next_billing_date=next_period.date(),
+        llm_calls=aggregate.llm_calls,
+        recommendation_calls=aggregate.recommendation_calls,
+        prompt_tokens=aggregate.prompt_tokens,
+        completion_tokens=aggregate.completion_tokens,
+        total_tokens=total_tokens,
+        credits_used=credits_used,
+        credits_remaining=max(0, settings.USAGE_MONTHLY_CREDITS - credits_used),
+        # No training jobs exist yet
+        models_trained=0,
+    )
@@ -0,0 +1,93 @@
+"""
+Cache of authenticated users keyed by user id.
+
+``deps.get_current_user`` consults this cache before hitting the database.
+Entries are column snapshots (never the password hash) and are rebuilt into
+transient ``User`` instances, so they must not be added to a session.
+"""
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.cache import CacheBackend, create_cache_backend
+from app.core.config import settings
+from app.core.metrics import registry
+from app.models.user import User
+
+_CACHED_COLUMNS = ("id", "email", "is_active", "is_superuser", "created_at", "updated_at")
+_DATETIME_COLUMNS = ("created_at", "updated_at")
+
+user_cache_requests_total = registry.counter(
+    "user_cache_requests_total",
+    "Authenticated user cache lookups by result.",
+    ["result"],
+)
+
+
+def _snapshot(user: User) -> dict:
+    data = {name: getattr(user, name) for name in _CACHED_COLUMNS}
+    for name in _DATETIME_COLUMNS:
+        if data[name] is not None:
+            data[name] = data[name].isoformat()
+    return data
+
+
+def _restore(data: dict) -> User:
+    values = dict(data)
+    for name in _DATETIME_COLUMNS:
+        if values.get(name) is not None:
+            values[name] = datetime.fromisoformat(values[name])
+    return User(**values)
+
+
+class UserCache:
+    def __init__(self, backend: CacheBackend, ttl: float, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+
+    async def get(self, user_id: str) -> Optional[User]:
+        if not self.enabled:
+            return None
+        data = await self.backend.get(user_id)
+        if data is None:
+            user_cache_requests_total.inc(result="miss")
+            return None
+        user_cache_requests_total.inc(result="hit")
+        return _restore(data)
+
+    async def set(self, user: User) -> None:
+        if self.enabled:
+            await self.backend.set(user.id, _snapshot(user), self.ttl)
+
+    async def invalidate(self, user_id: str) -> None:
+        await self.backend.delete(user_id)
+
+    def invalidate_nowait(self, user_id: str) -> None:
+        """Schedule invalidation from synchronous code such as ORM events."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop (e.g. a sync script); rely on the TTL of shared entries
+            return
+        loop.create_task(self.invalidate(user_id))
+
+
+user_cache = UserCache(
+    backend=create_cache_backend(
+        "users",
+        maxsize=settings.USER_CACHE_MAX_ENTRIES,
+        ttl=settings.USER_CACHE_TTL_SECONDS,
+    ),
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    enabled=settings.USER_CACHE_ENABLED,
+)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, target: User) -> None:
+    # Covers deactivation, email changes and deletes made through the ORM
+    user_cache.invalidate_nowait(target.id)
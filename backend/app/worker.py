@@ -0,0 +1,83 @@
+"""
+Job worker process: ``python -m app.worker [--concurrency N] [--processes N]``.
+
+Runs queued jobs (see ``app.services.jobs``) outside the API, so profiling,
+recommendations and other long work don't hold up request workers. Workers
+only need the database; start as many as the load calls for, on one machine
+or several, and set ``JOB_WORKER_EMBEDDED=false`` on the API so it leaves the
+queue to them. SIGTERM or SIGINT stops claiming jobs and lets running ones
+finish for up to ``JOB_SHUTDOWN_TIMEOUT_SECONDS``.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import signal
+from typing import List, Optional
+
+from app.core.config import settings
+from app.db import base  # noqa: F401 (registers every model with the mapper)
+from app.services import datasets, recommender  # noqa: F401 (register their job handlers)
+from app.services.jobs import JobWorker
+from app.services.llm import close_llm_client, get_llm_client
+
+logger = logging.getLogger("app.worker")
+
+
+async def serve(concurrency: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stop.set)
+
+    get_llm_client()
+    worker = JobWorker(concurrency)
+    worker.start()
+    logger.info("Job worker %s started, running %d jobs at a time", worker.worker_id, worker.concurrency)
+    try:
+        await stop.wait()
+    finally:
+        logger.info("Job worker %s stopping", worker.worker_id)
+        await worker.stop()
+        await close_llm_client()
+
+
+def _run(concurrency: int) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(name)s %(levelname)s %(message)s")
+    asyncio.run(serve(concurrency))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.worker", description="Run background jobs.")
+    parser.add_argument(
+        "--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY,
+        help="jobs run at once per process (default: JOB_WORKER_CONCURRENCY)",
+    )
+    parser.add_argument("--processes", type=int, default=1, help="worker processes to start (default: 1)")
+    args = parser.parse_args(argv)
+
+    if args.processes <= 1:
+        _run(args.concurrency)
+        return
+
+    processes = [
+        multiprocessing.Process(target=_run, args=(args.concurrency,), name=f"job-worker-{index}")
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, forward)
+    # Ctrl-C already reaches every process in the foreground group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
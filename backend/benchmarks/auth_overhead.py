@@ -0,0 +1,106 @@
+"""
+Per-request cost of resolving the bearer token to a user, with the user cache on and off.
+
+Drives ``get_current_active_user`` the way FastAPI does for each authenticated
+request (decode the JWT, look the user up, check it is active) from a number
+of concurrent clients, and reports latency and user queries per request.
+
+    python -m benchmarks.auth_overhead --requests 5000 --concurrency 50 --query-delay 0.001
+
+``--query-delay`` adds a server-side delay per query to stand in for a
+networked database; point ``DATABASE_URL`` at PostgreSQL for the real thing.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from benchmarks.common import create_schema, print_table, setup, summarize
+
+setup()
+
+from sqlalchemy import event  # noqa: E402
+
+from app.api.deps import get_current_active_user, get_current_user  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.db.session import AsyncSessionLocal, SessionLocal, async_engine  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.user_cache import user_cache  # noqa: E402
+
+
+class Stats:
+    def __init__(self, query_delay: float):
+        self.query_delay = query_delay
+        self.user_queries = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            self.user_queries += 1
+        if self.query_delay:
+            time.sleep(self.query_delay)
+
+
+def seed(count: int):
+    with SessionLocal() as db:
+        users = [User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x") for _ in range(count)]
+        db.add_all(users)
+        db.commit()
+        return [create_access_token(user.id) for user in users]
+
+
+async def authenticate(token: str) -> None:
+    async with AsyncSessionLocal() as db:
+        user = await get_current_user(db=db, token=token)
+        await get_current_active_user(current_user=user)
+
+
+async def run(tokens, requests: int, concurrency: int):
+    durations = []
+    queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(tokens[index % len(tokens)])
+
+    async def client():
+        while not queue.empty():
+            token = queue.get_nowait()
+            started = time.perf_counter()
+            await authenticate(token)
+            durations.append(time.perf_counter() - started)
+
+    async with async_engine.connect():
+        pass
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await async_engine.dispose()
+    return elapsed, durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100, help="distinct users sending requests")
+    parser.add_argument("--query-delay", type=float, default=0.001, help="added seconds per database query")
+    args = parser.parse_args()
+
+    create_schema()
+    tokens = seed(args.users)
+    stats = Stats(args.query_delay)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", stats)
+
+    rows = []
+    for enabled in (False, True):
+        user_cache.enabled = enabled
+        stats.user_queries = 0
+        elapsed, durations = asyncio.run(run(tokens, args.requests, args.concurrency))
+        latency = summarize(durations)
+        rows.append([
+            "on" if enabled else "off", args.requests / elapsed,
+            latency["mean"] * 1000, latency["p99"] * 1000, stats.user_queries / args.requests,
+        ])
+    print_table(["cache", "requests/s", "mean ms", "p99 ms", "user queries/request"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Benchmarks run in-process against a throwaway SQLite database unless
+``DATABASE_URL`` is set, with the offline LLM provider. ``setup()`` must run
+before anything from ``app`` is imported, since settings are read at import.
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List, Optional, Sequence
+
+
+def setup(**overrides: str) -> str:
+    """Point the app at a scratch database and offline services; returns the database URL."""
+    scratch = tempfile.mkdtemp(prefix="metra-bench-")
+    defaults = dict(
+        DATABASE_URL=f"sqlite:///{scratch}/bench.db",
+        LLM_PROVIDER="fake",
+        MODEL_HUB_BACKEND="local",
+        MODEL_CATALOG_PATH=os.path.join(scratch, "model_catalog.json.gz"),
+        MODEL_CATALOG_REFRESH_SECONDS="0",
+        DATASET_STORAGE_DIR=os.path.join(scratch, "datasets"),
+        RATE_LIMIT_ENABLED="false",
+        JOB_WORKER_EMBEDDED="false",
+    )
+    for name, value in {**defaults, **overrides}.items():
+        os.environ.setdefault(name, value)
+    return os.environ["DATABASE_URL"]
+
+
+def create_schema() -> None:
+    from app.db.base import Base
+    from app.db.session import engine
+    Base.metadata.create_all(bind=engine)
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    return {
+        "mean": statistics.fmean(values) if values else 0.0,
+        "p50": percentile(values, 0.5),
+        "p99": percentile(values, 0.99),
+        "max": max(values, default=0.0),
+    }
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a task that sleeps ``interval`` seconds."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    async def __aenter__(self) -> "LoopLagMonitor":
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def print_table(headers: Sequence[str], rows: Sequence[Sequence]) -> None:
+    cells = [[str(header) for header in headers]] + [
+        [f"{value:.3f}" if isinstance(value, float) else str(value) for value in row] for row in rows
+    ]
+    widths = [max(len(row[index]) for row in cells) for index in range(len(headers))]
+    for number, row in enumerate(cells):
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+        if number == 0:
+            print("  ".join("-" * width for width in widths))
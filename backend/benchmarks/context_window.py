@@ -0,0 +1,102 @@
+"""
+Database rows read and prompt tokens per turn over long conversations.
+
+Plays ``--turns`` exchanges into a conversation and, before each reply, builds
+the prompt the way the chat endpoint does: the token-budgeted window plus the
+running summary, folding older messages into the summary whenever the window
+reports some are left out. The ``full`` rows are what sending the whole
+history would cost at the same turn.
+
+    python -m benchmarks.context_window --turns 200 --message-chars 600
+"""
+import argparse
+import asyncio
+import uuid
+
+from benchmarks.common import create_schema, print_table, setup, summarize
+
+setup()
+
+from app.db.session import AsyncSessionLocal, async_engine  # noqa: E402
+from app.models.conversation import Conversation, Message  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import context  # noqa: E402
+from app.services.llm import CircuitBreaker, FakeProvider, LLMClient  # noqa: E402
+
+
+async def play(turns: int, message_chars: int, summary_chars: int, checkpoints):
+    llm = LLMClient(
+        FakeProvider(reply="s" * summary_chars),
+        max_concurrency_per_model=1,
+        queue_timeout=1,
+        max_retries=0,
+        backoff_base=0,
+        backoff_max=0,
+        breaker=CircuitBreaker(failure_threshold=5, reset_timeout=1),
+    )
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        conversation = Conversation(user_id=user.id)
+        db.add(conversation)
+        await db.commit()
+        conversation_id = conversation.id
+
+    text = ("lorem ipsum " * message_chars)[:message_chars]
+    history_tokens = 0
+    windowed = {"rows": [], "tokens": []}
+    full = {"rows": [], "tokens": []}
+    rows = []
+    for turn in range(1, turns + 1):
+        async with AsyncSessionLocal() as db:
+            db.add(Message(conversation_id=conversation_id, role="user", content=text))
+            await db.commit()
+            history_tokens += context.estimate_tokens(text)
+
+            conversation = await db.get(Conversation, conversation_id)
+            window = await context.build_context_window(db, conversation)
+            windowed["rows"].append(window.rows_read)
+            windowed["tokens"].append(window.tokens + (context.estimate_tokens(window.summary) if window.summary else 0))
+            full["rows"].append(turn * 2 - 1)
+            full["tokens"].append(history_tokens)
+
+            db.add(Message(conversation_id=conversation_id, role="assistant", content=text))
+            await db.commit()
+            history_tokens += context.estimate_tokens(text)
+
+        # Awaited here rather than scheduled, so every turn sees the refreshed summary
+        if window.needs_summary and window.starts_at is not None:
+            await context.refresh_summary(llm, conversation_id, window.starts_at)
+
+        if turn in checkpoints:
+            rows.append([turn, window.rows_read, windowed["tokens"][-1], full["rows"][-1], full["tokens"][-1]])
+
+    await async_engine.dispose()
+    return rows, windowed, full
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--message-chars", type=int, default=600)
+    parser.add_argument("--summary-chars", type=int, default=2000)
+    args = parser.parse_args()
+
+    create_schema()
+    checkpoints = {turn for turn in (1, 10, 25, 50, 100, 150, 200, args.turns) if turn <= args.turns}
+    rows, windowed, full = asyncio.run(play(args.turns, args.message_chars, args.summary_chars, checkpoints))
+    print_table(["turn", "rows read", "prompt tokens", "full rows", "full tokens"], rows)
+    print()
+    print_table(
+        ["per turn", "mean rows", "max rows", "mean tokens", "max tokens"],
+        [
+            [name, summarize(stats["rows"])["mean"], max(stats["rows"]),
+             summarize(stats["tokens"])["mean"], max(stats["tokens"])]
+            for name, stats in (("window", windowed), ("full", full))
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
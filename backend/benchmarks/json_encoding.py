@@ -0,0 +1,112 @@
+"""
+Encode time and allocations for a large conversation, per JSON encoder.
+
+Serializes one conversation with ``--messages`` messages the ways a response
+can be rendered: ``jsonable_encoder`` plus the stdlib encoder (FastAPI's
+``JSONResponse`` default), ``app.core.json`` on the stdlib and on orjson for
+plain data, and pydantic-core for a response model. Allocation figures come
+from ``tracemalloc`` over a single encode.
+
+    python -m benchmarks.json_encoding --messages 2000 --content-chars 400
+"""
+import argparse
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import print_table, setup, summarize
+
+setup()
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.core import json  # noqa: E402
+from app.schemas.conversation import Conversation, Message  # noqa: E402
+
+
+def build(messages: int, content_chars: int) -> Conversation:
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    conversation_id = str(uuid.uuid4())
+    text = ("Describe the data, the audience and the output format. " * (content_chars // 56 + 1))[:content_chars]
+    return Conversation(
+        id=conversation_id,
+        user_id=str(uuid.uuid4()),
+        title="Large conversation",
+        is_completed=False,
+        draft_json_schema={"type": "object", "properties": {"label": {"type": "string"}}},
+        created_at=started,
+        messages=[
+            Message(
+                id=str(uuid.uuid4()),
+                conversation_id=conversation_id,
+                role="user" if index % 2 == 0 else "assistant",
+                content=text,
+                model=None if index % 2 == 0 else "gpt-4o",
+                prompt_tokens=None if index % 2 == 0 else 900,
+                completion_tokens=None if index % 2 == 0 else 120,
+                created_at=started + timedelta(seconds=index),
+            )
+            for index in range(messages)
+        ],
+    )
+
+
+def encoders(conversation: Conversation):
+    data = conversation.model_dump()
+
+    def with_fast_json(enabled: bool):
+        def encode():
+            json.FAST_JSON = enabled
+            return json.dumps_bytes(data)
+        return encode
+
+    yield "jsonable_encoder + stdlib", lambda: JSONResponse(jsonable_encoder(data)).body
+    yield "app json (stdlib)", with_fast_json(False)
+    if json.orjson is not None:
+        yield "app json (orjson)", with_fast_json(True)
+    yield "pydantic model", lambda: json.dumps_bytes(conversation)
+
+
+def measure(encode, repeat: int):
+    encode()
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode()
+        durations.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        encode()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return durations, peak - before, len(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--content-chars", type=int, default=400)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    fast_json = json.FAST_JSON
+    conversation = build(args.messages, args.content_chars)
+    rows = []
+    try:
+        for name, encode in encoders(conversation):
+            durations, peak, size = measure(encode, args.repeat)
+            stats = summarize(durations)
+            rows.append([name, stats["mean"] * 1000, stats["p99"] * 1000, peak / 1024, size / 1024])
+    finally:
+        json.FAST_JSON = fast_json
+    print_table(["encoder", "mean ms", "p99 ms", "peak alloc KiB", "body KiB"], rows)
+
+
+if __name__ == "__main__":
+    main()
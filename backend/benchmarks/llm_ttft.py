@@ -0,0 +1,166 @@
+"""
+Time to first token with many concurrent streams: one shared client vs a client per call.
+
+Starts a local OpenAI-compatible server that streams a fixed reply with a
+configurable first-token latency and token delay, in a separate process, then
+opens ``--streams`` concurrent completions through ``OpenAIProvider``. ``shared`` reuses one
+pooled ``LLMClient`` for every call, as the app does; ``per-call`` builds and
+closes a provider per call, as the module-level ``openai`` API used to.
+Connections are counted by the server. Client and server share the machine,
+so on few cores the CPU they both need shows up in the latencies too.
+
+    python -m benchmarks.llm_ttft --streams 100 --rounds 3 --latency 0.2 --token-delay 0.01
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+
+import httpx
+
+from benchmarks.common import print_table, setup, summarize
+
+setup()
+
+import uvicorn  # noqa: E402
+from starlette.applications import Starlette  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import JSONResponse, StreamingResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from app.services.llm import CircuitBreaker, LLMClient, OpenAIProvider  # noqa: E402
+
+MODEL = "bench-model"
+MESSAGES = [{"role": "user", "content": "Describe the task."}]
+
+
+class FakeOpenAI:
+    def __init__(self, latency: float, token_delay: float, tokens: int):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.connections = set()
+        self.app = Starlette(routes=[
+            Route("/chat/completions", self.completions, methods=["POST"]),
+            Route("/connections", self.count_connections, methods=["GET", "DELETE"]),
+        ])
+
+    async def count_connections(self, request: Request) -> JSONResponse:
+        count = len(self.connections)
+        if request.method == "DELETE":
+            self.connections.clear()
+        return JSONResponse(count)
+
+    async def completions(self, request: Request) -> StreamingResponse:
+        self.connections.add(request.client)
+        await request.body()
+
+        async def events():
+            await asyncio.sleep(self.latency)
+            for index in range(self.tokens):
+                chunk = {"choices": [{"delta": {"content": f"token{index} "}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(self.token_delay)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def _run_server(port: int, latency: float, token_delay: float, tokens: int) -> None:
+    app = FakeOpenAI(latency, token_delay, tokens).app
+    # Hosted APIs keep idle connections open for a minute or more
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096, timeout_keep_alive=75)
+
+
+def serve(latency: float, token_delay: float, tokens: int) -> str:
+    """Start the fake server in its own process, so it doesn't compete with the client for the GIL."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    multiprocessing.Process(target=_run_server, args=(port, latency, token_delay, tokens), daemon=True).start()
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(500):
+        try:
+            httpx.get(f"{base_url}/connections")
+            return base_url
+        except httpx.TransportError:
+            time.sleep(0.01)
+    raise RuntimeError("fake server did not start")
+
+
+def make_client(base_url: str, max_connections: int) -> LLMClient:
+    provider = OpenAIProvider(
+        api_key="bench", base_url=base_url, timeout=60, connect_timeout=10, max_connections=max_connections,
+    )
+    return LLMClient(
+        provider,
+        max_concurrency_per_model=max_connections,
+        queue_timeout=60,
+        max_retries=0,
+        backoff_base=0,
+        backoff_max=0,
+        breaker=CircuitBreaker(failure_threshold=1000, reset_timeout=1),
+    )
+
+
+async def one_stream(client: LLMClient):
+    started = time.perf_counter()
+    first = None
+    async for _ in client.stream(MODEL, MESSAGES):
+        if first is None:
+            first = time.perf_counter() - started
+    return first, time.perf_counter() - started
+
+
+async def run(mode: str, base_url: str, streams: int, rounds: int):
+    ttfts, durations = [], []
+    shared = make_client(base_url, streams) if mode == "shared" else None
+
+    async def per_call():
+        client = make_client(base_url, 1)
+        try:
+            return await one_stream(client)
+        finally:
+            await client.aclose()
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        calls = [one_stream(shared) if shared else per_call() for _ in range(streams)]
+        for first, duration in await asyncio.gather(*calls):
+            ttfts.append(first)
+            durations.append(duration)
+    elapsed = time.perf_counter() - started
+    if shared:
+        await shared.aclose()
+    return ttfts, durations, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--streams", type=int, default=100, help="concurrent streams per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="server seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    parser.add_argument("--tokens", type=int, default=50)
+    args = parser.parse_args()
+
+    base_url = serve(args.latency, args.token_delay, args.tokens)
+    rows = []
+    for mode in ("per-call", "shared"):
+        httpx.delete(f"{base_url}/connections")
+        ttfts, durations, elapsed = asyncio.run(run(mode, base_url, args.streams, args.rounds))
+        connections = httpx.get(f"{base_url}/connections").json()
+        ttft = summarize(ttfts)
+        rows.append([
+            mode, args.streams, ttft["p50"] * 1000, ttft["p99"] * 1000, summarize(durations)["p99"],
+            connections, len(ttfts) / elapsed,
+        ])
+    print_table(
+        ["client", "streams", "p50 ttft ms", "p99 ttft ms", "p99 stream s", "connections", "streams/s"], rows
+    )
+
+
+if __name__ == "__main__":
+    main()
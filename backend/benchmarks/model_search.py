@@ -0,0 +1,102 @@
+"""
+Model search latency by cache result, against an offline Hub with simulated latency.
+
+Runs ``--queries`` distinct keyword sets through ``ModelSearchCache`` backed by
+``LocalHubClient`` (sleeping ``--hub-latency-ms`` per call): first as misses,
+then as fresh hits, then as stale hits served while a background refresh runs.
+The local catalog, which recommendations use first, is measured alongside.
+Hub fallback is off by default (``MODEL_CATALOG_HUB_FALLBACK``), so this cache
+only sits on the request path when that is enabled.
+
+    python -m benchmarks.model_search --queries 200 --hub-latency-ms 300
+"""
+import argparse
+import time
+
+from benchmarks.common import print_table, setup, summarize
+
+setup()
+
+from app.services.model_catalog import ModelCatalog  # noqa: E402
+from app.services.model_hub import DEFAULT_MODELS, HubModel, LocalHubClient  # noqa: E402
+from app.services.model_search import ModelSearchCache  # noqa: E402
+
+TERMS = (
+    "sentiment", "classification", "ner", "question-answering", "summarization", "bert",
+    "distilbert", "english", "multilingual", "reviews", "churn", "intent", "toxicity", "squad",
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def queries(count: int):
+    return [
+        ", ".join(TERMS[(index + offset) % len(TERMS)] for offset in range(1 + index % 3)) + f", q{index}"
+        for index in range(count)
+    ]
+
+
+def models(count: int):
+    defaults = [model for group in DEFAULT_MODELS.values() for model in group]
+    generated = [
+        HubModel(
+            model_id=f"org{index % 50}/{TERMS[index % len(TERMS)]}-model-{index}",
+            tags=[TERMS[index % len(TERMS)], TERMS[(index * 7) % len(TERMS)]],
+            pipeline_tag="text-classification",
+            downloads=(index * 7919) % 1_000_000,
+            likes=index % 500,
+        )
+        for index in range(count)
+    ]
+    return defaults + generated
+
+
+def timed(function, items, limit: int):
+    durations = []
+    for item in items:
+        started = time.perf_counter()
+        function(item, limit)
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--hub-latency-ms", type=float, default=300)
+    parser.add_argument("--models", type=int, default=5000, help="models known to the offline Hub and catalog")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    known = models(args.models)
+    hub = LocalHubClient(known, latency=args.hub_latency_ms / 1000)
+    clock = Clock()
+    cache = ModelSearchCache(hub, ttl=60, stale_ttl=600, maxsize=args.queries * 2, clock=clock)
+    catalog = ModelCatalog.build(known)
+    keywords = queries(args.queries)
+
+    results = [
+        ("miss (Hub call)", timed(cache.search, keywords, args.limit)),
+        ("fresh hit", timed(cache.search, keywords, args.limit)),
+    ]
+    clock.now += 61
+    results.append(("stale hit (refresh queued)", timed(cache.search, keywords, args.limit)))
+    results.append(("local catalog", timed(catalog.search, keywords, args.limit)))
+    cache._executor.shutdown(wait=True)
+
+    rows = []
+    for name, durations in results:
+        stats = summarize(durations)
+        rows.append([name, stats["mean"] * 1000, stats["p50"] * 1000, stats["p99"] * 1000])
+    print_table(["lookup", "mean ms", "p50 ms", "p99 ms"], rows)
+    print(f"Hub calls: {hub.calls} ({args.queries} misses + {hub.calls - args.queries} background refreshes)")
+
+
+if __name__ == "__main__":
+    main()
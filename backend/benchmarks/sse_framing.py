@@ -0,0 +1,81 @@
+"""
+Frames, bytes on the wire and CPU per streamed reply, by SSE framing.
+
+Streams ``--replies`` concurrent replies of ``--tokens`` tokens from the
+offline provider through the same pipeline as the chat endpoint (``coalesce``,
+``sse_event``, optionally ``gzip_frames``), with and without coalescing and
+compression. CPU is process time divided by the number of replies.
+
+    python -m benchmarks.sse_framing --replies 50 --tokens 300 --token-delay 0.005
+"""
+import argparse
+import asyncio
+import time
+from contextlib import aclosing
+
+from benchmarks.common import print_table, setup
+
+setup()
+
+from app.core.json import sse_event  # noqa: E402
+from app.core.sse import coalesce, gzip_frames  # noqa: E402
+from app.services.llm import FakeProvider  # noqa: E402
+
+REPLY_WORDS = (
+    "Here is a draft task definition for your churn model. It predicts whether a customer "
+    "cancels in the next thirty days from their usage, billing and support history. "
+).split()
+
+
+async def frames(provider: FakeProvider, interval: float, max_bytes: int):
+    stream = coalesce(provider.stream("fake", []), interval, max_bytes)
+    async with aclosing(stream):
+        async for group in stream:
+            yield sse_event("".join(group))
+    yield "data: [DONE]\n\n"
+
+
+async def one_reply(provider: FakeProvider, interval: float, max_bytes: int, gzip: bool):
+    body = frames(provider, interval, max_bytes)
+    if gzip:
+        body = gzip_frames(body)
+    count = size = 0
+    async for chunk in body:
+        count += 1
+        size += len(chunk) if isinstance(chunk, bytes) else len(chunk.encode("utf-8"))
+    return count, size
+
+
+async def run(replies: int, provider: FakeProvider, interval: float, max_bytes: int, gzip: bool):
+    cpu = time.process_time()
+    results = await asyncio.gather(*(one_reply(provider, interval, max_bytes, gzip) for _ in range(replies)))
+    cpu = time.process_time() - cpu
+    return sum(count for count, _ in results) / replies, sum(size for _, size in results) / replies, cpu / replies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--replies", type=int, default=50, help="concurrent replies per configuration")
+    parser.add_argument("--tokens", type=int, default=300)
+    parser.add_argument("--token-delay", type=float, default=0.005, help="seconds between provider tokens")
+    parser.add_argument("--coalesce-ms", type=int, default=50)
+    parser.add_argument("--coalesce-bytes", type=int, default=512)
+    args = parser.parse_args()
+
+    reply = " ".join(REPLY_WORDS[index % len(REPLY_WORDS)] for index in range(args.tokens))
+    provider = FakeProvider(token_delay=args.token_delay, reply=reply)
+    configurations = [
+        ("per token", 0.0, False),
+        ("per token + gzip", 0.0, True),
+        (f"coalesced {args.coalesce_ms}ms", args.coalesce_ms / 1000, False),
+        (f"coalesced {args.coalesce_ms}ms + gzip", args.coalesce_ms / 1000, True),
+    ]
+    rows = []
+    for name, interval, gzip in configurations:
+        frame_count, size, cpu = asyncio.run(run(args.replies, provider, interval, args.coalesce_bytes, gzip))
+        rows.append([name, frame_count, size / 1024, cpu * 1000])
+    print_table(["framing", "frames/reply", "KiB/reply", "CPU ms/reply"], rows)
+
+
+if __name__ == "__main__":
+    main()
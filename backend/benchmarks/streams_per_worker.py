@@ -0,0 +1,137 @@
+"""
+Concurrent chat streams on one worker: sync session in the event loop vs AsyncSession.
+
+Each simulated stream makes the reads the chat endpoint makes before it calls
+the LLM (the user, the conversation, its recent history) and then streams a
+reply from the offline provider. Replies are persisted by the background
+message writer, off the request path, so writes are left out; they would also
+only measure SQLite's single-writer lock. ``sync`` runs the queries on a
+blocking ``Session`` inside the coroutine, as the endpoint did before the
+async database layer; ``async`` uses ``AsyncSessionLocal``. Event-loop lag is
+how late a 5 ms timer fires while the streams run; with blocking queries it
+grows with concurrency, since every stream waits behind every query.
+
+    python -m benchmarks.streams_per_worker --streams 50 100 200 --query-delay 0.002
+
+``--query-delay`` adds a server-side delay per query to stand in for a
+networked database; point ``DATABASE_URL`` at PostgreSQL for the real thing.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from benchmarks.common import LoopLagMonitor, create_schema, print_table, setup, summarize
+
+setup()
+
+from sqlalchemy import event, select  # noqa: E402
+
+from app.db.session import AsyncSessionLocal, SessionLocal, async_engine, engine  # noqa: E402
+from app.models.conversation import Conversation, Message  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.llm import FakeProvider  # noqa: E402
+
+REPLY = " ".join(f"token{index}" for index in range(40))
+
+
+def add_query_delay(seconds: float) -> None:
+    if not seconds:
+        return
+
+    def delay(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(seconds)
+
+    event.listen(engine, "before_cursor_execute", delay)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", delay)
+
+
+def seed(count: int, history: int):
+    with SessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        conversations = [Conversation(user_id=user.id, title=f"c{index}") for index in range(count)]
+        db.add_all(conversations)
+        db.flush()
+        db.add_all(
+            Message(conversation_id=conversation.id, role=role, content=f"{role} message {index}")
+            for conversation in conversations
+            for index in range(history)
+            for role in ("user", "assistant")
+        )
+        db.commit()
+        return user.id, [conversation.id for conversation in conversations]
+
+
+def _history_query(conversation_id: str):
+    return (
+        select(Message)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(20)
+    )
+
+
+async def stream_sync(provider: FakeProvider, user_id: str, conversation_id: str) -> None:
+    with SessionLocal() as db:
+        db.get(User, user_id)
+        db.get(Conversation, conversation_id)
+        db.execute(_history_query(conversation_id)).scalars().all()
+    [token async for token in provider.stream("fake", [{"role": "user", "content": "hi"}])]
+
+
+async def stream_async(provider: FakeProvider, user_id: str, conversation_id: str) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.get(User, user_id)
+        await db.get(Conversation, conversation_id)
+        (await db.execute(_history_query(conversation_id))).scalars().all()
+    [token async for token in provider.stream("fake", [{"role": "user", "content": "hi"}])]
+
+
+async def run(mode: str, user_id: str, conversation_ids, token_delay: float):
+    provider = FakeProvider(token_delay=token_delay, reply=REPLY)
+    stream = stream_sync if mode == "sync" else stream_async
+    durations = []
+
+    async def one(conversation_id: str) -> None:
+        started = time.perf_counter()
+        await stream(provider, user_id, conversation_id)
+        durations.append(time.perf_counter() - started)
+
+    # Open one connection first: concurrent first connects of a fresh engine
+    # contend for the dialect initialization lock
+    async with async_engine.connect():
+        pass
+    async with LoopLagMonitor() as monitor:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(conversation_id) for conversation_id in conversation_ids))
+        elapsed = time.perf_counter() - started
+    await async_engine.dispose()
+    return elapsed, durations, monitor.lags
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--streams", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed tokens")
+    parser.add_argument("--history", type=int, default=10, help="exchanges already in each conversation")
+    parser.add_argument("--query-delay", type=float, default=0.002, help="added seconds per database query")
+    args = parser.parse_args()
+
+    create_schema()
+    add_query_delay(args.query_delay)
+    rows = []
+    for count in args.streams:
+        user_id, conversation_ids = seed(count, args.history)
+        for mode in ("sync", "async"):
+            elapsed, durations, lags = asyncio.run(run(mode, user_id, conversation_ids, args.token_delay))
+            lag = summarize(lags)
+            rows.append([
+                mode, count, count / elapsed, summarize(durations)["p99"], lag["p99"] * 1000, lag["max"] * 1000,
+            ])
+    print_table(["mode", "streams", "streams/s", "p99 stream s", "p99 loop lag ms", "max loop lag ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+NDJSON export and import throughput for one user with many messages.
+
+Seeds ``--messages`` messages over ``--conversations`` conversations, streams
+the export to a scratch file, then imports that file into a second user,
+reading it in 64 KiB chunks as a request body would arrive. Peak RSS is
+reported after each phase so a regression to buffering whole exports shows.
+
+    python -m benchmarks.transfer_throughput --messages 1000000 --conversations 1000
+"""
+import argparse
+import asyncio
+import os
+import resource
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.common import create_schema, print_table, setup
+
+setup()
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.db.session import AsyncSessionLocal, SessionLocal, async_engine  # noqa: E402
+from app.models.conversation import Conversation, Message  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import transfer  # noqa: E402
+
+CHUNK_BYTES = 64 * 1024
+SEED_BATCH = 10_000
+
+
+def peak_rss_mib() -> float:
+    # Kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def create_user(db) -> str:
+    user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def seed(messages: int, conversations: int, content_chars: int) -> str:
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    text = ("The model should flag churn risk from usage and billing history. " * 8)[:content_chars]
+    with SessionLocal() as db:
+        user_id = create_user(db)
+        conversation_ids = [str(uuid.uuid4()) for _ in range(conversations)]
+        per_conversation = messages // conversations
+        db.execute(insert(Conversation), [
+            dict(id=conversation_id, user_id=user_id, title=f"c{index}", message_count=per_conversation,
+                 created_at=started + timedelta(seconds=index))
+            for index, conversation_id in enumerate(conversation_ids)
+        ])
+        rows = []
+        for index in range(per_conversation * conversations):
+            rows.append(dict(
+                id=str(uuid.uuid4()),
+                conversation_id=conversation_ids[index % conversations],
+                role="user" if index % 2 == 0 else "assistant",
+                content=text,
+                created_at=started + timedelta(milliseconds=index),
+            ))
+            if len(rows) == SEED_BATCH:
+                db.execute(insert(Message), rows)
+                rows.clear()
+        if rows:
+            db.execute(insert(Message), rows)
+        db.commit()
+        return user_id
+
+
+async def export_to(path: str, user_id: str) -> int:
+    size = 0
+    with open(path, "wb") as sink:
+        async for chunk in transfer.export_ndjson(user_id):
+            sink.write(chunk)
+            size += len(chunk)
+    return size
+
+
+async def read_chunks(path: str):
+    with open(path, "rb") as source:
+        while True:
+            chunk = source.read(CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+async def import_from(path: str, user_id: str):
+    async with AsyncSessionLocal() as db:
+        result = await transfer.import_ndjson(db, user_id, read_chunks(path))
+        await db.commit()
+    return result
+
+
+async def run(user_id: str, target_id: str, path: str):
+    started = time.perf_counter()
+    size = await export_to(path, user_id)
+    exported = time.perf_counter() - started
+    export_rss = peak_rss_mib()
+
+    started = time.perf_counter()
+    result = await import_from(path, target_id)
+    imported = time.perf_counter() - started
+    await async_engine.dispose()
+    return size, exported, export_rss, result, imported
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--conversations", type=int, default=1000)
+    parser.add_argument("--content-chars", type=int, default=200)
+    args = parser.parse_args()
+
+    create_schema()
+    started = time.perf_counter()
+    user_id = seed(args.messages, args.conversations, args.content_chars)
+    print(f"seeded {args.messages} messages in {time.perf_counter() - started:.1f}s")
+    with SessionLocal() as db:
+        target_id = create_user(db)
+    seeded_rss = peak_rss_mib()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, "export.ndjson")
+        size, exported, export_rss, result, imported = asyncio.run(run(user_id, target_id, path))
+
+    rows = result.conversations + result.messages + result.task_definitions
+    print_table(
+        ["phase", "rows", "seconds", "rows/s", "MiB/s", "peak RSS MiB"],
+        [
+            ["export", rows, exported, rows / exported, size / 2**20 / exported, export_rss],
+            ["import", rows, imported, rows / imported, size / 2**20 / imported, peak_rss_mib()],
+        ],
+    )
+    print(f"export size {size / 2**20:.1f} MiB; peak RSS after seeding {seeded_rss:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
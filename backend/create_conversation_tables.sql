@@ -1,3 +1,7 @@
+-- Superseded by the Alembic migrations in alembic/versions; kept for reference.
+-- Databases created from this file can be adopted with `alembic stamp 0001`
+-- followed by `alembic upgrade head`.
+
 -- Create conversations table
 CREATE TABLE IF NOT EXISTS conversations (
     id VARCHAR PRIMARY KEY,
@@ -34,8 +38,26 @@ CREATE TABLE IF NOT EXISTS task_definitions (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Columns added after the initial release
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS summary TEXT;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS summarized_until TIMESTAMP WITH TIME ZONE;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS is_complete BOOLEAN NOT NULL DEFAULT TRUE;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMP WITH TIME ZONE;
+
+-- Backfill the denormalized message counters
+UPDATE conversations c SET
+    message_count = m.message_count,
+    last_message_at = m.last_message_at
+FROM (
+    SELECT conversation_id, COUNT(*) AS message_count, MAX(created_at) AS last_message_at
+    FROM messages GROUP BY conversation_id
+) m
+WHERE m.conversation_id = c.id;
+
 -- Create indexes
 CREATE INDEX IF NOT EXISTS idx_conversations_user_id ON conversations(user_id);
+CREATE INDEX IF NOT EXISTS idx_conversations_user_created_id ON conversations(user_id, created_at, id);
 CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id);
 CREATE INDEX IF NOT EXISTS idx_task_definitions_user_id ON task_definitions(user_id);
 CREATE INDEX IF NOT EXISTS idx_task_definitions_conversation_id ON task_definitions(conversation_id); 
\ No newline at end of file
@@ -1,12 +1,16 @@
-from app.db.session import engine
-from app.db.base import Base
+import os
+
+from alembic import command
+from alembic.config import Config
+
 from app.db.session import SessionLocal
 from app.models.user import User
 from app.core.security import get_password_hash
 
 def init_db():
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+    # Create or upgrade all tables
+    alembic_cfg = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    command.upgrade(alembic_cfg, "head")
     
     # Create test user if not exists
     db = SessionLocal()
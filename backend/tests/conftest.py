@@ -0,0 +1,71 @@
+"""
+Shared fixtures. The suite runs against a throwaway SQLite database migrated
+to head with Alembic, the offline LLM provider and the bundled model catalog,
+so it needs neither network access nor a database server.
+"""
+import os
+import tempfile
+import uuid
+
+_tmp = tempfile.mkdtemp(prefix="metra-tests-")
+# Settings are read at import time, so these must be set before any app import
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_tmp}/test.db",
+    ASYNC_DATABASE_URL="",
+    CACHE_BACKEND="local",
+    LLM_PROVIDER="fake",
+    MODEL_HUB_BACKEND="local",
+    MODEL_CATALOG_PATH=os.path.join(_tmp, "model_catalog.json.gz"),
+    MODEL_CATALOG_REFRESH_SECONDS="0",
+    DATASET_STORAGE_DIR=os.path.join(_tmp, "datasets"),
+    RATE_LIMIT_ENABLED="false",
+    JOB_WORKER_EMBEDDED="false",
+)
+
+import pytest  # noqa: E402
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """Migrate the test database to head once per run."""
+    command.upgrade(Config(os.path.join(BACKEND_DIR, "alembic.ini")), "head")
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    """Drop pooled connections after each test; they belong to that test's event loop."""
+    yield
+    from app.db.session import async_engine
+    async_engine.sync_engine.dispose(close=False)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def client():
+    from app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def register(client: TestClient) -> dict:
+    """Register and log in a fresh user; returns its auth headers."""
+    credentials = {"email": f"{uuid.uuid4().hex}@example.com", "password": "correct horse"}
+    response = client.post("/api/v1/auth/register", json=credentials)
+    assert response.status_code == 200, response.text
+    response = client.post("/api/v1/auth/login", json=credentials)
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def auth_headers(client):
+    return register(client)
@@ -0,0 +1,80 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_db
+from app.models.user import User
+
+
+@pytest.mark.anyio
+async def test_get_db_yields_an_async_session():
+    sessions = get_db()
+    db = await sessions.__anext__()
+    try:
+        assert isinstance(db, AsyncSession)
+        assert (await db.execute(select(1))).scalar() == 1
+    finally:
+        await sessions.aclose()
+
+
+def test_conversation_round_trip(client, auth_headers):
+    response = client.post("/api/v1/conversations", json={"title": "async"}, headers=auth_headers)
+    assert response.status_code == 200
+    conversation_id = response.json()["id"]
+
+    response = client.post(
+        f"/api/v1/conversations/{conversation_id}/messages",
+        json={"role": "user", "content": "hello there"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+
+    messages = client.get(f"/api/v1/conversations/{conversation_id}", headers=auth_headers).json()["messages"]
+    assert {message["role"] for message in messages} == {"user", "assistant"}
+
+
+@pytest.mark.anyio
+async def test_concurrent_streams_share_one_event_loop():
+    """Many streams on one worker all complete; none waits on another's database calls."""
+    from app.main import app
+    from app.services.message_writer import message_writer
+
+    credentials = {"email": f"{uuid.uuid4().hex}@example.com", "password": "correct horse"}
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+            await http.post("/api/v1/auth/register", json=credentials)
+            token = (await http.post("/api/v1/auth/login", json=credentials)).json()["access_token"]
+            http.headers["Authorization"] = f"Bearer {token}"
+            conversations = [
+                (await http.post("/api/v1/conversations", json={"title": f"c{i}"})).json()["id"]
+                for i in range(20)
+            ]
+            responses = await asyncio.gather(*(
+                http.post(
+                    f"/api/v1/conversations/{conversation_id}/messages/stream",
+                    json={"role": "user", "content": f"stream {conversation_id}"},
+                )
+                for conversation_id in conversations
+            ))
+    finally:
+        # The writer was started on this test's event loop
+        await message_writer.stop()
+
+    for conversation_id, response in zip(conversations, responses):
+        assert response.status_code == 200
+        assert f"stream {conversation_id}" in response.text
+        assert response.text.rstrip().endswith("data: [DONE]")
+
+
+@pytest.mark.anyio
+async def test_sessions_do_not_share_identity_maps():
+    from app.db.session import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as first, AsyncSessionLocal() as second:
+        await first.execute(select(User).limit(1))
+        assert first is not second
+        assert not second.identity_map
@@ -0,0 +1,143 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.conversation import Conversation, Message
+from app.models.user import User
+from app.services import context
+from app.services.llm import CircuitBreaker, FakeProvider, LLMClient
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_llm(reply: str = "summary") -> LLMClient:
+    return LLMClient(
+        FakeProvider(reply=reply),
+        max_concurrency_per_model=4,
+        queue_timeout=1,
+        max_retries=0,
+        backoff_base=0,
+        backoff_max=0,
+        breaker=CircuitBreaker(failure_threshold=5, reset_timeout=1),
+    )
+
+
+async def seed(contents, timestamps=None) -> str:
+    """Create a conversation holding ``contents`` in order; returns its id."""
+    timestamps = timestamps or [START + timedelta(seconds=index) for index in range(len(contents))]
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        conversation = Conversation(user_id=user.id)
+        db.add(conversation)
+        await db.flush()
+        db.add_all(
+            Message(
+                # Ids sort in insertion order, as the tie-breaker expects
+                id=f"{index:04d}-{uuid.uuid4()}",
+                conversation_id=conversation.id,
+                role="user" if index % 2 == 0 else "assistant",
+                content=content,
+                created_at=created_at,
+            )
+            for index, (content, created_at) in enumerate(zip(contents, timestamps))
+        )
+        await db.commit()
+        return conversation.id
+
+
+async def window(conversation_id: str, **limits) -> context.ContextWindow:
+    async with AsyncSessionLocal() as db:
+        conversation = await db.get(Conversation, conversation_id)
+        return await context.build_context_window(db, conversation, **limits)
+
+
+@pytest.mark.anyio
+async def test_window_keeps_the_newest_messages_that_fit_the_budget():
+    contents = [f"message {index} " + "x" * 36 for index in range(10)]
+    conversation_id = await seed(contents)
+    per_message = context.estimate_tokens(contents[0])
+
+    result = await window(conversation_id, token_budget=per_message * 3, max_messages=40)
+
+    assert [message["content"] for message in result.messages] == contents[-3:]
+    assert result.tokens == per_message * 3
+    assert result.needs_summary
+    assert result.rows_read == 10
+
+
+@pytest.mark.anyio
+async def test_window_reads_at_most_max_messages_plus_one():
+    conversation_id = await seed([f"m{index}" for index in range(50)])
+
+    result = await window(conversation_id, token_budget=100_000, max_messages=5)
+
+    assert [message["content"] for message in result.messages] == [f"m{index}" for index in range(45, 50)]
+    assert result.rows_read == 6
+    assert result.needs_summary
+
+
+@pytest.mark.anyio
+async def test_newest_message_is_kept_even_when_over_budget():
+    conversation_id = await seed(["short", "y" * 400])
+
+    result = await window(conversation_id, token_budget=10, max_messages=40)
+
+    assert [message["content"] for message in result.messages] == ["y" * 400]
+    assert result.needs_summary
+
+
+@pytest.mark.anyio
+async def test_summary_is_prepended_and_charged_to_the_budget():
+    conversation_id = await seed(["a" * 40, "b" * 40])
+    async with AsyncSessionLocal() as db:
+        conversation = await db.get(Conversation, conversation_id)
+        conversation.summary = "s" * 40
+        await db.commit()
+
+    result = await window(conversation_id, token_budget=context.estimate_tokens("x" * 40) * 2, max_messages=40)
+
+    assert [message["content"] for message in result.messages] == ["b" * 40]
+    prompt = result.to_openai_messages("system prompt")
+    assert prompt[0] == {"role": "system", "content": "system prompt"}
+    assert prompt[1]["content"].endswith("s" * 40)
+    assert prompt[2:] == result.messages
+
+
+@pytest.mark.anyio
+async def test_summary_boundary_keeps_messages_sharing_its_timestamp(monkeypatch):
+    # Six messages in the same instant, e.g. an import or a coarse database clock
+    contents = [f"tied {index}" for index in range(6)]
+    conversation_id = await seed(contents, [START] * 6)
+    monkeypatch.setattr(settings, "CONTEXT_SUMMARY_BATCH", 2)
+
+    before = (await window(conversation_id, token_budget=100_000, max_messages=2)).starts_at
+    await context.refresh_summary(make_llm(), conversation_id, before)
+
+    async with AsyncSessionLocal() as db:
+        conversation = await db.get(Conversation, conversation_id)
+        assert conversation.summary == "summary"
+        assert conversation.summarized_until_id.startswith("0001-")
+
+    result = await window(conversation_id, token_budget=100_000, max_messages=40)
+    assert [message["content"] for message in result.messages] == contents[2:]
+    assert not result.needs_summary
+
+
+@pytest.mark.anyio
+async def test_boundary_without_an_id_keeps_every_message_at_its_timestamp():
+    # Exports from before summarized_until_id carry only the timestamp
+    later = START + timedelta(seconds=1)
+    conversation_id = await seed(["old", "tied a", "tied b"], [START, later, later])
+    async with AsyncSessionLocal() as db:
+        conversation = await db.get(Conversation, conversation_id)
+        conversation.summarized_until = later
+        await db.commit()
+
+    result = await window(conversation_id, token_budget=100_000, max_messages=40)
+
+    assert [message["content"] for message in result.messages] == ["tied a", "tied b"]
@@ -0,0 +1,156 @@
+import json
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.dataset import Dataset
+from app.models.user import User
+from app.services import dataset_index, datasets
+from app.services.dataset_profiler import profile_file
+
+
+def write(tmp_path, name: str, content: str) -> str:
+    path = tmp_path / name
+    path.write_bytes(content.encode("utf-8"))
+    return str(path)
+
+
+def read_all(path: str, file_format: str, columns=(), start: int = 0, limit: int = 100):
+    return dataset_index.read_rows(path, file_format, start, limit, list(columns))
+
+
+@pytest.mark.parametrize("read_size", [None, 3])
+def test_csv_rows_keep_quoted_newlines_and_skip_blank_lines(tmp_path, monkeypatch, read_size):
+    if read_size:
+        # Quotes, newlines and blank lines straddle chunk boundaries
+        monkeypatch.setattr(dataset_index, "READ_SIZE", read_size)
+    path = write(
+        tmp_path,
+        "reviews.csv",
+        'text,label\n"first line\nsecond line",pos\n\n"say ""hi""",neg\r\n\r\nplain,pos',
+    )
+
+    assert dataset_index.build_row_index(path, "csv") == 3
+    columns, rows, total = read_all(path, "csv")
+
+    assert columns == ["text", "label"]
+    assert rows == [["first line\nsecond line", "pos"], ['say "hi"', "neg"], ["plain", "pos"]]
+    assert total == profile_file(path, "csv")["rows"] == 3
+
+
+@pytest.mark.parametrize("read_size", [None, 2])
+def test_jsonl_rows_skip_whitespace_lines_as_the_profiler_does(tmp_path, monkeypatch, read_size):
+    if read_size:
+        monkeypatch.setattr(dataset_index, "READ_SIZE", read_size)
+    path = write(tmp_path, "items.jsonl", '{"text": "a"}\n  \n\n{"text": "b"}\r\n \t\n{"text": "c"}')
+
+    assert dataset_index.build_row_index(path, "jsonl") == 3
+    columns, rows, total = read_all(path, "jsonl", columns=["text"])
+
+    assert rows == [["a"], ["b"], ["c"]]
+    assert total == profile_file(path, "jsonl")["rows"]
+
+
+def test_a_header_only_csv_has_columns_and_no_rows(tmp_path):
+    path = write(tmp_path, "empty.csv", "text,label\n")
+
+    assert dataset_index.build_row_index(path, "csv") == 0
+    assert read_all(path, "csv") == (["text", "label"], [], 0)
+
+
+def test_a_json_array_is_read_through_a_json_lines_copy(tmp_path):
+    items = [{"text": "a", "label": 1}, {"text": "b"}, 7]
+    path = write(tmp_path, "items.json", json.dumps(items, indent=2))
+
+    assert dataset_index.build_row_index(path, "json") == 3
+    columns, rows, total = read_all(path, "json", columns=["text", "label", "value"])
+
+    with open(dataset_index.rows_path(path, "json"), encoding="utf-8") as copy:
+        assert [json.loads(line) for line in copy] == items
+    assert columns == ["text", "label", "value"]
+    assert rows == [["a", 1, None], ["b", None, None], [None, None, 7]]
+    assert total == 3
+
+
+def test_text_rows_and_pages(tmp_path):
+    path = write(tmp_path, "lines.txt", "".join(f"line {index}\n" for index in range(10)))
+
+    assert dataset_index.build_row_index(path, "text") == 10
+    columns, rows, total = read_all(path, "text", start=8, limit=5)
+
+    assert columns == ["text"]
+    assert rows == [["line 8"], ["line 9"]]
+    assert total == 10
+
+
+def test_a_start_past_the_last_row_reads_nothing(tmp_path):
+    path = write(tmp_path, "small.csv", "a,b\n1,2\n3,4\n")
+    dataset_index.build_row_index(path, "csv")
+
+    assert read_all(path, "csv", start=5) == (["a", "b"], [], 2)
+    assert read_all(path, "csv", start=2) == (["a", "b"], [], 2)
+
+
+async def ready_dataset(content: str) -> Dataset:
+    """A processed CSV dataset, as the ``dataset.process`` job leaves it."""
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        dataset = Dataset(
+            user_id=user.id,
+            filename="edits.csv",
+            format="csv",
+            size_bytes=len(content),
+            received_bytes=len(content),
+        )
+        db.add(dataset)
+        await db.flush()
+        datasets.create_file(dataset.id)
+        path = datasets.storage_path(dataset.id)
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            file.write(content)
+        dataset.profile = profile_file(path, "csv", None, settings.DATASET_PROFILE_MAX_DISTINCT)
+        dataset_index.build_row_index(path, "csv")
+        dataset.status = "ready"
+        await db.commit()
+        return dataset
+
+
+@pytest.mark.anyio
+async def test_edits_are_overlaid_on_read_rows_and_the_last_edit_wins():
+    dataset = await ready_dataset("text,label\nfirst,pos\nsecond,neg\nthird,pos\n")
+
+    async with AsyncSessionLocal() as db:
+        applied = await datasets.apply_edits(db, dataset, [(1, "label", "pos"), (2, "text", "3rd")])
+        await db.commit()
+    assert applied == 2
+    async with AsyncSessionLocal() as db:
+        applied = await datasets.apply_edits(db, dataset, [(1, "label", "maybe"), (1, "label", "neutral")])
+        await db.commit()
+    assert applied == 1
+
+    async with AsyncSessionLocal() as db:
+        columns, rows, total = await datasets.read_rows(db, dataset, 1, 10)
+
+    assert columns == ["text", "label"]
+    assert rows == [["second", "neutral"], ["3rd", "pos"]]
+    assert total == 3
+    # The uploaded file itself is untouched
+    with open(datasets.storage_path(dataset.id), encoding="utf-8") as file:
+        assert "second,neg" in file.read()
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("edit, message", [
+    ((3, "label", "pos"), "Row 3 is out of range"),
+    ((0, "score", 1), "Unknown column: score"),
+])
+async def test_invalid_edits_are_rejected(edit, message):
+    dataset = await ready_dataset("text,label\nfirst,pos\nsecond,neg\nthird,pos\n")
+
+    async with AsyncSessionLocal() as db:
+        with pytest.raises(datasets.InvalidEdit, match=message):
+            await datasets.apply_edits(db, dataset, [edit])
@@ -0,0 +1,171 @@
+import uuid
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.dataset import Dataset
+from app.models.user import User
+from app.services import datasets
+from app.services.dataset_profiler import profile_file
+from tests.conftest import register
+
+CONTENT = b"text,label\nfirst,pos\nsecond,\nthird,neg\nfourth,NA\n"
+DATASETS = "/api/v1/datasets"
+
+
+def create(client, headers, size: int = len(CONTENT), **fields):
+    return client.post(
+        DATASETS, json={"filename": "reviews.csv", "size_bytes": size, **fields}, headers=headers
+    )
+
+
+def put(client, headers, dataset_id: str, body: bytes, start: int, total=len(CONTENT)):
+    return client.put(
+        f"{DATASETS}/{dataset_id}/content",
+        content=body,
+        headers={**headers, "Content-Range": f"bytes {start}-{start + len(body) - 1}/{total}"},
+    )
+
+
+def test_an_upload_split_across_requests_completes_and_queues_processing(client, auth_headers):
+    dataset_id = create(client, auth_headers).json()["id"]
+
+    first = put(client, auth_headers, dataset_id, CONTENT[:20], 0)
+    assert first.status_code == 200, first.text
+    assert (first.json()["status"], first.json()["received_bytes"]) == ("uploading", 20)
+    assert "Job-Id" not in first.headers
+
+    rest = put(client, auth_headers, dataset_id, CONTENT[20:], 20)
+    assert rest.status_code == 200, rest.text
+    assert (rest.json()["status"], rest.json()["received_bytes"]) == ("uploaded", len(CONTENT))
+    job = client.get(f"/api/v1/jobs/{rest.headers['Job-Id']}", headers=auth_headers).json()
+    assert job["kind"] == "dataset.process"
+    with open(datasets.storage_path(dataset_id), "rb") as file:
+        assert file.read() == CONTENT
+
+    again = put(client, auth_headers, dataset_id, b"x", 0)
+    assert again.status_code == 409
+
+
+def test_a_single_request_without_content_range_uploads_everything(client, auth_headers):
+    dataset_id = create(client, auth_headers).json()["id"]
+
+    response = client.put(f"{DATASETS}/{dataset_id}/content", content=CONTENT, headers=auth_headers)
+
+    assert response.json()["status"] == "uploaded"
+
+
+@pytest.mark.parametrize("content_range", ["bytes=0-4/50", "bytes 0-4", "bytes 5-4/*", "bytes 0-4/999"])
+def test_a_bad_content_range_is_rejected(client, auth_headers, content_range):
+    dataset_id = create(client, auth_headers).json()["id"]
+
+    response = client.put(
+        f"{DATASETS}/{dataset_id}/content",
+        content=CONTENT[:5],
+        headers={**auth_headers, "Content-Range": content_range},
+    )
+
+    assert response.status_code == 400
+
+
+def test_a_range_not_starting_at_the_received_offset_gets_the_offset_to_resume_at(client, auth_headers):
+    dataset_id = create(client, auth_headers).json()["id"]
+    put(client, auth_headers, dataset_id, CONTENT[:10], 0)
+
+    for start in (0, 15):
+        response = put(client, auth_headers, dataset_id, CONTENT[start:start + 5], start)
+        assert response.status_code == 409
+        assert response.headers["Upload-Offset"] == "10"
+
+    assert put(client, auth_headers, dataset_id, CONTENT[10:], 10).json()["status"] == "uploaded"
+
+
+def test_a_declared_size_over_the_limit_is_rejected(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "DATASET_MAX_BYTES", 16)
+
+    assert create(client, auth_headers, size=17).status_code == 413
+
+
+def test_content_beyond_the_declared_size_is_rejected_and_discarded(client, auth_headers):
+    dataset_id = create(client, auth_headers).json()["id"]
+    put(client, auth_headers, dataset_id, CONTENT[:10], 0)
+
+    response = client.put(
+        f"{DATASETS}/{dataset_id}/content",
+        content=CONTENT[10:] + b"extra",
+        headers={**auth_headers, "Content-Range": f"bytes 10-{len(CONTENT) + 4}/*"},
+    )
+
+    assert response.status_code == 413
+    assert client.get(f"{DATASETS}/{dataset_id}", headers=auth_headers).json()["received_bytes"] == 10
+    with open(datasets.storage_path(dataset_id), "rb") as file:
+        assert file.read() == CONTENT[:10]
+
+
+def test_another_users_dataset_is_not_found(client, auth_headers):
+    dataset_id = create(client, auth_headers).json()["id"]
+
+    assert put(client, register(client), dataset_id, CONTENT, 0).status_code == 404
+
+
+async def uploading_dataset() -> Dataset:
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        dataset = Dataset(user_id=user.id, filename="reviews.csv", format="csv", size_bytes=len(CONTENT))
+        db.add(dataset)
+        await db.commit()
+    datasets.create_file(dataset.id)
+    return dataset
+
+
+@pytest.mark.anyio
+async def test_a_disconnect_keeps_what_arrived_and_a_resumed_write_replaces_the_rest():
+    dataset = await uploading_dataset()
+
+    async def interrupted():
+        yield CONTENT[:8]
+        yield CONTENT[8:12]
+        raise ClientDisconnect()
+
+    assert await datasets.write_content(dataset, 0, interrupted()) == 12
+
+    async def resumed():
+        yield CONTENT[12:]
+
+    # Resuming from an earlier offset drops the bytes past it first
+    with open(datasets.storage_path(dataset.id), "ab") as file:
+        file.write(b"partial garbage")
+    assert await datasets.write_content(dataset, 12, resumed()) == len(CONTENT) - 12
+    with open(datasets.storage_path(dataset.id), "rb") as file:
+        assert file.read() == CONTENT
+
+
+def test_profile_counts_rows_columns_and_nulls(tmp_path):
+    path = tmp_path / "reviews.csv"
+    path.write_bytes(CONTENT + b"fifth,pos,extra\n\n")
+
+    profile = profile_file(str(path), "csv")
+
+    assert (profile["rows"], profile["malformed_rows"]) == (5, 1)
+    text, label = profile["columns"]
+    assert (text["name"], text["type"], text["nulls"], text["distinct"]) == ("text", "string", 0, 5)
+    assert (label["name"], label["nulls"], label["null_ratio"]) == ("label", 2, 0.4)
+    assert profile["label_column"] == "label"
+    assert profile["label_distribution"] == {"pos": 2, "neg": 1}
+    assert profile["delimiter"] == ","
+
+
+def test_profile_of_json_lines_counts_missing_keys_as_nulls(tmp_path):
+    path = tmp_path / "items.jsonl"
+    path.write_text('{"text": "a", "score": 1}\n{"text": "b"}\n{"text": null, "score": 2.5}\n')
+
+    profile = profile_file(str(path), "jsonl")
+
+    columns = {column["name"]: column for column in profile["columns"]}
+    assert profile["rows"] == 3
+    assert (columns["text"]["nulls"], columns["score"]["nulls"]) == (1, 1)
+    assert (columns["score"]["type"], columns["score"]["min"], columns["score"]["max"]) == ("float", 1.0, 2.5)
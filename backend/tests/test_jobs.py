@@ -0,0 +1,195 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, update
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.job import Job
+from app.models.user import User
+from app.services import jobs
+from tests.conftest import register
+
+
+@jobs.handler("test.reports_progress")
+async def reports_progress(job: jobs.JobContext):
+    await job.progress(0.0, "Extracting search keywords")
+    return {"done": True}
+
+
+@jobs.handler("test.flaky")
+async def flaky(job: jobs.JobContext):
+    raise RuntimeError(f"attempt {job.attempt} failed")
+
+
+@jobs.handler("test.hopeless")
+async def hopeless(job: jobs.JobContext):
+    raise jobs.JobFailed("the input is malformed")
+
+
+@pytest.fixture
+async def worker():
+    """A worker over an empty queue; jobs other tests queued are dropped first."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Job))
+        await db.commit()
+    return jobs.JobWorker()
+
+
+async def queue(kind: str, **kwargs) -> str:
+    async with AsyncSessionLocal() as db:
+        job = await jobs.enqueue(db, kind, **kwargs)
+        await db.commit()
+        return job.id
+
+
+async def load(job_id: str) -> Job:
+    async with AsyncSessionLocal() as db:
+        return await db.get(Job, job_id)
+
+
+async def make_due(job_id: str) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(Job).where(Job.id == job_id).values(run_after=jobs._now()))
+        await db.commit()
+
+
+def aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def run_next(worker: jobs.JobWorker, job_id: str) -> None:
+    claimed = await worker._claim()
+    assert claimed is not None and claimed.id == job_id
+    await worker._execute(claimed)
+
+
+@pytest.mark.anyio
+async def test_a_succeeded_job_drops_its_last_progress_message(worker):
+    job_id = await queue("test.reports_progress")
+
+    await run_next(worker, job_id)
+
+    job = await load(job_id)
+    assert job.status == "succeeded"
+    assert job.result == {"done": True}
+    assert job.progress == 1.0
+    assert job.progress_message is None
+
+
+@pytest.mark.anyio
+async def test_failed_attempts_back_off_until_out_of_attempts(worker):
+    job_id = await queue("test.flaky", max_attempts=2)
+
+    before = jobs._now()
+    await run_next(worker, job_id)
+
+    job = await load(job_id)
+    assert (job.status, job.attempts, job.error) == ("queued", 1, "RuntimeError: attempt 1 failed")
+    assert job.locked_by is None
+    # First retry waits half to all of the base backoff
+    delay = (aware(job.run_after) - before).total_seconds()
+    assert settings.JOB_RETRY_BACKOFF_SECONDS * 0.5 <= delay <= settings.JOB_RETRY_BACKOFF_SECONDS + 1
+    assert await worker._claim() is None
+
+    await make_due(job_id)
+    await run_next(worker, job_id)
+
+    job = await load(job_id)
+    assert (job.status, job.attempts, job.error) == ("failed", 2, "RuntimeError: attempt 2 failed")
+    assert job.finished_at is not None
+
+
+def test_retry_delay_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_SECONDS", 4)
+    monkeypatch.setattr(settings, "JOB_RETRY_BACKOFF_MAX_SECONDS", 10)
+
+    for attempts, ceiling in ((1, 4), (2, 8), (3, 10), (10, 10)):
+        assert ceiling / 2 <= jobs.retry_delay(attempts) <= ceiling
+
+
+@pytest.mark.anyio
+async def test_job_failed_is_not_retried(worker):
+    job_id = await queue("test.hopeless", max_attempts=3)
+
+    await run_next(worker, job_id)
+
+    job = await load(job_id)
+    assert (job.status, job.attempts, job.error) == ("failed", 1, "the input is malformed")
+    assert await worker._claim() is None
+
+
+@pytest.mark.anyio
+async def test_an_expired_lease_is_requeued_then_failed_once_out_of_attempts(worker):
+    job_id = await queue("test.reports_progress", max_attempts=2)
+    for attempt in (1, 2):
+        claimed = await worker._claim()
+        assert claimed.id == job_id
+        # The worker died: its lease lapses without being renewed
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Job).where(Job.id == job_id).values(locked_until=jobs._now() - timedelta(seconds=1))
+            )
+            await db.commit()
+
+        await worker.requeue_expired()
+
+        job = await load(job_id)
+        assert job.attempts == attempt
+        assert job.locked_by is None and job.locked_until is None
+    assert job.status == "failed"
+    assert job.error == "The worker running the job stopped responding"
+
+
+@pytest.mark.anyio
+async def test_a_held_lease_is_left_alone(worker):
+    job_id = await queue("test.reports_progress")
+    await worker._claim()
+
+    await worker.requeue_expired()
+
+    job = await load(job_id)
+    assert (job.status, job.locked_by) == ("running", worker.worker_id)
+
+
+@pytest.mark.anyio
+async def test_enqueue_with_the_same_idempotency_key_returns_the_same_job(worker):
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+        user_id = user.id
+
+    first = await queue("test.reports_progress", user_id=user_id, idempotency_key="k1")
+    again = await queue("test.reports_progress", payload={"other": 1}, user_id=user_id, idempotency_key="k1")
+    other_key = await queue("test.reports_progress", user_id=user_id, idempotency_key="k2")
+
+    assert again == first
+    assert other_key != first
+    assert (await load(first)).payload == {}
+
+
+@pytest.mark.anyio
+async def test_higher_priority_jobs_are_claimed_first(worker):
+    older = await queue("test.reports_progress")
+    urgent = await queue("test.reports_progress", priority=jobs.PRIORITY_INTERACTIVE)
+    newer = await queue("test.reports_progress")
+
+    claimed = [(await worker._claim()).id for _ in range(3)]
+
+    assert claimed == [urgent, older, newer]
+
+
+def test_a_job_is_only_visible_to_its_owner(client, auth_headers):
+    conversation_id = client.post("/api/v1/conversations", json={"title": "jobs"}, headers=auth_headers).json()["id"]
+    response = client.post(
+        "/api/v1/task-definitions",
+        json={"conversation_id": conversation_id, "name": "churn", "description": "predict churn"},
+        headers=auth_headers,
+    )
+    job_id = response.headers["Job-Id"]
+
+    assert client.get(f"/api/v1/jobs/{job_id}", headers=auth_headers).json()["kind"] == "task_definition.finalize"
+    response = client.get(f"/api/v1/jobs/{job_id}", headers=register(client))
+    assert response.status_code == 404
@@ -0,0 +1,89 @@
+import datetime
+import decimal
+import enum
+import json as stdlib_json
+import uuid
+
+import pytest
+
+from app.core import json
+from app.schemas.conversation import Message
+
+
+class Color(enum.Enum):
+    RED = "red"
+
+
+NOW = datetime.datetime(2025, 5, 6, 7, 8, 9, 123456, tzinfo=datetime.timezone.utc)
+ID = uuid.UUID("12345678-1234-5678-1234-567812345678")
+
+
+@pytest.fixture(params=[False, True], ids=["stdlib", "orjson"])
+def encoder(request, monkeypatch):
+    if request.param and json.orjson is None:
+        pytest.skip("orjson is not installed")
+    monkeypatch.setattr(json, "FAST_JSON", request.param)
+    return request.param
+
+
+def test_encodes_the_types_the_app_returns(encoder):
+    message = Message(id="m1", conversation_id="c1", role="user", content="hi", created_at=NOW)
+    payload = {
+        "at": NOW,
+        "day": NOW.date(),
+        "id": ID,
+        "color": Color.RED,
+        "price": decimal.Decimal("1.5"),
+        "tags": ("a", "b"),
+        "message": message,
+        1: "integer key",
+    }
+
+    decoded = stdlib_json.loads(json.dumps(payload))
+
+    assert decoded == {
+        "at": "2025-05-06T07:08:09.123456+00:00",
+        "day": "2025-05-06",
+        "id": str(ID),
+        "color": "red",
+        "price": 1.5,
+        "tags": ["a", "b"],
+        "message": message.model_dump(mode="json"),
+        "1": "integer key",
+    }
+
+
+def test_output_is_compact_utf8(encoder):
+    assert json.dumps({"a": [1, 2], "text": "Grüße"}) == '{"a":[1,2],"text":"Grüße"}'
+    assert json.dumps_bytes({"text": "Grüße"}) == '{"text":"Grüße"}'.encode()
+
+
+def test_unknown_objects_are_rejected(encoder):
+    with pytest.raises(TypeError):
+        json.dumps({"value": object()})
+
+
+def test_models_are_dumped_by_pydantic(encoder):
+    message = Message(id="m1", conversation_id="c1", role="user", content="hi", created_at=NOW)
+
+    assert json.dumps(message) == message.model_dump_json()
+    assert json.dumps_bytes(message) == message.model_dump_json().encode()
+
+
+def test_loads_round_trips(encoder):
+    payload = {"nested": {"list": [1, 2.5, None, True]}, "text": "ünïcode"}
+
+    assert json.loads(json.dumps_bytes(payload)) == payload
+
+
+def test_sse_event_frames_one_json_payload(encoder):
+    assert json.sse_event("token ") == 'data: "token "\n\n'
+    assert json.sse_event({"type": "schema"}) == 'data: {"type":"schema"}\n\n'
+
+
+def test_responses_render_through_the_fast_encoder(client, auth_headers):
+    response = client.get("/api/v1/auth/me", headers=auth_headers)
+
+    assert response.headers["content-type"] == "application/json"
+    assert b": " not in response.content
+    assert response.json()["email"].endswith("@example.com")
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.services.llm import (
+    CircuitBreaker,
+    FakeProvider,
+    LLMClient,
+    LLMError,
+    LLMProvider,
+    LLMUnavailable,
+    OpenAIProvider,
+    Usage,
+)
+
+MODEL = "test-model"
+MESSAGES = [{"role": "user", "content": "hello there"}]
+
+
+class ScriptedProvider(LLMProvider):
+    """Raises the queued errors in turn, then behaves like ``FakeProvider``."""
+
+    def __init__(self, *errors: LLMError, fail_after_tokens: int = 0):
+        self.errors = list(errors)
+        self.fail_after_tokens = fail_after_tokens
+        self.calls = 0
+        self.fake = FakeProvider()
+
+    async def complete(self, model, messages, usage=None, **params):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return await self.fake.complete(model, messages, usage, **params)
+
+    async def stream(self, model, messages, usage=None, **params):
+        self.calls += 1
+        sent = 0
+        async for token in self.fake.stream(model, messages, usage, **params):
+            if self.errors and sent == self.fail_after_tokens:
+                raise self.errors.pop(0)
+            sent += 1
+            yield token
+
+
+def make_client(
+    provider: LLMProvider, clock=time.monotonic, failure_threshold=5, reset_timeout=30, **overrides
+) -> LLMClient:
+    options = dict(max_concurrency_per_model=4, queue_timeout=1, max_retries=2, backoff_base=0, backoff_max=0)
+    options.update(overrides)
+    breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout, clock=clock)
+    return LLMClient(provider, breaker=breaker, **options)
+
+
+def transient(message: str = "503: busy") -> LLMError:
+    return LLMError(message, retryable=True)
+
+
+@pytest.mark.anyio
+async def test_fake_provider_echoes_and_reports_usage():
+    usage = Usage()
+
+    reply = await make_client(FakeProvider()).complete(MODEL, MESSAGES, usage=usage)
+
+    assert reply == "You said: hello there"
+    assert (usage.prompt_tokens, usage.completion_tokens) == (2, 4)
+
+
+@pytest.mark.anyio
+async def test_transient_errors_are_retried():
+    provider = ScriptedProvider(transient(), transient())
+
+    reply = await make_client(provider).complete(MODEL, MESSAGES)
+
+    assert reply == "You said: hello there"
+    assert provider.calls == 3
+
+
+@pytest.mark.anyio
+async def test_retries_give_up_after_max_retries():
+    provider = ScriptedProvider(transient(), transient(), transient("503: still busy"))
+
+    with pytest.raises(LLMError, match="still busy"):
+        await make_client(provider).complete(MODEL, MESSAGES)
+    assert provider.calls == 3
+
+
+@pytest.mark.anyio
+async def test_rejected_requests_are_not_retried():
+    provider = ScriptedProvider(LLMError("400: bad request"))
+
+    with pytest.raises(LLMError, match="bad request"):
+        await make_client(provider).complete(MODEL, MESSAGES)
+    assert provider.calls == 1
+
+
+@pytest.mark.anyio
+async def test_streams_retry_only_before_the_first_token():
+    before = ScriptedProvider(transient())
+    tokens = [token async for token in make_client(before).stream(MODEL, MESSAGES)]
+    assert "".join(tokens) == "You said: hello there"
+    assert before.calls == 2
+
+    after = ScriptedProvider(transient(), fail_after_tokens=2)
+    received = []
+    with pytest.raises(LLMError):
+        async for token in make_client(after).stream(MODEL, MESSAGES):
+            received.append(token)
+    assert received == ["You ", "said: "]
+    assert after.calls == 1
+
+
+@pytest.mark.anyio
+async def test_circuit_opens_then_lets_one_trial_through():
+    now = [0.0]
+    provider = ScriptedProvider(*(transient() for _ in range(3)))
+    client = make_client(provider, clock=lambda: now[0], failure_threshold=3, reset_timeout=10, max_retries=0)
+
+    for _ in range(3):
+        with pytest.raises(LLMError):
+            await client.complete(MODEL, MESSAGES)
+    with pytest.raises(LLMUnavailable) as refused:
+        await client.complete(MODEL, MESSAGES)
+    assert refused.value.retry_after == 10
+    assert provider.calls == 3
+
+    now[0] = 10.0
+    assert await client.complete(MODEL, MESSAGES) == "You said: hello there"
+    assert not client.breaker.is_open
+
+
+def test_failed_trial_reopens_the_circuit():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+
+    now[0] = 10.0
+    assert breaker.allow()
+    # Only one trial at a time
+    assert not breaker.allow()
+    breaker.record_failure()
+
+    assert breaker.is_open
+    assert breaker.retry_after() == 10
+
+
+@pytest.mark.anyio
+async def test_calls_wait_for_a_slot_and_give_up_after_the_queue_timeout():
+    client = make_client(FakeProvider(latency=0.2), max_concurrency_per_model=1, queue_timeout=0.05)
+    held = asyncio.create_task(client.complete(MODEL, MESSAGES))
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(LLMUnavailable):
+        await client.complete(MODEL, MESSAGES)
+    # Other models have their own slots
+    assert await client.complete("other-model", MESSAGES) == "You said: hello there"
+    assert await held == "You said: hello there"
+
+
+def openai_provider(handler) -> OpenAIProvider:
+    provider = OpenAIProvider(
+        api_key="test", base_url="http://llm.test", timeout=5, connect_timeout=5, max_connections=2, http2=False,
+    )
+    provider._client = httpx.AsyncClient(base_url="http://llm.test", transport=httpx.MockTransport(handler))
+    return provider
+
+
+@pytest.mark.anyio
+async def test_openai_stream_yields_deltas_and_reads_usage_from_the_last_chunk():
+    chunks = [
+        {"choices": [{"delta": {"role": "assistant"}}]},
+        {"choices": [{"delta": {"content": "Hello"}}]},
+        {"choices": [{"delta": {"content": " world"}}]},
+        {"choices": [], "usage": {"prompt_tokens": 7, "completion_tokens": 2}},
+    ]
+    body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    provider = openai_provider(handler)
+    usage = Usage()
+    deltas = [delta async for delta in provider.stream(MODEL, MESSAGES, usage)]
+    await provider.aclose()
+
+    assert deltas == ["Hello", " world"]
+    assert (usage.prompt_tokens, usage.completion_tokens) == (7, 2)
+    assert requests[0]["stream"] is True
+    assert requests[0]["stream_options"] == {"include_usage": True}
+
+
+@pytest.mark.anyio
+async def test_openai_rate_limits_are_retryable_and_carry_retry_after():
+    def handler(request):
+        return httpx.Response(429, json={"error": {"message": "slow down"}}, headers={"retry-after": "3"})
+
+    provider = openai_provider(handler)
+    with pytest.raises(LLMError) as error:
+        await provider.complete(MODEL, MESSAGES)
+    await provider.aclose()
+
+    assert str(error.value) == "429: slow down"
+    assert error.value.retryable
+    assert error.value.retry_after == 3
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+from app.api.v1.endpoints import conversations
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.conversation import Conversation, Message
+from app.models.usage import UsageEvent
+from app.models.user import User
+from app.services import message_writer as message_writer_module
+from app.services.llm import CircuitBreaker, FakeProvider, LLMClient, get_llm_client
+from app.services.message_writer import MessageWriter
+
+SCHEMA = {"type": "object", "properties": {"label": {"type": "string"}}}
+
+
+async def new_conversation():
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        conversation = Conversation(user_id=user.id, title="streamed")
+        db.add(conversation)
+        await db.commit()
+        return user.id, conversation.id
+
+
+async def load(message_id: str, conversation_id: str):
+    async with AsyncSessionLocal() as db:
+        message = await db.get(Message, message_id)
+        conversation = await db.get(Conversation, conversation_id)
+        events = (await db.execute(select(UsageEvent).where(UsageEvent.reference_id == message_id))).scalars().all()
+        return message, conversation, events
+
+
+@pytest.mark.anyio
+async def test_checkpoints_write_a_partial_row_that_finalize_completes():
+    user_id, conversation_id = await new_conversation()
+    message_id = str(uuid.uuid4())
+    writer = MessageWriter()
+
+    writer.checkpoint(message_id, conversation_id, "You", user_id)
+    writer.checkpoint(message_id, conversation_id, "You said:", user_id)
+    await writer.stop()
+    partial, conversation, events = await load(message_id, conversation_id)
+
+    # Coalesced: only the newest checkpoint is written
+    assert (partial.role, partial.content, partial.is_complete) == ("assistant", "You said:", False)
+    assert conversation.message_count == 1
+    assert events == []
+
+    writer.checkpoint(message_id, conversation_id, "You said: hel", user_id)
+    await writer.stop()
+    assert (await load(message_id, conversation_id))[0].content == "You said: hel"
+
+    writer.finalize(
+        message_id, conversation_id, "You said: hello",
+        model="gpt-test", prompt_tokens=7, completion_tokens=3, user_id=user_id, json_schema=SCHEMA,
+    )
+    await writer.stop()
+    final, conversation, events = await load(message_id, conversation_id)
+
+    assert (final.content, final.is_complete) == ("You said: hello", True)
+    assert (final.model, final.prompt_tokens, final.completion_tokens) == ("gpt-test", 7, 3)
+    assert conversation.message_count == 1
+    assert conversation.draft_json_schema == SCHEMA
+    assert [(event.kind, event.llm_calls, event.prompt_tokens, event.completion_tokens) for event in events] == [
+        ("chat", 1, 7, 3)
+    ]
+
+
+@pytest.mark.anyio
+async def test_a_reply_cut_short_is_finalized_incomplete_and_clears_the_draft_schema():
+    user_id, conversation_id = await new_conversation()
+    writer = MessageWriter()
+    earlier = str(uuid.uuid4())
+    writer.finalize(earlier, conversation_id, "with a schema", user_id=user_id, json_schema=SCHEMA)
+    await writer.stop()
+
+    message_id = str(uuid.uuid4())
+    writer.finalize(message_id, conversation_id, "You said", is_complete=False, user_id=user_id)
+    await writer.stop()
+    message, conversation, _ = await load(message_id, conversation_id)
+
+    assert (message.content, message.is_complete) == ("You said", False)
+    assert conversation.draft_json_schema is None
+    assert conversation.message_count == 2
+
+
+@pytest.mark.anyio
+async def test_a_pending_final_write_is_not_replaced_by_a_checkpoint():
+    user_id, conversation_id = await new_conversation()
+    message_id = str(uuid.uuid4())
+    writer = MessageWriter()
+
+    writer.finalize(message_id, conversation_id, "You said: hello", user_id=user_id)
+    writer.checkpoint(message_id, conversation_id, "You said:", user_id)
+    await writer.stop()
+    message, _, _ = await load(message_id, conversation_id)
+
+    assert (message.content, message.is_complete) == ("You said: hello", True)
+
+
+@pytest.mark.anyio
+async def test_a_failed_batch_is_retried(monkeypatch):
+    user_id, conversation_id = await new_conversation()
+    monkeypatch.setattr(message_writer_module, "RETRY_DELAY_SECONDS", 0.01)
+    attempts = []
+
+    def flaky_session():
+        attempts.append(True)
+        if len(attempts) == 1:
+            raise RuntimeError("database unavailable")
+        return AsyncSessionLocal()
+
+    message_id = str(uuid.uuid4())
+    writer = MessageWriter(flaky_session)
+    writer.checkpoint(message_id, conversation_id, "You said:", user_id)
+    for _ in range(100):
+        if len(attempts) > 1:
+            break
+        await asyncio.sleep(0.01)
+    await writer.stop()
+
+    assert len(attempts) == 2
+    assert (await load(message_id, conversation_id))[0].content == "You said:"
+
+
+class RecordingWriter(MessageWriter):
+    """Snapshots each message row right after its batch is committed."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+
+    async def _write(self, batch):
+        await super()._write(batch)
+        async with AsyncSessionLocal() as db:
+            for message_id in batch:
+                message = await db.get(Message, message_id)
+                self.rows.append((message.content, message.is_complete))
+
+
+@pytest.mark.anyio
+async def test_a_streamed_reply_is_checkpointed_then_finalized(monkeypatch):
+    from app.main import app
+
+    writer = RecordingWriter()
+    monkeypatch.setattr(conversations, "message_writer", writer)
+    monkeypatch.setattr(settings, "STREAM_CHECKPOINT_INTERVAL_SECONDS", 0)
+    monkeypatch.setattr(settings, "SSE_COALESCE_MS", 0)
+    slow = LLMClient(
+        FakeProvider(token_delay=0.01),
+        max_concurrency_per_model=4,
+        queue_timeout=1,
+        max_retries=0,
+        backoff_base=0,
+        backoff_max=0,
+        breaker=CircuitBreaker(failure_threshold=5, reset_timeout=1),
+    )
+    app.dependency_overrides[get_llm_client] = lambda: slow
+    credentials = {"email": f"{uuid.uuid4().hex}@example.com", "password": "correct horse"}
+    question = "please label these reviews by sentiment"
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+            await http.post("/api/v1/auth/register", json=credentials)
+            token = (await http.post("/api/v1/auth/login", json=credentials)).json()["access_token"]
+            http.headers["Authorization"] = f"Bearer {token}"
+            conversation_id = (await http.post("/api/v1/conversations", json={"title": "t"})).json()["id"]
+            streamed = await http.post(
+                f"/api/v1/conversations/{conversation_id}/messages/stream",
+                json={"role": "user", "content": question},
+            )
+            await writer.stop()
+            messages = (await http.get(f"/api/v1/conversations/{conversation_id}/messages")).json()
+    finally:
+        app.dependency_overrides.pop(get_llm_client, None)
+        await writer.stop()
+
+    reply = f"You said: {question}"
+    deltas = [
+        json.loads(line[len("data: "):]) for line in streamed.text.splitlines()
+        if line.startswith("data: ") and line != "data: [DONE]"
+    ]
+    assert "".join(deltas) == reply
+    partial = writer.rows[:-1]
+    # Persisted while the reply was still streaming
+    assert partial
+    assert all(not complete and reply.startswith(content) and content != reply for content, complete in partial)
+    assert writer.rows[-1] == (reply, True)
+    assert [(message["role"], message["content"]) for message in messages][-1] == ("assistant", reply)
@@ -0,0 +1,62 @@
+import gzip
+import json
+
+from app.services.model_catalog import ModelCatalog, ModelCatalogService
+from app.services.model_hub import DEFAULT_MODELS, HubModel, LocalHubClient
+
+DISTILBERT = "distilbert-base-uncased-finetuned-sst-2-english"
+
+
+def by_id(catalog: ModelCatalog):
+    return {model.model_id: model for model in catalog.models}
+
+
+def test_save_then_load_keeps_every_field(tmp_path):
+    path = str(tmp_path / "catalog.json.gz")
+    seeded = ModelCatalog.seed()
+
+    seeded.save(path)
+    loaded = ModelCatalog.load(path)
+
+    assert loaded.models == seeded.models
+    assert loaded.postings == seeded.postings
+    model = by_id(loaded)[DISTILBERT]
+    assert model.display_name == "DistilBERT SST-2"
+    assert model.description == "A distilled version of BERT fine-tuned on sentiment analysis"
+
+
+def test_a_file_in_an_older_format_is_ignored(tmp_path):
+    path = tmp_path / "catalog.json.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump({"version": 1, "models": [[DISTILBERT, [], None, 0, 0]], "postings": {}}, f)
+
+    assert ModelCatalog.load(str(path)) is None
+
+
+def test_sync_keeps_default_names_for_models_the_hub_also_returns(tmp_path):
+    # The Hub lists the same model, more popular now but without a curated name
+    from_hub = HubModel(
+        model_id=DISTILBERT,
+        tags=["text-classification"],
+        pipeline_tag="text-classification",
+        downloads=9_000_000,
+        likes=900,
+    )
+    service = ModelCatalogService(
+        path=str(tmp_path / "catalog.json.gz"),
+        client=LocalHubClient([from_hub]),
+        refresh_interval=0,
+        pipeline_tags=["text-classification"],
+        models_per_tag=10,
+    )
+
+    service.sync()
+    # Read back from disk, as another worker process would
+    reloaded = ModelCatalogService(service.path, service.client, 0, [], 0)
+
+    model = by_id(reloaded.catalog)[DISTILBERT]
+    assert model.downloads == 9_000_000
+    assert model.display_name == "DistilBERT SST-2"
+    assert model.description.startswith("A distilled version of BERT")
+    defaults = {model.model_id for group in DEFAULT_MODELS.values() for model in group}
+    assert defaults <= set(by_id(reloaded.catalog))
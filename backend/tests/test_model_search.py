@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services import recommender
+from app.services.model_hub import HubClient, HubModel
+from app.services.model_search import ModelSearchCache, normalize_keywords
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingHub(HubClient):
+    """Returns a new model per call, so results show which fetch they came from."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+
+    def search(self, query: str, limit: int):
+        self.release.wait(5)
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("hub unavailable")
+        return [HubModel(model_id=f"{query}#{self.calls}")][:limit]
+
+
+@pytest.fixture
+def hub():
+    return CountingHub()
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def cache(hub, clock):
+    cache = ModelSearchCache(hub, ttl=60, stale_ttl=600, maxsize=100, clock=clock)
+    yield cache
+    cache._executor.shutdown(wait=True)
+
+
+def ids(models):
+    return [model.model_id for model in models]
+
+
+def wait_for_refreshes(cache: ModelSearchCache) -> None:
+    # Keys are marked before the refresh is submitted and unmarked once it is done
+    deadline = time.monotonic() + 5
+    while cache._refreshing:
+        assert time.monotonic() < deadline, "refresh didn't finish"
+        time.sleep(0.005)
+
+
+def test_keywords_are_normalized_into_one_key():
+    assert normalize_keywords("Sentiment, text-classification,\nsentiment, ") == "sentiment, text-classification"
+
+
+def test_a_miss_fetches_and_later_searches_hit(cache, hub):
+    first = cache.search("sentiment, bert", 5)
+    again = cache.search("BERT,sentiment", 5)
+
+    assert ids(first) == ids(again) == ["bert, sentiment#1"]
+    assert hub.calls == 1
+    # The limit is part of the key
+    cache.search("sentiment, bert", 10)
+    assert hub.calls == 2
+
+
+def test_a_stale_entry_is_served_while_one_refresh_runs(cache, hub, clock):
+    cache.search("ner", 5)
+    clock.now += 61
+    hub.release.clear()
+
+    served = [ids(cache.search("ner", 5)) for _ in range(3)]
+
+    # Served from the cache without waiting on the Hub, and refreshed only once
+    assert served == [["ner#1"]] * 3
+    hub.release.set()
+    wait_for_refreshes(cache)
+    assert hub.calls == 2
+    assert ids(cache.search("ner", 5)) == ["ner#2"]
+
+
+def test_a_failed_refresh_keeps_serving_the_stale_entry(cache, hub, clock):
+    cache.search("ner", 5)
+    clock.now += 61
+    hub.fail = True
+
+    assert ids(cache.search("ner", 5)) == ["ner#1"]
+    wait_for_refreshes(cache)
+
+    assert ids(cache.search("ner", 5)) == ["ner#1"]
+    # Each stale read retries
+    wait_for_refreshes(cache)
+    assert hub.calls == 3
+
+
+def test_an_entry_past_the_stale_window_is_fetched_again(cache, hub, clock):
+    cache.search("ner", 5)
+    clock.now += 60 + 600
+
+    assert ids(cache.search("ner", 5)) == ["ner#2"]
+    assert hub.calls == 2
+
+
+@pytest.mark.anyio
+async def test_recommendations_fall_back_to_the_hub_only_when_enabled(monkeypatch, cache, hub):
+    monkeypatch.setattr(recommender, "model_search_cache", cache)
+
+    monkeypatch.setattr(settings, "MODEL_CATALOG_HUB_FALLBACK", False)
+    assert "zzz-unknown#1" not in ids(await recommender._search("zzz-unknown", 3))
+    assert hub.calls == 0
+
+    monkeypatch.setattr(settings, "MODEL_CATALOG_HUB_FALLBACK", True)
+    assert "zzz-unknown#1" in ids(await recommender._search("zzz-unknown", 3))
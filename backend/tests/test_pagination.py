@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+
+
+def pages(client, url, headers, limit):
+    """Follow X-Next-Cursor to the end; returns the id lists of every page."""
+    result = []
+    params = {"limit": limit}
+    while len(result) < 100:
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        result.append([item["id"] for item in response.json()])
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return result
+        params = {"limit": limit, "cursor": cursor}
+    raise AssertionError("cursor never reached the last page")
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2025, 3, 4, 5, 6, 7, 890)
+
+    assert decode_cursor(encode_cursor(created_at, "row-1")) == (created_at, "row-1")
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24", "WyJub3QgYSBkYXRlIiwgIngiXQ"])
+def test_malformed_cursor_is_a_bad_request(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_conversation_list_pages_cover_every_row_once(client, auth_headers):
+    # Created back to back, so many share a timestamp at the database's resolution
+    created = [
+        client.post("/api/v1/conversations", json={"title": f"c{index}"}, headers=auth_headers).json()["id"]
+        for index in range(7)
+    ]
+
+    result = pages(client, "/api/v1/conversations", auth_headers, limit=3)
+
+    assert [len(page) for page in result] == [3, 3, 1]
+    assert [conversation_id for page in result for conversation_id in page] == created[::-1]
+
+
+def test_invalid_cursor_is_rejected(client, auth_headers):
+    response = client.get("/api/v1/conversations", params={"cursor": "garbage"}, headers=auth_headers)
+
+    assert response.status_code == 400
+
+
+def test_message_pages_run_newest_to_oldest_in_chronological_order(client, auth_headers):
+    conversation_id = client.post("/api/v1/conversations", json={"title": "paged"}, headers=auth_headers).json()["id"]
+    for index in range(4):
+        response = client.post(
+            f"/api/v1/conversations/{conversation_id}/messages",
+            json={"role": "user", "content": f"question {index}"},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+    everything = client.get(f"/api/v1/conversations/{conversation_id}", headers=auth_headers).json()["messages"]
+
+    result = pages(client, f"/api/v1/conversations/{conversation_id}/messages", auth_headers, limit=3)
+
+    assert [len(page) for page in result] == [3, 3, 2]
+    assert [message_id for page in reversed(result) for message_id in page] == [
+        message["id"] for message in everything
+    ]
+    assert [message["role"] for message in everything] == ["user", "assistant"] * 4
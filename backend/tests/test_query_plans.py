@@ -0,0 +1,105 @@
+"""
+The hot read paths must be served from the indexes added by the migrations.
+
+Statements are captured as the app issues them against the migrated test
+database, then replayed under ``EXPLAIN QUERY PLAN``.
+"""
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, select
+
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.db.session import async_engine, engine
+from app.models.conversation import TaskDefinition
+
+
+@contextmanager
+def capture(bind):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(bind, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", record)
+
+
+def plan(statement: str, parameters) -> list:
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+
+def assert_uses_index(statement: str, parameters, table: str, index: str) -> None:
+    details = plan(statement, parameters)
+    assert any(index in detail for detail in details), details
+    # A bare "SCAN <table>" is a full table scan
+    assert f"SCAN {table}" not in details, details
+
+
+def only(statements, fragment: str):
+    matches = [(statement, parameters) for statement, parameters in statements if fragment in statement]
+    assert len(matches) == 1, [statement for statement, _ in statements]
+    return matches[0]
+
+
+@pytest.fixture
+def conversation_id(client, auth_headers):
+    """A conversation with a few exchanges, among several of the same user."""
+    ids = [
+        client.post("/api/v1/conversations", json={"title": f"c{index}"}, headers=auth_headers).json()["id"]
+        for index in range(5)
+    ]
+    for index in range(3):
+        client.post(
+            f"/api/v1/conversations/{ids[0]}/messages",
+            json={"role": "user", "content": f"question {index}"},
+            headers=auth_headers,
+        )
+    return ids[0]
+
+
+def test_conversation_list_keyset_query_uses_the_user_created_index(client, auth_headers, conversation_id):
+    first = client.get("/api/v1/conversations", params={"limit": 2}, headers=auth_headers)
+    with capture(async_engine.sync_engine) as statements:
+        response = client.get(
+            "/api/v1/conversations",
+            params={"limit": 2, "cursor": first.headers[NEXT_CURSOR_HEADER]},
+            headers=auth_headers,
+        )
+    assert response.status_code == 200
+
+    statement, parameters = only(statements, "ORDER BY conversations.created_at DESC")
+    assert_uses_index(statement, parameters, "conversations", "idx_conversations_user_created_id")
+
+
+def test_message_page_query_uses_the_conversation_created_index(client, auth_headers, conversation_id):
+    url = f"/api/v1/conversations/{conversation_id}/messages"
+    first = client.get(url, params={"limit": 2}, headers=auth_headers)
+    with capture(async_engine.sync_engine) as statements:
+        response = client.get(url, params={"limit": 2, "cursor": first.headers[NEXT_CURSOR_HEADER]}, headers=auth_headers)
+    assert response.status_code == 200
+
+    statement, parameters = only(statements, "ORDER BY messages.created_at DESC")
+    assert_uses_index(statement, parameters, "messages", "idx_messages_conversation_created_id")
+
+
+@pytest.mark.parametrize("column, index", [
+    ("schema_hash", "idx_task_definitions_schema_hash"),
+    ("user_id", "idx_task_definitions_user_id"),
+    ("conversation_id", "idx_task_definitions_conversation_id"),
+])
+def test_task_definition_lookups_use_their_indexes(conversation_id, column, index):
+    query = select(TaskDefinition.id, TaskDefinition.search_keywords).where(
+        getattr(TaskDefinition, column) == uuid.uuid4().hex
+    )
+    with capture(engine) as statements, engine.connect() as conn:
+        conn.execute(query).all()
+
+    statement, parameters = only(statements, "FROM task_definitions")
+    assert_uses_index(statement, parameters, "task_definitions", index)
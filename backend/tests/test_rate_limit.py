@@ -0,0 +1,118 @@
+import asyncio
+import json
+import uuid
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.core.rate_limit import LocalRateLimitBackend, RateLimiter, RateLimitExceeded, rate_limiter
+from app.services.llm import CircuitBreaker, FakeProvider, LLMClient, get_llm_client
+
+
+class NetworkedBackend(LocalRateLimitBackend):
+    """Local backend whose slot release takes a round trip, as it does with Redis."""
+
+    async def release_slot(self, key: str, token: str) -> None:
+        await asyncio.sleep(0.01)
+        await super().release_slot(key, token)
+
+
+@pytest.fixture
+def limits_on(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+
+
+@pytest.mark.anyio
+async def test_bucket_rejects_requests_beyond_the_burst(limits_on):
+    limiter = RateLimiter(LocalRateLimitBackend(clock=lambda: 0.0))
+
+    for _ in range(3):
+        await limiter.check("chat", "user", per_minute=60, burst=3)
+    with pytest.raises(RateLimitExceeded) as rejected:
+        await limiter.check("chat", "user", per_minute=60, burst=3)
+    assert rejected.value.retry_after == pytest.approx(1.0)
+    # Buckets are per user
+    await limiter.check("chat", "someone else", per_minute=60, burst=3)
+
+
+@pytest.mark.anyio
+async def test_slots_are_limited_until_released(limits_on):
+    limiter = RateLimiter(LocalRateLimitBackend())
+
+    first = await limiter.acquire("stream", "user", limit=2, lease=60)
+    await limiter.acquire("stream", "user", limit=2, lease=60)
+    with pytest.raises(RateLimitExceeded):
+        await limiter.acquire("stream", "user", limit=2, lease=60)
+
+    await limiter.release("stream", "user", first)
+    assert await limiter.acquire("stream", "user", limit=2, lease=60) is not None
+
+
+@pytest.mark.anyio
+async def test_client_disconnect_releases_the_stream_slot(limits_on, monkeypatch):
+    from app.main import app
+    from app.services.message_writer import message_writer
+
+    backend = NetworkedBackend()
+    monkeypatch.setattr(rate_limiter, "backend", backend)
+    slow = LLMClient(
+        FakeProvider(token_delay=0.05),
+        max_concurrency_per_model=4,
+        queue_timeout=1,
+        max_retries=0,
+        backoff_base=0,
+        backoff_max=0,
+        breaker=CircuitBreaker(failure_threshold=5, reset_timeout=1),
+    )
+    app.dependency_overrides[get_llm_client] = lambda: slow
+    credentials = {"email": f"{uuid.uuid4().hex}@example.com", "password": "correct horse"}
+    async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+        await http.post("/api/v1/auth/register", json=credentials)
+        token = (await http.post("/api/v1/auth/login", json=credentials)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        conversation_id = (await http.post("/api/v1/conversations", json={"title": "t"}, headers=headers)).json()["id"]
+
+    first_frame = asyncio.Event()
+    request_body = json.dumps({"role": "user", "content": "a long question " * 20}).encode()
+    received = []
+
+    async def receive():
+        if not received:
+            received.append(True)
+            return {"type": "http.request", "body": request_body, "more_body": False}
+        # The client goes away as soon as the reply starts
+        await first_frame.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            first_frame.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": f"/api/v1/conversations/{conversation_id}/messages/stream",
+        "raw_path": b"",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"test"),
+            (b"content-type", b"application/json"),
+            (b"authorization", headers["Authorization"].encode()),
+        ],
+        "client": ("127.0.0.1", 1234),
+        "server": ("test", 80),
+    }
+    try:
+        await app(scope, receive, send)
+        await asyncio.sleep(0.1)
+    finally:
+        app.dependency_overrides.pop(get_llm_client, None)
+        await message_writer.stop()
+
+    assert first_frame.is_set()
+    assert backend._slots == {}
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+from starlette.requests import Request
+
+from app.core.cache import LocalCacheBackend
+from app.services.response_cache import ResponseCache
+from tests.conftest import register
+
+
+def conversation(client, headers) -> str:
+    return client.post("/api/v1/conversations", json={"title": "cached"}, headers=headers).json()["id"]
+
+
+def get(client, url: str, headers, etag=None):
+    return client.get(url, headers={**headers, "If-None-Match": etag} if etag else headers)
+
+
+@pytest.mark.parametrize("path", ["/api/v1/conversations", "/api/v1/conversations/{id}"])
+def test_a_repeated_get_with_the_etag_is_not_modified(client, auth_headers, path):
+    url = path.format(id=conversation(client, auth_headers))
+    first = get(client, url, auth_headers)
+    etag = first.headers["ETag"]
+
+    again = get(client, url, auth_headers, etag)
+    weak = get(client, url, auth_headers, f'"other", W/{etag}')
+    cached = get(client, url, auth_headers)
+
+    assert (again.status_code, again.content, again.headers["ETag"]) == (304, b"", etag)
+    assert weak.status_code == 304
+    assert (cached.status_code, cached.json(), cached.headers["ETag"]) == (200, first.json(), etag)
+    assert get(client, url, auth_headers, '"stale"').status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/api/v1/conversations", "/api/v1/conversations/{id}"])
+def test_the_etag_changes_when_a_message_is_added_or_the_conversation_updated(client, auth_headers, path):
+    conversation_id = conversation(client, auth_headers)
+    url = path.format(id=conversation_id)
+    etags = [get(client, url, auth_headers).headers["ETag"]]
+
+    client.post(
+        f"/api/v1/conversations/{conversation_id}/messages",
+        json={"role": "user", "content": "hello"},
+        headers=auth_headers,
+    )
+    after_message = get(client, url, auth_headers, etags[-1])
+    etags.append(after_message.headers["ETag"])
+    # Creating a task definition marks the conversation completed
+    client.post(
+        "/api/v1/task-definitions",
+        json={"conversation_id": conversation_id, "name": "churn", "description": "predict churn"},
+        headers=auth_headers,
+    )
+    after_update = get(client, url, auth_headers, etags[-1])
+    etags.append(after_update.headers["ETag"])
+
+    assert (after_message.status_code, after_update.status_code) == (200, 200)
+    assert len(set(etags)) == 3
+    body = after_update.json()
+    completed = body[0]["is_completed"] if isinstance(body, list) else body["is_completed"]
+    assert completed is True
+
+
+def test_cached_responses_are_never_served_to_another_user(client, auth_headers):
+    conversation_id = conversation(client, auth_headers)
+    mine = get(client, "/api/v1/conversations", auth_headers)
+    get(client, f"/api/v1/conversations/{conversation_id}", auth_headers)
+    other = register(client)
+
+    theirs = get(client, "/api/v1/conversations", other, mine.headers["ETag"])
+    assert (theirs.status_code, theirs.json()) == (200, [])
+    assert theirs.headers["ETag"] != mine.headers["ETag"]
+    assert get(client, f"/api/v1/conversations/{conversation_id}", other).status_code == 404
+
+
+def request(query: str = "") -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": query.encode(), "headers": []})
+
+
+@pytest.mark.anyio
+async def test_entries_are_keyed_by_user_and_dropped_by_invalidate():
+    cache = ResponseCache(LocalCacheBackend(maxsize=100, ttl=60), ttl=60)
+    builds = []
+
+    def builder(user_id):
+        async def build():
+            builds.append(user_id)
+            return {"owner": user_id}, {}
+        return build
+
+    for user_id in ("alice", "alice", "bob", "bob"):
+        response = await cache.respond(request("limit=10"), "list", user_id, ("v1",), builder(user_id))
+        assert json.loads(response.body) == {"owner": user_id}
+    assert builds == ["alice", "bob"]
+
+    await cache.invalidate("alice")
+    await cache.respond(request("limit=10"), "list", "alice", ("v1",), builder("alice"))
+    await cache.respond(request("limit=10"), "list", "bob", ("v1",), builder("bob"))
+    assert builds == ["alice", "bob", "alice"]
+
+    # A new version of the resource is rebuilt even if the entry is still there
+    await cache.respond(request("limit=10"), "list", "bob", ("v2",), builder("bob"))
+    assert builds[-1] == "bob"
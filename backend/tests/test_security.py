@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import uuid
+
+import httpx
+import pytest
+from passlib.context import CryptContext
+from sqlalchemy import select
+
+from app.core import security
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.user import User
+
+
+def contexts(*rounds):
+    return [CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=value) for value in rounds]
+
+
+@pytest.mark.anyio
+async def test_calls_beyond_the_pending_limit_are_shed(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_PENDING", 2)
+    release = threading.Event()
+    monkeypatch.setattr(security, "get_password_hash", lambda password: release.wait(5) and f"hashed {password}")
+
+    running = [asyncio.create_task(security.get_password_hash_async(f"p{index}")) for index in range(2)]
+    await asyncio.sleep(0)
+    try:
+        with pytest.raises(security.PasswordHashingOverloaded):
+            await security.get_password_hash_async("one too many")
+    finally:
+        release.set()
+
+    assert await asyncio.gather(*running) == ["hashed p0", "hashed p1"]
+    # Slots are freed once calls finish
+    assert security._pending == 0
+    assert await security.get_password_hash_async("again") == "hashed again"
+
+
+def test_a_full_hashing_queue_gets_a_429_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_PENDING", 0)
+
+    response = client.post(
+        "/api/v1/auth/register", json={"email": f"{uuid.uuid4().hex}@example.com", "password": "correct horse"}
+    )
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(security.PasswordHashingOverloaded.retry_after)
+
+
+async def stored_hash(email: str) -> str:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(User.hashed_password).where(User.email == email))).scalar_one()
+
+
+@pytest.mark.anyio
+async def test_login_rehashes_a_password_stored_with_other_rounds(monkeypatch):
+    from app.main import app
+
+    old, new = contexts(4, 5)
+    credentials = {"email": f"{uuid.uuid4().hex}@example.com", "password": "correct horse"}
+    async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+        monkeypatch.setattr(security, "pwd_context", old)
+        assert (await http.post("/api/v1/auth/register", json=credentials)).status_code == 200
+        before = await stored_hash(credentials["email"])
+
+        # BCRYPT_ROUNDS changed and the app restarted
+        monkeypatch.setattr(security, "pwd_context", new)
+        failed = await http.post("/api/v1/auth/login", json={**credentials, "password": "wrong horse"})
+        unchanged = await stored_hash(credentials["email"])
+        login = await http.post("/api/v1/auth/login", json=credentials)
+        after = await stored_hash(credentials["email"])
+        # Already current: the next login leaves it alone
+        again = await http.post("/api/v1/auth/login", json=credentials)
+        latest = await stored_hash(credentials["email"])
+
+    assert before.startswith("$2b$04$")
+    assert failed.status_code == 400 and unchanged == before
+    assert login.status_code == 200
+    assert after.startswith("$2b$05$")
+    assert new.verify("correct horse", after)
+    assert again.status_code == 200 and latest == after
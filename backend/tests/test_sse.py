@@ -0,0 +1,140 @@
+import asyncio
+import zlib
+
+import pytest
+
+from app.core.config import settings
+from app.core.sse import GZIP_WBITS, accepts_gzip, coalesce, gzip_frames
+from app.services.llm import LLMError
+
+
+async def deltas(*items, delay: float = 0.0, closed=None):
+    """Yield ``items``; a float item sleeps that long instead of being yielded."""
+    try:
+        for item in items:
+            if isinstance(item, float):
+                await asyncio.sleep(item)
+                continue
+            if delay:
+                await asyncio.sleep(delay)
+            yield item
+    finally:
+        if closed is not None:
+            closed.append(True)
+
+
+async def collect(source):
+    return [item async for item in source]
+
+
+@pytest.mark.anyio
+async def test_zero_interval_sends_every_delta_alone():
+    groups = await collect(coalesce(deltas("a", "b", "c"), interval=0, max_bytes=512))
+
+    assert groups == [["a"], ["b"], ["c"]]
+
+
+@pytest.mark.anyio
+async def test_deltas_arriving_together_share_a_frame():
+    groups = await collect(coalesce(deltas(*"hello world"), interval=1, max_bytes=512))
+
+    assert groups == [list("hello world")]
+
+
+@pytest.mark.anyio
+async def test_groups_are_released_at_max_bytes():
+    groups = await collect(coalesce(deltas("aa", "bb", "cc", "dd", "e"), interval=1, max_bytes=4))
+
+    assert groups == [["aa", "bb"], ["cc", "dd"], ["e"]]
+
+
+@pytest.mark.anyio
+async def test_a_pending_group_goes_out_after_the_interval_without_a_new_delta():
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    released = []
+
+    async for group in coalesce(deltas("a", 0.02, "b", 0.3, "c"), interval=0.1, max_bytes=512):
+        released.append((group, loop.time() - started))
+
+    assert [group for group, _ in released] == [["a", "b"], ["c"]]
+    # Released on the interval, well before "c" arrived
+    assert released[0][1] < 0.25
+
+
+@pytest.mark.anyio
+async def test_closing_the_consumer_closes_the_source():
+    closed = []
+    groups = coalesce(deltas("a", 0.05, "b", 0.05, "c", closed=closed), interval=0.01, max_bytes=512)
+
+    assert await groups.__anext__() == ["a"]
+    await groups.aclose()
+
+    assert closed == [True]
+
+
+@pytest.mark.anyio
+async def test_source_errors_reach_the_consumer_after_what_came_before():
+    async def failing():
+        yield "partial"
+        raise LLMError("503: gone", retryable=True)
+
+    received = []
+    with pytest.raises(LLMError, match="gone"):
+        async for group in coalesce(failing(), interval=0.01, max_bytes=512):
+            received.extend(group)
+
+    assert received == ["partial"]
+
+
+@pytest.mark.anyio
+async def test_gzip_frames_can_be_decoded_as_each_one_arrives():
+    frames = ['data: "Hello"\n\n', 'data: " world"\n\n', "data: [DONE]\n\n"]
+    decoder = zlib.decompressobj(GZIP_WBITS)
+    chunks = await collect(gzip_frames(deltas(*frames)))
+
+    # Every frame is complete on the wire before the next one is compressed
+    for frame, chunk in zip(frames, chunks):
+        assert decoder.decompress(chunk).decode() == frame
+    decoder.decompress(b"".join(chunks[len(frames):]))
+    assert decoder.eof
+    assert zlib.decompress(b"".join(chunks), GZIP_WBITS).decode() == "".join(frames)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("br, gzip;q=0.5", True),
+    ("x-gzip", True),
+    ("GZIP", True),
+    ("gzip;q=0", False),
+    ("gzip;q=bogus", False),
+    ("deflate, br", False),
+    ("", False),
+    (None, False),
+])
+def test_accepts_gzip(header, expected):
+    assert accepts_gzip(header) is expected
+
+
+@pytest.mark.parametrize("gzip_enabled, accept_encoding, expected_encoding", [
+    (True, "gzip", "gzip"),
+    (True, "identity", None),
+    (False, "gzip", None),
+])
+def test_stream_endpoint_negotiates_gzip(
+    client, auth_headers, monkeypatch, gzip_enabled, accept_encoding, expected_encoding
+):
+    monkeypatch.setattr(settings, "SSE_GZIP_ENABLED", gzip_enabled)
+    conversation_id = client.post("/api/v1/conversations", json={"title": "sse"}, headers=auth_headers).json()["id"]
+
+    response = client.post(
+        f"/api/v1/conversations/{conversation_id}/messages/stream",
+        json={"role": "user", "content": "compress me"},
+        headers={**auth_headers, "Accept-Encoding": accept_encoding},
+    )
+
+    assert response.status_code == 200
+    assert response.headers.get("content-encoding") == expected_encoding
+    # The client decodes gzip transparently
+    assert "compress me" in response.text
+    assert response.text.rstrip().endswith("data: [DONE]")
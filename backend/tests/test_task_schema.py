@@ -0,0 +1,99 @@
+import json
+import uuid
+
+import httpx
+import pytest
+
+from app.services.task_schema import SchemaExtractor, extract_schema
+
+SCHEMA = {"type": "object", "properties": {"label": {"type": "string", "enum": ["pos", "neg"]}}}
+REPLY = f"Here is the proposal:\n```json\n{json.dumps(SCHEMA, indent=2)}\n```\nLet me know what to change."
+
+
+def feed_all(deltas):
+    extractor = SchemaExtractor()
+    returned = [schema for schema in map(extractor.feed, deltas) if schema is not None]
+    return extractor, returned
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 1000])
+def test_fences_split_across_deltas_are_found(size):
+    deltas = [REPLY[start:start + size] for start in range(0, len(REPLY), size)]
+
+    extractor, returned = feed_all(deltas)
+
+    assert returned == [SCHEMA]
+    assert extractor.schema == SCHEMA
+
+
+def test_the_schema_is_returned_as_soon_as_its_block_closes():
+    extractor = SchemaExtractor()
+
+    assert extractor.feed('```json\n{"type": "object"}\n`') is None
+    assert extractor.feed("``") == {"type": "object"}
+    # Only once, and later blocks are ignored
+    assert extractor.feed('\n```json\n{"type": "array"}\n```') is None
+    assert extractor.schema == {"type": "object"}
+
+
+@pytest.mark.parametrize("skipped", ['[1, 2, 3]', '"just a string"', "{not json}", ""])
+def test_blocks_that_are_not_an_object_are_skipped(skipped):
+    reply = f"First try:\n```json\n{skipped}\n```\nBetter:\n```json\n{json.dumps(SCHEMA)}\n```"
+
+    _, returned = feed_all(reply)
+
+    assert returned == [SCHEMA]
+    assert extract_schema(reply) == SCHEMA
+
+
+def test_a_fence_that_never_closes_gives_no_schema():
+    reply = '```json\n{"type": "object", "properties": {}}\nand the reply was cut off here'
+
+    extractor, returned = feed_all(reply)
+
+    assert returned == []
+    assert extractor.schema is None
+    assert extract_schema(reply) is None
+
+
+def test_plain_code_fences_are_not_schemas():
+    assert extract_schema('```\n{"type": "object"}\n```') is None
+    assert extract_schema("no fences at all") is None
+
+
+@pytest.mark.anyio
+async def test_a_streamed_schema_is_sent_as_an_event_and_promoted_to_the_task_definition():
+    from app.main import app
+    from app.services.message_writer import message_writer
+
+    credentials = {"email": f"{uuid.uuid4().hex}@example.com", "password": "correct horse"}
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://test") as http:
+            await http.post("/api/v1/auth/register", json=credentials)
+            token = (await http.post("/api/v1/auth/login", json=credentials)).json()["access_token"]
+            http.headers["Authorization"] = f"Bearer {token}"
+            conversation_id = (await http.post("/api/v1/conversations", json={"title": "schema"})).json()["id"]
+
+            # The offline provider echoes the message, fence and all
+            streamed = await http.post(
+                f"/api/v1/conversations/{conversation_id}/messages/stream",
+                json={"role": "user", "content": REPLY},
+            )
+            # The final write, which sets the draft schema, happens in the background
+            await message_writer.stop()
+            conversation = (await http.get(f"/api/v1/conversations/{conversation_id}")).json()
+            created = await http.post(
+                "/api/v1/task-definitions",
+                json={"conversation_id": conversation_id, "name": "sentiment", "description": "label reviews"},
+            )
+    finally:
+        await message_writer.stop()
+
+    events = [
+        json.loads(line[len("data: "):]) for line in streamed.text.splitlines()
+        if line.startswith("data: {")
+    ]
+    assert {"type": "schema", "schema": SCHEMA} in events
+    assert conversation["draft_json_schema"] == SCHEMA
+    assert created.status_code == 200, created.text
+    assert created.json()["json_schema"] == SCHEMA
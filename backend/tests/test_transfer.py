@@ -0,0 +1,214 @@
+import json
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import select
+
+from app.db.session import AsyncSessionLocal
+from app.models.conversation import Conversation, Message
+from app.models.user import User
+from app.schemas.transfer import ConversationRecord, MessageRecord
+from app.services import context, transfer
+from tests.conftest import register
+
+EXPORT = "/api/v1/conversations/export"
+IMPORT = "/api/v1/conversations/import"
+
+
+def records(body: bytes):
+    return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+
+def comparable(items):
+    """
+    Export records grouped by conversation, without the ids and timestamps an
+    import renumbers or fills in. Messages keep their order within a conversation.
+    """
+    ids = {}
+    result = {}
+    for record in items:
+        if record["type"] == "conversation":
+            ids[record["id"]] = len(ids)
+        fields = {
+            key: value for key, value in record.items()
+            if key not in ("id", "conversation_id", "created_at", "updated_at", "summarized_until", "summarized_until_id")
+        }
+        conversation = ids[record["id"] if record["type"] == "conversation" else record["conversation_id"]]
+        result.setdefault(conversation, []).append(fields)
+    return result
+
+
+@pytest.fixture
+def seeded(client, auth_headers):
+    for title, questions in (("first", 2), ("second", 1)):
+        conversation_id = client.post("/api/v1/conversations", json={"title": title}, headers=auth_headers).json()["id"]
+        for index in range(questions):
+            client.post(
+                f"/api/v1/conversations/{conversation_id}/messages",
+                json={"role": "user", "content": f"{title} question {index} – ünïcode"},
+                headers=auth_headers,
+            )
+    client.post(
+        "/api/v1/task-definitions",
+        json={"conversation_id": conversation_id, "name": "churn", "description": "predict churn"},
+        headers=auth_headers,
+    )
+    return auth_headers
+
+
+def test_export_then_import_round_trips(client, seeded):
+    exported = client.get(EXPORT, headers=seeded)
+    assert exported.status_code == 200
+    assert exported.headers["content-type"] == "application/x-ndjson"
+    original = records(exported.content)
+    assert [record["type"] for record in original] == ["conversation"] * 2 + ["message"] * 6 + ["task_definition"]
+
+    other = register(client)
+    imported = client.post(IMPORT, content=exported.content, headers=other)
+    assert imported.status_code == 200, imported.text
+    assert imported.json() == {"conversations": 2, "messages": 6, "task_definitions": 1}
+
+    copy = records(client.get(EXPORT, headers=other).content)
+    assert comparable(copy) == comparable(original)
+    assert {record["id"] for record in copy}.isdisjoint(record["id"] for record in original)
+    # Counters are rebuilt from the imported messages
+    listed = client.get("/api/v1/conversations", headers=other).json()
+    assert sorted(conversation["message_count"] for conversation in listed) == [2, 4]
+
+
+def test_importing_twice_makes_two_copies(client, seeded):
+    body = client.get(EXPORT, headers=seeded).content
+
+    assert client.post(IMPORT, content=body, headers=seeded).status_code == 200
+
+    assert len(client.get("/api/v1/conversations", headers=seeded).json()) == 4
+
+
+@pytest.mark.parametrize("body, detail", [
+    (b'{"type": "conversation", "id": "c1"}\nnot json\n', "Line 2:"),
+    (b'{"type": "message", "id": "m1", "conversation_id": "c1", "role": "user", "content": "x"}\n', "Line 1:"),
+    (b'{"type": "conversation", "id": "c1"}\n\n{"type": "conversation", "id": "c1"}\n', "Line 3:"),
+    (b'{"type": "conversation", "id": "c1"}\n{"type": "message", "id": "m1", "conversation_id": "c1", '
+     b'"role": "robot", "content": "x"}\n', "Line 2: message.role"),
+])
+def test_a_bad_line_rejects_the_whole_import(client, auth_headers, body, detail):
+    response = client.post(IMPORT, content=body, headers=auth_headers)
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith(detail)
+    assert client.get("/api/v1/conversations", headers=auth_headers).json() == []
+
+
+@pytest.mark.anyio
+async def test_lines_may_be_split_across_chunks():
+    body = (
+        b'{"type": "conversation", "id": "c1", "title": "split"}\n'
+        b'{"type": "message", "id": "m1", "conversation_id": "c1", "role": "user", "content": "hello"}'
+    )
+
+    async def chunks():
+        for start in range(0, len(body), 7):
+            yield body[start:start + 7]
+
+    lines = [(number, line) async for number, line in transfer._lines(chunks())]
+
+    assert [number for number, _ in lines] == [1, 2]
+    assert b"".join(line for _, line in lines) == body.replace(b"\n", b"")
+
+
+@pytest.mark.anyio
+async def test_import_leaves_committing_to_the_caller():
+    async def chunks():
+        yield b'{"type": "conversation", "id": "c1", "title": "pending"}\n'
+
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+        user_id = user.id
+        result = await transfer.import_ndjson(db, user_id, chunks())
+        await db.rollback()
+
+    assert result.conversations == 1
+    assert [chunk async for chunk in transfer.export_ndjson(user_id)] == []
+
+
+async def create_user(db) -> str:
+    user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+    db.add(user)
+    await db.flush()
+    return user.id
+
+
+async def window_contents(conversation_id: str):
+    async with AsyncSessionLocal() as db:
+        conversation = await db.get(Conversation, conversation_id)
+        window = await context.build_context_window(db, conversation, token_budget=100_000, max_messages=40)
+    return [message["content"] for message in window.messages]
+
+
+@pytest.mark.anyio
+async def test_the_summary_boundary_survives_a_round_trip():
+    tied = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    contents = [f"tied {index}" for index in range(8)]
+    async with AsyncSessionLocal() as db:
+        user_id = await create_user(db)
+        conversation = Conversation(user_id=user_id, summary="summary", summarized_until=tied)
+        db.add(conversation)
+        await db.flush()
+        ids = [f"{index:04d}-{uuid.uuid4()}" for index in range(len(contents))]
+        db.add_all(
+            Message(id=message_id, conversation_id=conversation.id, role="user", content=content, created_at=tied)
+            for message_id, content in zip(ids, contents)
+        )
+        # The first three are summarized; the rest share their timestamp
+        conversation.summarized_until_id = ids[2]
+        target_id = await create_user(db)
+        await db.commit()
+        conversation_id = conversation.id
+    assert await window_contents(conversation_id) == contents[3:]
+
+    body = b"".join([chunk async for chunk in transfer.export_ndjson(user_id)])
+    assert records(body)[0]["summarized_until_id"] == ids[2]
+
+    async def chunks():
+        yield body
+
+    async with AsyncSessionLocal() as db:
+        await transfer.import_ndjson(db, target_id, chunks())
+        await db.commit()
+        copy = (await db.execute(select(Conversation).where(Conversation.user_id == target_id))).scalars().one()
+        boundary = (await db.execute(
+            select(Message.content).where(Message.conversation_id == copy.id, Message.id == copy.summarized_until_id)
+        )).scalar_one()
+        ordered = (await db.execute(
+            select(Message.content).where(Message.conversation_id == copy.id).order_by(Message.created_at, Message.id)
+        )).scalars().all()
+
+    assert boundary == "tied 2"
+    # Fresh ids keep messages sharing a timestamp in their exported order
+    assert ordered == contents
+    assert await window_contents(copy.id) == contents[3:]
+
+
+@pytest.mark.anyio
+async def test_imported_timestamps_are_timezone_aware():
+    naive = datetime(2025, 1, 1, 12, 30)
+    async with AsyncSessionLocal() as db:
+        importer = transfer._Importer(db, await create_user(db))
+        await importer.add(1, ConversationRecord(
+            type="conversation", id="c1", created_at=naive, updated_at=naive, summarized_until=naive
+        ))
+        await importer.add(2, MessageRecord(
+            type="message", id="m1", conversation_id="c1", role="user", content="x", created_at=naive
+        ))
+        await db.rollback()
+
+    conversation, message = importer.conversations[0], importer.messages[0]
+    aware = naive.replace(tzinfo=timezone.utc)
+    assert conversation["created_at"] == conversation["updated_at"] == conversation["summarized_until"] == aware
+    assert message["created_at"] == aware
+    assert all(value.tzinfo is not None for value in (
+        conversation["created_at"], conversation["updated_at"], conversation["summarized_until"], message["created_at"]
+    ))
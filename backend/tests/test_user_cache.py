@@ -0,0 +1,96 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import event
+
+from app.core.cache import LocalCacheBackend, TTLCache
+from app.db.session import AsyncSessionLocal, async_engine
+from app.models.user import User
+from app.services.user_cache import UserCache, user_cache
+
+
+class QueryCounter:
+    def __init__(self, table: str):
+        self.table = table
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if f"FROM {self.table}" in statement:
+            self.count += 1
+
+    def __enter__(self):
+        event.listen(async_engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(async_engine.sync_engine, "before_cursor_execute", self)
+
+
+def test_cached_user_skips_the_database(client, auth_headers):
+    with QueryCounter("users") as queries:
+        first = client.get("/api/v1/auth/me", headers=auth_headers)
+        lookups_after_first = queries.count
+        second = client.get("/api/v1/auth/me", headers=auth_headers)
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert lookups_after_first == 1
+    assert queries.count == 1
+
+
+@pytest.mark.anyio
+async def test_snapshot_round_trip_leaves_out_the_password_hash():
+    cache = UserCache(LocalCacheBackend(maxsize=10, ttl=60), ttl=60)
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="secret-hash")
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+
+    await cache.set(user)
+    cached = await cache.get(user.id)
+
+    assert cached.id == user.id
+    assert cached.email == user.email
+    assert cached.created_at == user.created_at
+    assert cached.hashed_password is None
+    assert "hashed_password" not in await cache.backend.get(user.id)
+
+
+@pytest.mark.anyio
+async def test_disabled_cache_always_misses():
+    cache = UserCache(LocalCacheBackend(maxsize=10, ttl=60), ttl=60, enabled=False)
+    user = User(id="u1", email="a@example.com", is_active=True, is_superuser=False)
+
+    await cache.set(user)
+
+    assert await cache.get("u1") is None
+
+
+def test_entries_expire_after_the_ttl():
+    now = [0.0]
+    cache = TTLCache(maxsize=10, ttl=5, clock=lambda: now[0])
+    cache.set("user", {"id": "user"})
+
+    now[0] = 4.9
+    assert cache.get("user") == {"id": "user"}
+    now[0] = 5.0
+    assert cache.get("user") is None
+
+
+@pytest.mark.anyio
+async def test_deactivating_a_user_invalidates_the_entry():
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="x")
+        db.add(user)
+        await db.commit()
+        await user_cache.set(user)
+        assert await user_cache.get(user.id) is not None
+
+        user.is_active = False
+        await db.commit()
+
+    # The ORM listener schedules the delete on the running loop
+    await asyncio.sleep(0)
+    assert await user_cache.get(user.id) is None
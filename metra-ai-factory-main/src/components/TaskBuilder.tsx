@@ -114,6 +114,11 @@ const TaskBuilder = () => {
     const messages = currentConversation.messages;
     const lastMessage = messages?.[messages.length - 1];
 
+    // Draft schema sent by the server while the reply streams
+    if (currentConversation.draft_json_schema) {
+      setSchema(currentConversation.draft_json_schema);
+    }
+
     // Extract schema if present in the last message
     if (lastMessage?.role === 'assistant' && lastMessage.content.includes("```json")) {
       const jsonMatch = lastMessage.content.match(/```json\s*([\s\S]*?)\s*```/);
@@ -14,6 +14,7 @@ export interface Conversation {
   user_id: string;
   title: string | null;
   is_completed: boolean;
+  draft_json_schema?: any;
   created_at: string;
   updated_at: string | null;
   messages: Message[];
@@ -213,6 +214,19 @@ export const useConversationStore = create<ConversationStore>((set, get) => ({
               
               try {
                 const parsedChunk = JSON.parse(chunk);
+
+                // Schema events carry the task definition as soon as its JSON block is complete
+                if (typeof parsedChunk !== 'string') {
+                  if (parsedChunk?.type === 'schema') {
+                    set(state => ({
+                      currentConversation: {
+                        ...state.currentConversation!,
+                        draft_json_schema: parsedChunk.schema
+                      }
+                    }));
+                  }
+                  continue;
+                }
                 
                 // Simulate typing effect by adding characters one by one with a small delay
                 for (const char of parsedChunk) {